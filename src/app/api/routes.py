@@ -3,22 +3,34 @@ API routes for the workflow engine
 """
 
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from typing import Dict, List, Optional, Any
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, Field, ValidationError
 from app.models.node_models import NodeConfig, NodeExecutionResult
 from app.models.config import LLMConfig, MessageTemplate
 from app.nodes.factory import node_factory
 from app.chains.script_chain import ScriptChain, CircularDependencyError
+from app.chains.batch import ChainBatch
 from app.utils.context import GraphContextManager
+from app.utils.execution_journal import ExecutionJournal, JournalNotFoundError
 from app.utils.logging import logger
 from app.services.tool_service import ToolService
+from app.services.execution_budget import get_execution_budget
+from app.services.rate_limiter import get_rate_limiter
+from app.services.hedging import get_latency_tracker
+from app.services.llm_service import get_llm_service
+from app.services.provider_routing import get_provider_router
 import traceback
+import json
 
 router = APIRouter(prefix="/api/v1")
 
 # Create a singleton context manager
 context_manager = GraphContextManager()
 
+# Create a singleton execution journal so interrupted chains can be resumed (for requests that opt in)
+execution_journal = ExecutionJournal()
+
 # Create a singleton ToolService and register default tools
 singleton_tool_service = ToolService()
 ToolService.register_default_tools(singleton_tool_service)
@@ -33,6 +45,23 @@ class ChainRequest(BaseModel):
     nodes: List[NodeConfig]
     context: Optional[Dict[str, Any]] = None
     persist_intermediate_outputs: bool = True
+    incremental: bool = False
+    targets: Optional[List[str]] = None
+    release_intermediate_outputs: bool = False
+    journal: bool = Field(False, description="Journal the execution so it can be resumed after a crash (POST /chains/{chain_id}/resume)")
+
+class ResumeRequest(BaseModel):
+    """Request model for resuming a journaled chain"""
+    api_keys: Dict[str, str] = Field(default_factory=dict, description="API keys by provider (journals do not store keys; defaults to the provider's environment variable)")
+
+class BatchRequest(BaseModel):
+    """Request model for running one chain over many input records"""
+    nodes: List[NodeConfig]
+    records: List[Dict[str, Any]]
+    targets: Optional[List[str]] = None
+    max_concurrency: int = Field(10, ge=1, description="Maximum number of records executing at once")
+    ordered: bool = Field(True, description="Stream results in input order (False: completion order)")
+    persist_intermediate_outputs: bool = False
 
 @router.post("/nodes/text-generation", response_model=NodeExecutionResult)
 async def create_text_generation_node(request: NodeRequest):
@@ -44,7 +73,9 @@ async def create_text_generation_node(request: NodeRequest):
         # if not llm_config.api_key:
         #     raise HTTPException(status_code=422, detail="API key is required")
         node = node_factory(request.config, context_manager, llm_config, tool_service=singleton_tool_service)
-        result = await node.execute(request.context or {})
+        # Single-node requests share the same execution budget as chains
+        async with get_execution_budget().slot(f"node:{request.config.id}"):
+            result = await node.execute(request.context or {})
         
         # If execution was successful, update the context manager with its output
         if result.success and result.output:
@@ -68,11 +99,14 @@ async def execute_chain(request: ChainRequest):
             nodes=request.nodes,
             context_manager=context_manager,
             persist_intermediate_outputs=request.persist_intermediate_outputs,
-            tool_service=singleton_tool_service
+            tool_service=singleton_tool_service,
+            incremental=request.incremental,
+            journal=execution_journal if request.journal else None,
+            release_intermediate_outputs=request.release_intermediate_outputs
         )
         
-        # Execute chain
-        result = await chain.execute()
+        # Execute chain (only the targets' ancestors when targets are given)
+        result = await chain.execute(targets=request.targets, inputs=request.context)
         return result
     except CircularDependencyError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -82,6 +116,169 @@ async def execute_chain(request: ChainRequest):
         logger.error(f"Error executing chain: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def _sse_event(event: str, data: str) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+@router.post("/nodes/text-generation/stream")
+async def stream_text_generation_node(request: NodeRequest):
+    """Execute a text generation node, streaming generated text as Server-Sent Events.
+
+    Emits a 'delta' event per chunk of generated text and a final 'node_result' event
+    with the node's result. Agentic and tool-calling nodes emit only 'node_result'.
+    Disconnecting cancels the provider call.
+    """
+    try:
+        node = node_factory(request.config, context_manager, request.config.llm_config, tool_service=singleton_tool_service)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating node for streaming: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    async def event_stream():
+        try:
+            # Single-node requests share the same execution budget as chains
+            async with get_execution_budget().slot(f"node:{request.config.id}"):
+                if hasattr(node, "execute_stream"):
+                    stream = node.execute_stream(request.context or {})
+                    try:
+                        async for item in stream:
+                            if isinstance(item, str):
+                                yield _sse_event("delta", json.dumps({"text": item}))
+                            else:
+                                result = item
+                    finally:
+                        # Runs on client disconnect as well; cancels the provider call
+                        await stream.aclose()
+                else:
+                    result = await node.execute(request.context or {})
+            if result.success and result.output:
+                context_manager.update_context(request.config.id, result.output)
+            yield _sse_event("node_result", result.model_dump_json())
+        except Exception as e:
+            logger.error(f"Error streaming node {request.config.id}: {str(e)}")
+            yield _sse_event("error", json.dumps({"detail": "Internal server error"}))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/chains/execute/stream")
+async def execute_chain_stream(request: ChainRequest):
+    """Execute a chain of nodes, streaming node results as Server-Sent Events.
+    
+    Emits a 'chain_start' event with the chain ID, a 'node_result' event per finished
+    node and a final 'chain_end' event with the chain-level result. Disconnecting
+    cancels the nodes still running.
+    """
+    try:
+        chain = ScriptChain(
+            nodes=request.nodes,
+            context_manager=context_manager,
+            persist_intermediate_outputs=request.persist_intermediate_outputs,
+            tool_service=singleton_tool_service,
+            incremental=request.incremental,
+            journal=execution_journal if request.journal else None,
+            release_intermediate_outputs=request.release_intermediate_outputs
+        )
+        # Validate targets up front so bad requests fail before the stream starts
+        if request.targets is not None:
+            chain.get_ancestors(request.targets)
+    except CircularDependencyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating chain for streaming: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    async def event_stream():
+        stream = chain.execute_stream(targets=request.targets, inputs=request.context)
+        try:
+            yield _sse_event("chain_start", json.dumps({"chain_id": chain.chain_id, "name": chain.name}))
+            async for result in stream:
+                yield _sse_event("node_result", result.model_dump_json())
+            yield _sse_event("chain_end", chain.last_result.model_dump_json())
+        except Exception as e:
+            logger.error(f"Error streaming chain {chain.chain_id}: {str(e)}")
+            yield _sse_event("error", json.dumps({"detail": "Internal server error"}))
+        finally:
+            # Runs on client disconnect as well; cancels nodes that are still running
+            await stream.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/chains/batch/stream")
+async def execute_chain_batch_stream(request: BatchRequest):
+    """Run one chain over many input records, streaming per-record results as Server-Sent Events.
+    
+    Emits a 'record_result' event per record (in input order unless ordered is false)
+    and a final 'batch_end' event with aggregate counts, token usage and throughput.
+    """
+    try:
+        batch = ChainBatch(
+            nodes=request.nodes,
+            max_concurrency=request.max_concurrency,
+            ordered=request.ordered,
+            targets=request.targets,
+            context_manager=context_manager,
+            persist_intermediate_outputs=request.persist_intermediate_outputs,
+            tool_service=singleton_tool_service
+        )
+    except CircularDependencyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def event_stream():
+        stream = batch.run(request.records)
+        try:
+            async for item in stream:
+                yield _sse_event("record_result", item.model_dump_json())
+            yield _sse_event("batch_end", json.dumps(batch.stats()))
+        except Exception as e:
+            logger.error(f"Error streaming batch: {str(e)}")
+            yield _sse_event("error", json.dumps({"detail": "Internal server error"}))
+        finally:
+            await stream.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/chains/{chain_id}/resume", response_model=NodeExecutionResult)
+async def resume_chain(chain_id: str, request: Optional[ResumeRequest] = None):
+    """Resume a journaled chain, executing only the nodes that had not completed"""
+    try:
+        chain = ScriptChain.resume(
+            chain_id,
+            execution_journal,
+            api_keys=request.api_keys if request else None,
+            context_manager=context_manager,
+            tool_service=singleton_tool_service
+        )
+        return await chain.execute()
+    except JournalNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CircularDependencyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error resuming chain {chain_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/nodes/{node_id}/context")
 async def get_node_context(node_id: str):
     """Get context for a specific node"""
@@ -109,4 +306,29 @@ async def clear_node_context(node_id: str):
     except Exception as e:
         logger.error(f"API HANDLER: Error clearing node context for {node_id}: {str(e)}")
         logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/llm/rate-limits")
+async def get_rate_limit_metrics():
+    """Get RPM/TPM limits and queueing wait-time metrics per provider and model"""
+    return get_rate_limiter().get_metrics()
+
+@router.get("/llm/latency")
+async def get_latency_metrics():
+    """Get recent p50/p95/p99 provider latency per model (used for request hedging)"""
+    return get_latency_tracker().get_metrics()
+
+@router.get("/llm/circuit-breakers")
+async def get_circuit_breaker_metrics():
+    """Get circuit breaker state and consecutive failure counts per provider"""
+    return get_llm_service().get_circuit_breaker_metrics()
+
+@router.get("/llm/routing")
+async def get_routing_metrics():
+    """Get routing groups and the EWMA latency and error rate used to rank their members"""
+    return get_provider_router().get_metrics()
+
+@router.get("/llm/cache")
+async def get_cache_metrics():
+    """Get LLM response cache size and hit/miss metrics, and in-flight request coalescing counts"""
+    return get_llm_service().get_cache_metrics()
@@ -3,5 +3,6 @@ Workflow chain implementations
 """
 
 from app.chains.script_chain import ScriptChain
+from app.chains.batch import ChainBatch
 
-__all__ = ["ScriptChain"]
+__all__ = ["ScriptChain", "ChainBatch"]
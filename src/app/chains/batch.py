@@ -0,0 +1,198 @@
+"""
+Batch execution of one chain across many input records
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Union
+from app.chains.compiler import compile_chain
+from app.chains.script_chain import ScriptChain
+from app.models.node_models import BatchRecordResult, NodeConfig
+from app.utils.context import GraphContextManager
+
+logger = logging.getLogger(__name__)
+
+Records = Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+
+async def _iterate(records: Records) -> AsyncIterator[Dict[str, Any]]:
+    if hasattr(records, "__aiter__"):
+        async for record in records:
+            yield record
+    else:
+        for record in records:
+            yield record
+
+class ChainBatch:
+    """
+    Runs the same chain once per input record, several records at a time.
+    The chain is compiled once and every record gets its own lightweight ScriptChain
+    built from the cached plan. Nodes of all records draw from the shared execution
+    budget, so a batch cannot starve interactive chains. A failing record never affects
+    the others.
+    """
+    def __init__(
+        self,
+        nodes: List[NodeConfig],
+        name: Optional[str] = None,
+        max_concurrency: int = 10,
+        ordered: bool = True,
+        targets: Optional[List[str]] = None,
+        context_manager: Optional[GraphContextManager] = None,
+        persist_intermediate_outputs: bool = False,
+        **chain_kwargs: Any
+    ):
+        """Initialize the batch.
+
+        Args:
+            nodes: List of node configurations of the chain
+            name: Optional batch name; record chains are named '{name}-{index}'
+            max_concurrency: Maximum number of records executing at once
+            ordered: If True, results are yielded in input order; otherwise in completion order
+            targets: Optional target nodes to execute for every record (see ScriptChain.execute)
+            context_manager: Context manager shared by all record chains
+            persist_intermediate_outputs: Whether record chains persist node outputs to the
+                                          context manager (off by default: records would
+                                          overwrite each other's outputs)
+            **chain_kwargs: Further ScriptChain arguments (max_parallel, tool_service, ...)
+        """
+        if max_concurrency < 1:
+            raise ValueError("Batch max_concurrency must be at least 1.")
+        # Validate the chain once; per-record chains then reuse the cached plan
+        compile_chain(nodes)
+        node_ids = {node.id for node in nodes}
+        unknown = [target for target in targets or [] if target not in node_ids]
+        if unknown:
+            raise ValueError(f"Unknown target node(s): {unknown}")
+        self.nodes = nodes
+        self.name = name or "batch"
+        self.max_concurrency = max_concurrency
+        self.ordered = ordered
+        self.targets = targets
+        self.chain_kwargs = {
+            "context_manager": context_manager or GraphContextManager(),
+            "persist_intermediate_outputs": persist_intermediate_outputs,
+            **chain_kwargs
+        }
+        # Completed results held back in ordered mode while waiting for an earlier record
+        self.max_buffered = max_concurrency * 4
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self.records = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.total_tokens = 0
+        self.token_usage: Dict[str, int] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    async def run(self, records: Records) -> AsyncIterator[BatchRecordResult]:
+        """Execute the chain for every record, yielding results as they become available.
+
+        Records are pulled from `records` lazily, so large or unbounded streams are fine.
+
+        Args:
+            records: Iterable or async iterable of input dictionaries; each one is passed
+                     to the chain as its inputs
+
+        Yields:
+            BatchRecordResult per record, in input order if the batch is ordered
+        """
+        self._reset_stats()
+        self._started_at = time.perf_counter()
+        source = _iterate(records)
+        running: Dict[asyncio.Task, int] = {}
+        buffered: Dict[int, BatchRecordResult] = {}
+        submitted = 0
+        next_index = 0
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(running) < self.max_concurrency and len(buffered) < self.max_buffered:
+                    try:
+                        record = await source.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    running[asyncio.create_task(self._run_record(submitted, record))] = submitted
+                    submitted += 1
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                finished = []
+                for task in done:
+                    running.pop(task)
+                    finished.append(task.result())
+                finished.sort(key=lambda item: item.index)
+                for item in finished:
+                    self._account(item)
+
+                if self.ordered:
+                    for item in finished:
+                        buffered[item.index] = item
+                    while next_index in buffered:
+                        yield buffered.pop(next_index)
+                        next_index += 1
+                else:
+                    for item in finished:
+                        yield item
+        finally:
+            for task in running:
+                task.cancel()
+            await source.aclose()
+            self._finished_at = time.perf_counter()
+        logger.info(f"Batch '{self.name}' finished: {self.succeeded} succeeded, {self.failed} failed")
+
+    async def _run_record(self, index: int, record: Any) -> BatchRecordResult:
+        """Run the chain for one record; never raises."""
+        started_at = time.perf_counter()
+        try:
+            if not isinstance(record, dict):
+                raise ValueError(f"Batch record {index} must be an object, got {type(record).__name__}")
+            chain = ScriptChain(nodes=self.nodes, name=f"{self.name}-{index}", **self.chain_kwargs)
+            result = await chain.execute(targets=self.targets, inputs=record)
+            return BatchRecordResult(
+                index=index,
+                success=result.success,
+                result=result,
+                error=result.error,
+                execution_time=time.perf_counter() - started_at
+            )
+        except Exception as e:
+            logger.error(f"Batch '{self.name}' record {index} failed: {str(e)}")
+            return BatchRecordResult(
+                index=index,
+                success=False,
+                error=str(e),
+                execution_time=time.perf_counter() - started_at
+            )
+
+    def _account(self, item: BatchRecordResult) -> None:
+        self.records += 1
+        if item.success:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        token_stats = item.result.token_stats if item.result and item.result.token_stats else {}
+        self.total_tokens += token_stats.get("total_tokens", 0)
+        for model, tokens in token_stats.get("token_usage", {}).items():
+            self.token_usage[model] = self.token_usage.get(model, 0) + tokens
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate counts, token usage and throughput of the current (or last) run."""
+        if self._started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self._finished_at or time.perf_counter()) - self._started_at
+        return {
+            "records": self.records,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "total_tokens": self.total_tokens,
+            "token_usage": dict(self.token_usage),
+            "elapsed_seconds": round(elapsed, 4),
+            "records_per_second": round(self.records / elapsed, 2) if elapsed > 0 else 0.0,
+            "tokens_per_second": round(self.total_tokens / elapsed, 2) if elapsed > 0 else 0.0,
+        }
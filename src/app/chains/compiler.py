@@ -0,0 +1,286 @@
+"""
+Compilation of node configurations into immutable, cacheable execution plans
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+import networkx as nx
+from app.models.node_models import NodeConfig
+
+logger = logging.getLogger(__name__)
+
+# Custom exceptions for better error handling
+class ScriptChainError(Exception):
+    """Base exception class for ScriptChain errors"""
+    pass
+
+class CircularDependencyError(ScriptChainError):
+    """Exception raised when circular dependencies are detected"""
+    pass
+
+def resolve_path_parts(data: Any, parts: Sequence[str]) -> Any:
+    """Resolve an already split nested path (see resolve_nested_path) in the data structure.
+
+    Args:
+        data: The data structure to traverse
+        parts: Path segments (supports array indexing with integers)
+
+    Returns:
+        The value at the specified path
+
+    Raises:
+        KeyError: If the path doesn't exist
+        IndexError: If array index is out of bounds
+        TypeError: If trying to index a non-indexable type
+    """
+    current = data
+
+    for part in parts:
+        if isinstance(current, dict):
+            if part not in current:
+                raise KeyError(f"Key '{part}' not found in dict. Available keys: {list(current.keys())}")
+            current = current[part]
+        elif isinstance(current, (list, tuple)):
+            try:
+                index = int(part)
+                if index < 0 or index >= len(current):
+                    raise IndexError(f"Index {index} out of bounds for array of length {len(current)}")
+                current = current[index]
+            except ValueError:
+                raise TypeError(f"Cannot use non-integer key '{part}' to index array")
+        else:
+            raise TypeError(f"Cannot access '{part}' on type {type(current)}")
+
+    return current
+
+@dataclass(frozen=True)
+class InputAccessor:
+    """Precompiled input mapping: copies a path of a dependency's output into a prompt placeholder"""
+    placeholder: str
+    source_node_id: str
+    source_output_key: str
+    path_parts: Tuple[str, ...]
+
+    def resolve(self, output: Any) -> Any:
+        return resolve_path_parts(output, self.path_parts)
+
+@dataclass(frozen=True)
+class CompiledChain:
+    """Immutable execution plan for a list of node configurations.
+
+    Holds everything ScriptChain needs to schedule nodes, so a chain definition that
+    has been seen before never needs its dependency graph rebuilt.
+    """
+    fingerprint: str
+    node_ids: Tuple[str, ...]
+    topological_order: Tuple[str, ...]
+    predecessors: Mapping[str, Tuple[str, ...]]
+    successors: Mapping[str, Tuple[str, ...]]
+    node_levels: Mapping[str, int]
+    levels: Mapping[int, Tuple[str, ...]]
+    input_accessors: Mapping[str, Mapping[str, Tuple[InputAccessor, ...]]]
+
+    def to_graph(self) -> nx.DiGraph:
+        """Materialize the plan as a networkx graph (for inspection and tooling)."""
+        graph = nx.DiGraph()
+        for node_id in self.node_ids:
+            graph.add_node(node_id, level=self.node_levels[node_id])
+        for node_id, deps in self.predecessors.items():
+            for dep in deps:
+                graph.add_edge(dep, node_id)
+        return graph
+
+_NO_ACCESSORS: Mapping[str, Tuple[InputAccessor, ...]] = MappingProxyType({})
+
+def chain_fingerprint(nodes: List[NodeConfig]) -> str:
+    """Stable hash of the parts of a node list that shape its execution plan.
+
+    Covers node order, IDs, dependencies and input mappings. Prompts, models and
+    other per-node settings do not change the plan and are deliberately left out, so
+    editing a prompt still reuses the compiled plan.
+    """
+    canonical = [
+        {
+            "id": node.id,
+            "dependencies": list(node.dependencies),
+            "input_mappings": {
+                placeholder: [mapping.source_node_id, mapping.source_output_key]
+                for placeholder, mapping in node.input_mappings.items()
+            },
+        }
+        for node in nodes
+    ]
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _find_cycle(node_ids: Sequence[str], predecessor_indices: List[List[int]], in_degree: List[int]) -> List[str]:
+    """Extract one cycle from the nodes Kahn's algorithm could not schedule.
+
+    Every unscheduled node still has an unscheduled predecessor, so walking backwards
+    along such predecessors must eventually revisit a node; the walk from that node
+    onwards is a cycle.
+    """
+    current = next(index for index, degree in enumerate(in_degree) if degree > 0)
+    position: Dict[int, int] = {}
+    walk: List[int] = []
+    while current not in position:
+        position[current] = len(walk)
+        walk.append(current)
+        current = next(pred for pred in predecessor_indices[current] if in_degree[pred] > 0)
+    cycle = walk[position[current]:]
+    cycle.reverse()
+    return [node_ids[index] for index in cycle]
+
+def _build_plan(nodes: List[NodeConfig], fingerprint: str) -> CompiledChain:
+    """Validate the dependency graph and compute the execution plan.
+
+    Uses Kahn's algorithm over index arrays: linear in nodes plus edges, and it stops
+    at the first cycle instead of enumerating all of them.
+    """
+    # Later definitions of a repeated ID win, as in ScriptChain.nodes
+    nodes = list({node.id: node for node in nodes}.values())
+    node_ids = tuple(node.id for node in nodes)
+    index_of = {node_id: index for index, node_id in enumerate(node_ids)}
+    count = len(node_ids)
+
+    # Build dependency arrays
+    predecessor_indices: List[List[int]] = [[] for _ in range(count)]
+    successor_indices: List[List[int]] = [[] for _ in range(count)]
+    for index, node in enumerate(nodes):
+        # Deduplicate while keeping declaration order
+        for dep in dict.fromkeys(node.dependencies):
+            dep_index = index_of.get(dep)
+            if dep_index is None:
+                raise ValueError(f"Dependency {dep} not found for node {node.id}")
+            predecessor_indices[index].append(dep_index)
+            successor_indices[dep_index].append(index)
+
+    # Topological sort and level assignment in a single pass
+    in_degree = [len(preds) for preds in predecessor_indices]
+    level_of = [0] * count
+    order: List[int] = [index for index in range(count) if in_degree[index] == 0]
+    head = 0
+    while head < len(order):
+        index = order[head]
+        head += 1
+        next_level = level_of[index] + 1
+        for succ in successor_indices[index]:
+            if level_of[succ] < next_level:
+                level_of[succ] = next_level
+            in_degree[succ] -= 1
+            if in_degree[succ] == 0:
+                order.append(succ)
+
+    # Check for cycles
+    if len(order) < count:
+        cycle_str = " -> ".join(_find_cycle(node_ids, predecessor_indices, in_degree))
+        raise CircularDependencyError(f"Circular dependency detected: {cycle_str}")
+
+    predecessors = {
+        node_ids[index]: tuple(node_ids[pred] for pred in preds)
+        for index, preds in enumerate(predecessor_indices)
+    }
+    successors = {
+        node_ids[index]: tuple(node_ids[succ] for succ in succs)
+        for index, succs in enumerate(successor_indices)
+    }
+    node_levels = {node_ids[index]: level_of[index] for index in range(count)}
+
+    # Group nodes by level
+    levels: Dict[int, List[str]] = {}
+    for index, node_id in enumerate(node_ids):
+        levels.setdefault(level_of[index], []).append(node_id)
+
+    # Precompile input mappings, grouped by the dependency they read from
+    input_accessors: Dict[str, Mapping[str, Tuple[InputAccessor, ...]]] = {}
+    for node in nodes:
+        if not node.input_mappings:
+            input_accessors[node.id] = _NO_ACCESSORS
+            continue
+        by_dependency: Dict[str, List[InputAccessor]] = {}
+        for placeholder, mapping in node.input_mappings.items():
+            path = mapping.source_output_key
+            by_dependency.setdefault(mapping.source_node_id, []).append(InputAccessor(
+                placeholder=placeholder,
+                source_node_id=mapping.source_node_id,
+                source_output_key=path,
+                path_parts=tuple(path.split('.')) if path else ()
+            ))
+        input_accessors[node.id] = MappingProxyType({dep: tuple(accessors) for dep, accessors in by_dependency.items()})
+
+    return CompiledChain(
+        fingerprint=fingerprint,
+        node_ids=node_ids,
+        topological_order=tuple(node_ids[index] for index in order),
+        predecessors=MappingProxyType(predecessors),
+        successors=MappingProxyType(successors),
+        node_levels=MappingProxyType(node_levels),
+        levels=MappingProxyType({level: tuple(ids) for level, ids in levels.items()}),
+        input_accessors=MappingProxyType(input_accessors)
+    )
+
+class ChainPlanCache:
+    """LRU cache of compiled plans keyed by chain fingerprint"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._plans: "OrderedDict[str, CompiledChain]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint: str) -> Optional[CompiledChain]:
+        plan = self._plans.get(fingerprint)
+        if plan is None:
+            self.misses += 1
+            return None
+        self._plans.move_to_end(fingerprint)
+        self.hits += 1
+        return plan
+
+    def put(self, plan: CompiledChain) -> None:
+        self._plans[plan.fingerprint] = plan
+        self._plans.move_to_end(plan.fingerprint)
+        while len(self._plans) > self.maxsize:
+            self._plans.popitem(last=False)
+
+    def clear(self) -> None:
+        self._plans.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._plans), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+_plan_cache = ChainPlanCache(maxsize=int(os.getenv("SCRIPTCHAIN_PLAN_CACHE_SIZE", 256)))
+
+def get_plan_cache() -> ChainPlanCache:
+    """Get the process-wide compiled plan cache"""
+    return _plan_cache
+
+def compile_chain(nodes: List[NodeConfig], cache: Optional[ChainPlanCache] = None) -> CompiledChain:
+    """Compile node configurations into an execution plan, reusing a cached plan when possible.
+
+    Args:
+        nodes: List of node configurations
+        cache: Plan cache to use (defaults to the process-wide cache)
+
+    Returns:
+        The compiled plan
+
+    Raises:
+        ValueError: If a dependency references an unknown node
+        CircularDependencyError: If the dependency graph has a cycle
+    """
+    cache = cache if cache is not None else _plan_cache
+    fingerprint = chain_fingerprint(nodes)
+    plan = cache.get(fingerprint)
+    if plan is not None:
+        logger.debug(f"Reusing compiled plan {fingerprint[:12]} for {len(nodes)} nodes")
+        return plan
+    plan = _build_plan(nodes, fingerprint)
+    cache.put(plan)
+    return plan
@@ -1,36 +1,49 @@
 """
-Enhanced workflow orchestration system with level-based parallel execution and robust context management
+Enhanced workflow orchestration system with dependency-driven parallel execution and robust context management
 """
 
 from datetime import datetime
 import networkx as nx
-from typing import Dict, List, Optional, Any, Union, Set, Tuple, Callable
+from typing import AsyncIterator, Dict, List, Optional, Any, Union, Set, Tuple, Callable
 from pydantic import BaseModel, ValidationError
 from app.models.node_models import NodeConfig, NodeExecutionResult, NodeMetadata, UsageMetadata
 from app.models.config import LLMConfig, MessageTemplate, ModelProvider
 from app.utils.context import GraphContextManager
 from app.nodes.base import BaseNode
 from app.nodes.factory import node_factory
+from app.nodes.pool import NodePool, get_node_pool
 from app.utils.callbacks import ScriptChainCallback
 from app.utils.token_counter import TokenCounter
+from app.utils.execution_history import ExecutionHistory, get_execution_history
+from app.utils.result_store import ResultStore, get_result_store, output_hash, result_key
+from app.utils.execution_journal import ExecutionJournal
+from app.utils.expressions import ExpressionError, compile_expression
+from app.services.execution_budget import ExecutionBudget, get_execution_budget
+from app.chains.compiler import (
+    CompiledChain,
+    ChainPlanCache,
+    CircularDependencyError,
+    ScriptChainError,
+    compile_chain,
+    resolve_path_parts
+)
 import logging
 from uuid import uuid4
 import asyncio
 import os
 import traceback
 import json
+import heapq
+import time
 from collections import deque
 
 logger = logging.getLogger(__name__)
 
-# Custom exceptions for better error handling
-class ScriptChainError(Exception):
-    """Base exception class for ScriptChain errors"""
-    pass
+# Ready-queue ordering policies
+SCHEDULING_POLICIES = ("critical_path", "fifo")
 
-class CircularDependencyError(ScriptChainError):
-    """Exception raised when circular dependencies are detected"""
-    pass
+# Extra time a node gets past NodeConfig.timeout to report its own timeout before it is cancelled
+NODE_TIMEOUT_GRACE = 0.5
 
 def resolve_nested_path(data: Any, path: str) -> Any:
     """Resolve a nested path like 'concepts.0' or 'data.items.1.name' in the data structure.
@@ -49,30 +62,10 @@ def resolve_nested_path(data: Any, path: str) -> Any:
     """
     if not path:
         return data
-        
-    parts = path.split('.')
-    current = data
-    
-    for part in parts:
-        if isinstance(current, dict):
-            if part not in current:
-                raise KeyError(f"Key '{part}' not found in dict. Available keys: {list(current.keys())}")
-            current = current[part]
-        elif isinstance(current, (list, tuple)):
-            try:
-                index = int(part)
-                if index < 0 or index >= len(current):
-                    raise IndexError(f"Index {index} out of bounds for array of length {len(current)}")
-                current = current[index]
-            except ValueError:
-                raise TypeError(f"Cannot use non-integer key '{part}' to index array")
-        else:
-            raise TypeError(f"Cannot access '{part}' on type {type(current)}")
-    
-    return current
+    return resolve_path_parts(data, path.split('.'))
 
 class ScriptChain:
-    """Advanced workflow orchestrator with level-based parallel execution"""
+    """Advanced workflow orchestrator with dependency-driven parallel execution"""
     
     def __init__(
         self,
@@ -82,7 +75,17 @@ class ScriptChain:
         callbacks: Optional[List[ScriptChainCallback]] = None,
         max_parallel: int = 5,
         persist_intermediate_outputs: bool = True,
-        tool_service: Optional[Any] = None
+        tool_service: Optional[Any] = None,
+        scheduling: str = "critical_path",
+        execution_history: Optional[ExecutionHistory] = None,
+        execution_budget: Optional[ExecutionBudget] = None,
+        plan_cache: Optional[ChainPlanCache] = None,
+        incremental: bool = False,
+        result_store: Optional[ResultStore] = None,
+        journal: Optional[ExecutionJournal] = None,
+        release_intermediate_outputs: bool = False,
+        node_pool: Optional[NodePool] = None,
+        llm_service: Optional[Any] = None
     ):
         """Initialize the script chain.
         
@@ -91,11 +94,45 @@ class ScriptChain:
             name: Optional name for the chain (defaults to 'chain-{uuid}')
             context_manager: Optional context manager for global context persistence.
             callbacks: Optional list of callbacks
-            max_parallel: Maximum number of parallel executions
+            max_parallel: Maximum number of parallel executions within this chain
             persist_intermediate_outputs: If True, persist output of each node in the chain
                                           to the global context manager.
             tool_service: Optional tool service for node execution
+            scheduling: Order in which ready nodes are started when more are ready than
+                        max_parallel allows. 'critical_path' starts the node with the
+                        longest expected remaining downstream path first; 'fifo' starts
+                        them in the order they became ready.
+            execution_history: Optional per-node duration history used to weight the
+                               critical path (defaults to the process-wide history);
+                               records are kept per chain plan fingerprint
+            execution_budget: Optional execution budget shared with other chains; every node
+                              holds one of its slots while executing (defaults to the
+                              process-wide budget)
+            plan_cache: Optional cache of compiled plans (defaults to the process-wide cache);
+                        repeat submissions of the same chain skip graph building
+            incremental: If True, reuse stored results for nodes whose configuration and
+                         upstream outputs are unchanged since a previous run, so only the
+                         dirty part of the chain is executed
+            result_store: Optional content-addressed result store used when incremental
+                          (defaults to the process-wide store)
+            journal: Optional execution journal; every finished node is appended to it
+                     under this chain's ID so the execution can be resumed after a crash
+            release_intermediate_outputs: If True, drop a node's output from memory as soon
+                                          as every dependent has finished with it. Only the
+                                          terminal nodes (or the requested targets) keep their
+                                          output in the chain result; released nodes stay in it
+                                          with ``output=None``. Persisted outputs are evicted
+                                          from the context manager's cache but remain in its
+                                          store.
+            node_pool: Optional pool of node instances (defaults to the process-wide pool);
+                       nodes whose configuration was seen before are reused instead of
+                       being rebuilt on every execution
+            llm_service: Optional LLM service for the chain's nodes (defaults to the
+                         process-wide LLMService); share a BulkLLMService between chains
+                         to run their LLM calls as provider batch jobs
         """
+        if scheduling not in SCHEDULING_POLICIES:
+            raise ValueError(f"Unknown scheduling policy '{scheduling}'. Valid options: {', '.join(SCHEDULING_POLICIES)}")
         self.nodes = {node.id: node for node in nodes}
         self.global_context_manager = context_manager or GraphContextManager()
         self.callbacks = callbacks or []
@@ -103,89 +140,304 @@ class ScriptChain:
         self.chain_id = str(uuid4())
         self.name = name or f"chain-{self.chain_id[:8]}"  # Use first 8 chars of UUID if no name provided
         self.persist_intermediate_outputs = persist_intermediate_outputs
+        self.release_intermediate_outputs = release_intermediate_outputs
+        self.node_pool = node_pool or get_node_pool()
         self.metrics = {
             'total_tokens': 0,
             'node_execution_times': {},
             'provider_usage': {},
             'token_usage': {},
+            'reused_nodes': [],
+            'released_nodes': [],
+            'routes': {},
             'chain_name': self.name
         }
         self.tool_service = tool_service
+        self.llm_service = llm_service
+        self.scheduling = scheduling
+        self.execution_history = execution_history or get_execution_history()
+        self.execution_budget = execution_budget or get_execution_budget()
+        self.incremental = incremental
+        self.result_store = result_store or get_result_store()
+        # Output hash per successful node of the current run (incremental mode only)
+        self._output_hashes: Dict[str, str] = {}
+        self._reused_nodes: Set[str] = set()
+        # Branch roots of routes not taken by a router, and nodes skipped because of them
+        self._untaken_nodes: Set[str] = set()
+        self._skipped_nodes: Set[str] = set()
+        self.journal = journal
+        # Successful results recovered from the journal by resume()
+        self._resumed_results: Optional[Dict[str, NodeExecutionResult]] = None
+        self._resumed_inputs: Optional[Dict[str, Any]] = None
+        self._resumed_targets: Optional[List[str]] = None
+        # Chain-level inputs of the current run, visible to every node
+        self._inputs: Dict[str, Any] = {}
+        self._inputs_hash: Optional[str] = None
+        # Chain-level result of the most recent completed execution
+        self.last_result: Optional[NodeExecutionResult] = None
+        
+        # Compile (or reuse) the execution plan; raises on unknown dependencies and cycles
+        self.plan: CompiledChain = compile_chain(nodes, cache=plan_cache)
+        self.topological_order = list(self.plan.topological_order)
+        for node_id, level in self.plan.node_levels.items():
+            self.nodes[node_id].level = level
+        self.levels = {level: list(node_ids) for level, node_ids in self.plan.levels.items()}
+        self._graph: Optional[nx.DiGraph] = None
+        self._validate_routers()
+            
+        logger.info(f"Initialized ScriptChain with {len(nodes)} nodes in {len(self.levels)} levels")
         
-        # Build dependency graph
-        self.graph = nx.DiGraph()
-        for node_id, node in self.nodes.items():
-            self.graph.add_node(node_id, level=0)
-            for dep in node.dependencies:
-                if dep not in self.nodes:
-                    raise ValueError(f"Dependency {dep} not found for node {node_id}")
-                self.graph.add_edge(dep, node_id)
+    @classmethod
+    def resume(cls, chain_id: str, journal: ExecutionJournal, api_keys: Optional[Dict[str, str]] = None, **kwargs) -> "ScriptChain":
+        """Rebuild a journaled chain so that executing it only runs unfinished nodes.
         
-        # Check for cycles
-        try:
-            cycles = list(nx.simple_cycles(self.graph))
-            if cycles:
-                cycle_str = " -> ".join(cycles[0])
-                raise CircularDependencyError(f"Circular dependency detected: {cycle_str}")
-        except nx.NetworkXNoCycle:
-            pass
-            
-        # Assign levels for parallel execution
-        for node_id in nx.topological_sort(self.graph):
-            node = self.nodes[node_id]
-            node.level = max(
-                (self.nodes[dep].level for dep in node.dependencies),
-                default=-1
-            ) + 1
+        Args:
+            chain_id: ID of the interrupted chain
+            journal: Journal the chain was written to
+            api_keys: API keys by provider for the nodes' LLM configs. Journals never hold
+                      keys, so nodes of any other provider use its environment variable.
+            **kwargs: Constructor arguments (e.g. context_manager, tool_service); they
+                      override the options recorded in the journal
             
-        # Group nodes by level
-        self.levels = {}
-        for node_id, node in self.nodes.items():
-            level = node.level
-            if level not in self.levels:
-                self.levels[level] = []
-            self.levels[level].append(node_id)
+        Returns:
+            ScriptChain with the original chain ID, seeded with the completed results
             
-        logger.info(f"Initialized ScriptChain with {len(nodes)} nodes in {len(self.levels)} levels")
-        
-    async def execute(self) -> NodeExecutionResult:
+        Raises:
+            JournalNotFoundError: If the journal has no record of the chain
+        """
+        record = journal.load(chain_id)
+        for node in record.nodes:
+            provider = getattr(node.llm_config, "provider", None)
+            if api_keys and provider in api_keys:
+                node.llm_config = node.llm_config.model_copy(update={"api_key": api_keys[provider]})
+        options = {**record.options, **kwargs}
+        chain = cls(nodes=record.nodes, name=record.name, journal=journal, **options)
+        chain.chain_id = chain_id
+        chain._resumed_results = record.completed_results
+        chain._resumed_inputs = record.inputs
+        chain._resumed_targets = record.targets
+        logger.info(f"Resuming chain '{chain.name}' (ID: {chain_id}) with {len(chain._resumed_results)} of {len(chain.nodes)} nodes already completed")
+        return chain
+        
+    @property
+    def graph(self) -> nx.DiGraph:
+        """Dependency graph of the chain, built from the compiled plan on first access"""
+        if self._graph is None:
+            self._graph = self.plan.to_graph()
+        return self._graph
+        
+    async def execute(self, targets: Optional[List[str]] = None, inputs: Optional[Dict[str, Any]] = None) -> NodeExecutionResult:
         """Execute the workflow.
         
+        Nodes are scheduled from a ready queue: a node starts as soon as every one of its
+        predecessors in the compiled plan has finished, rather than waiting for the whole
+        previous level. At most ``max_parallel`` nodes run at any time; when more are
+        ready, the scheduling policy decides which start first.
+        
+        Args:
+            targets: Optional node IDs whose outputs are needed. Only these nodes and their
+                     ancestors are executed; every other node is reported in
+                     ``skipped_nodes``. Defaults to executing the whole chain.
+            inputs: Optional chain-level inputs (e.g. one record of a batch). They are added
+                    to every node's context; dependency outputs take precedence on clashes.
+        
         Returns:
             NodeExecutionResult containing the final output and metadata
+            
+        Raises:
+            ValueError: If a target is not a node of this chain
+        """
+        async for _ in self.execute_stream(targets=targets, inputs=inputs):
+            pass
+        return self.last_result
+        
+    async def execute_stream(
+        self,
+        targets: Optional[List[str]] = None,
+        inputs: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[NodeExecutionResult]:
+        """Execute the workflow, yielding each node's result as soon as it finishes.
+        
+        Results recovered by resume() are yielded first. Once the stream is exhausted the
+        chain-level result that execute() returns is available as ``last_result``.
+        Closing the stream early (e.g. when a client disconnects) cancels the nodes that
+        are still running.
+        
+        Args:
+            targets: Optional node IDs whose outputs are needed (see execute()); a resumed
+                     chain defaults to the targets of the interrupted run
+            inputs: Optional chain-level inputs (see execute()); a resumed chain defaults
+                    to the inputs of the interrupted run
+            
+        Yields:
+            NodeExecutionResult of every node, in completion order
+            
+        Raises:
+            ValueError: If a target is not a node of this chain
         """
         start_time = datetime.utcnow()
         results = {}
         errors = []
+        self.last_result = None
         
-        logger.info(f"Starting execution of chain '{self.name}' (ID: {self.chain_id})")
+        if targets is None and self._resumed_targets is not None:
+            targets = self._resumed_targets
+        selected = self.get_ancestors(targets, include_self=True) if targets is not None else set(self.nodes)
         
-        # Execute each level in sequence
-        for level_num in sorted(self.levels.keys()):
-            level_start_time = datetime.utcnow()
-            level_node_outputs = await self._execute_level(level_num, results)
+        logger.info(f"Starting execution of chain '{self.name}' (ID: {self.chain_id})")
+        self._output_hashes = {}
+        self._reused_nodes = set()
+        self._untaken_nodes = set()
+        self._skipped_nodes = set()
+        if inputs is None and self._resumed_inputs is not None:
+            inputs = self._resumed_inputs
+        self._inputs = dict(inputs or {})
+        self._inputs_hash = output_hash(self._inputs) if self._inputs else None
+        
+        # Nodes completed before a crash count as finished without running again
+        completed = self._resumed_results or {}
+        results.update(completed)
+        if self.incremental:
+            for node_id, result_obj in completed.items():
+                self._output_hashes[node_id] = output_hash(result_obj.output)
+        if self._resumed_results is not None:
+            await self._write_journal("resume_chain", self.chain_id)
+            self._resumed_results = None
+            self._resumed_inputs = None
+            self._resumed_targets = None
+        else:
+            await self._write_journal("start_chain", self.chain_id, self.name, list(self.nodes.values()), {
+                "max_parallel": self.max_parallel,
+                "persist_intermediate_outputs": self.persist_intermediate_outputs,
+                "scheduling": self.scheduling,
+                "incremental": self.incremental,
+                "release_intermediate_outputs": self.release_intermediate_outputs
+            }, self._inputs, targets)
+        
+        priorities = self.get_critical_path_priorities() if self.scheduling == "critical_path" else {}
+        
+        # In-degree counters: number of unfinished predecessors per node
+        remaining_dependencies = {node_id: len(self.plan.predecessors[node_id]) for node_id in selected}
+        for node_id in completed:
+            for dependent_id in self.plan.successors[node_id]:
+                if dependent_id in remaining_dependencies:
+                    remaining_dependencies[dependent_id] -= 1
+        # Ready queue entries are (-priority, sequence, node_id); ties keep ready order
+        ready: List[Tuple[float, int, str]] = []
+        sequence = 0
+        
+        def mark_ready(node_id: str) -> None:
+            nonlocal sequence
+            heapq.heappush(ready, (-priorities.get(node_id, 0.0), sequence, node_id))
+            sequence += 1
             
-            # Process level results
-            for node_id, result_obj in level_node_outputs.items():
-                if result_obj.success:
-                    results[node_id] = result_obj
-                    # Update metrics
-                    if result_obj.usage:
-                        self._update_metrics(node_id, result_obj)
-                else:
-                    errors.append(f"Node {node_id} failed: {result_obj.error}")
+        # Remaining-consumer refcounts: selected dependents that still have to read each
+        # output. Terminal nodes (or the requested targets) are never released.
+        remaining_consumers: Dict[str, int] = {}
+        if self.release_intermediate_outputs:
+            remaining_consumers = {
+                node_id: sum(1 for dependent_id in self.plan.successors[node_id]
+                             if dependent_id in selected and dependent_id not in completed)
+                for node_id in selected
+            }
+            kept = set(targets) if targets is not None else {
+                node_id for node_id in selected
+                if not any(dependent_id in selected for dependent_id in self.plan.successors[node_id])
+            }
+            for node_id in kept:
+                remaining_consumers.pop(node_id, None)
+            for node_id in completed:
+                if remaining_consumers.get(node_id) == 0:
+                    self._release_output(node_id, results)
                     
-            # Check if we should continue
-            if errors and not self._should_continue(errors):
-                break
+        def settle(node_id: str) -> None:
+            # A node has finished (or was skipped): drop outputs it was the last consumer
+            # of and release dependents whose predecessors have now all finished. Nodes on
+            # untaken router branches are skipped here, cascading to their own dependents.
+            pending = [node_id]
+            while pending:
+                current = pending.pop()
+                for dependency_id in self.plan.predecessors[current]:
+                    if dependency_id in remaining_consumers:
+                        remaining_consumers[dependency_id] -= 1
+                        if remaining_consumers[dependency_id] == 0:
+                            self._release_output(dependency_id, results)
+                if remaining_consumers.get(current) == 0:
+                    self._release_output(current, results)
+                for dependent_id in self.plan.successors[current]:
+                    if dependent_id not in remaining_dependencies:
+                        continue
+                    remaining_dependencies[dependent_id] -= 1
+                    if remaining_dependencies[dependent_id] == 0:
+                        if self._should_skip(dependent_id):
+                            self._skip_node(dependent_id)
+                            pending.append(dependent_id)
+                        else:
+                            mark_ready(dependent_id)
+                            
+        # Routers that finished before a crash still decide which branches run
+        for node_id, result_obj in completed.items():
+            if self.nodes[node_id].type == "router":
+                self._apply_route(node_id, result_obj)
+        for node_id in [node_id for node_id, count in remaining_dependencies.items() if count == 0 and node_id not in completed]:
+            if self._should_skip(node_id):
+                self._skip_node(node_id)
+                settle(node_id)
+            else:
+                mark_ready(node_id)
+        running: Dict[asyncio.Task, str] = {}
+        
+        def launch_ready() -> None:
+            # Start as many ready nodes as the parallelism cap allows
+            while ready and len(running) < self.max_parallel:
+                _, _, node_id = heapq.heappop(ready)
+                task = asyncio.create_task(self._run_node(node_id, results))
+                running[task] = node_id
+        
+        try:
+            for result_obj in completed.values():
+                yield result_obj
+                
+            launch_ready()
+            while running:
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                finished = []
+                for task in done:
+                    node_id = running.pop(task)
+                    _, result_obj = task.result()
+                    await self._write_journal("record_result", self.chain_id, node_id, result_obj)
+                    if result_obj.success:
+                        results[node_id] = result_obj
+                        if self.nodes[node_id].type == "router":
+                            self._apply_route(node_id, result_obj)
+                    else:
+                        errors.append(f"Node {node_id} failed: {result_obj.error}")
+                    settle(node_id)
+                    finished.append(result_obj)
+                    
+                # Keep the chain busy while the consumer handles the finished results
+                launch_ready()
+                for result_obj in finished:
+                    yield result_obj
+        finally:
+            for task in running:
+                task.cancel()
+            await self.execution_history.save_async()
+            if self.incremental:
+                await self.result_store.save_async()
+        await self._write_journal("finish_chain", self.chain_id, len(errors) == 0)
                 
         # Prepare final result
         end_time = datetime.utcnow()
         duration = (end_time - start_time).total_seconds()
         
         logger.info(f"Completed execution of chain '{self.name}' (ID: {self.chain_id}) in {duration:.2f} seconds")
+        skipped_nodes = [
+            node_id for node_id in self.nodes
+            if node_id in self._skipped_nodes or (node_id not in selected and node_id not in results)
+        ]
         
-        return NodeExecutionResult(
+        self.last_result = NodeExecutionResult(
             success=len(errors) == 0,
             output=results,
             error="\n".join(errors) if errors else None,
@@ -199,6 +451,7 @@ class ScriptChain:
                 duration=duration
             ),
             execution_time=duration,
+            skipped_nodes=skipped_nodes or None,
             token_stats={
                 "total_tokens": self.metrics["total_tokens"],
                 "provider_usage": self.metrics["provider_usage"],
@@ -207,162 +460,261 @@ class ScriptChain:
             }
         )
         
-    async def _execute_level(self, level: int, accumulated_results: Dict[str, NodeExecutionResult]) -> Dict[str, NodeExecutionResult]:
-        """Execute all nodes in a level in parallel.
+    async def _run_node(self, node_id: str, accumulated_results: Dict[str, NodeExecutionResult]) -> Tuple[str, NodeExecutionResult]:
+        """Execute a node while holding a slot of the shared execution budget.
+        
+        The node's duration is measured from the moment it gets its slot, so time spent
+        queueing behind other chains does not distort the execution history.
+        """
+        async with self.execution_budget.slot(self.chain_id):
+            started_at = time.perf_counter()
+            node_id, result = await self._process_node(node_id, accumulated_results)
+        # Reused results took no real work and would skew the duration averages
+        if node_id not in self._reused_nodes:
+            self.execution_history.record(self.plan.fingerprint, node_id, result, time.perf_counter() - started_at)
+        return node_id, result
+        
+    async def _process_node(self, node_id: str, accumulated_results: Dict[str, NodeExecutionResult]) -> Tuple[str, NodeExecutionResult]:
+        """Build the context for a single node and execute it.
+        
+        Called once all of the node's dependencies have finished (successfully or not).
         
         Args:
-            level: Level number to execute
-            accumulated_results: Dictionary of results from previously completed levels
+            node_id: ID of the node to execute
+            accumulated_results: Dictionary of successful results from finished nodes
             
         Returns:
-            Dictionary mapping node IDs to their execution results for the current level
+            Tuple of the node ID and its execution result
         """
-        level_start_time = datetime.utcnow()
-        semaphore = asyncio.Semaphore(self.max_parallel)
+        start_time = datetime.utcnow()
+        node = self.nodes[node_id]
         
-        async def process_node(node_id: str) -> Tuple[str, NodeExecutionResult]:
-            async with semaphore:
-                start_time = datetime.utcnow()
-                node = self.nodes[node_id]
-                
-                # Create node instance
-                try:
-                    node_instance = node_factory(
-                        node_config=node,
-                        context_manager=self.global_context_manager,
-                        llm_config=node.llm_config,
-                        callbacks=self.callbacks,
-                        tool_service=self.tool_service
-                    )
-                except Exception as e:
-                    raise ValueError(f"Failed to instantiate node '{node.id}': {e}")
-                
-                try:
-                    # Get context for node
-                    context = {}
-                    missing_dependencies = []
-                    validation_errors = []
+        # Get a node instance (reused when this configuration has been built before)
+        try:
+            node_instance = self.node_pool.acquire(
+                node_factory,
+                node_config=node,
+                context_manager=self.global_context_manager,
+                llm_config=node.llm_config,
+                callbacks=self.callbacks,
+                tool_service=self.tool_service,
+                max_parallel=self.max_parallel,
+                llm_service=self.llm_service
+            )
+        except Exception as e:
+            raise ValueError(f"Failed to instantiate node '{node.id}': {e}")
+        
+        try:
+            # Get context for node, starting from the chain-level inputs
+            context = dict(self._inputs)
+            missing_dependencies = []
+            validation_errors = []
+            
+            # Add dependencies' outputs to context
+            for dep_id in node.dependencies:
+                if dep_id in self._skipped_nodes:
+                    # On an untaken router branch; the node runs with the outputs it has
+                    continue
+                dep_result = accumulated_results.get(dep_id)
+                if not dep_result or not dep_result.success:
+                    missing_dependencies.append(dep_id)
+                    continue
                     
-                    # Add dependencies' outputs to context
-                    for dep_id in node.dependencies:
-                        dep_result = accumulated_results.get(dep_id)
-                        if not dep_result or not dep_result.success:
-                            missing_dependencies.append(dep_id)
-                            continue
-                            
-                        if not dep_result.output:
-                            validation_errors.append(f"Dependency '{dep_id}' produced no output")
+                if not dep_result.output:
+                    validation_errors.append(f"Dependency '{dep_id}' produced no output")
+                    continue
+                    
+                # Use explicit input mappings if defined
+                if node.input_mappings:
+                    for accessor in self.plan.input_accessors[node_id].get(dep_id, ()):
+                        try:
+                            value_from_dependency = accessor.resolve(dep_result.output)
+                        except (KeyError, IndexError, TypeError) as e:
+                            validation_errors.append(
+                                f"Node '{node.id}': Failed to resolve path '{accessor.source_output_key}' "
+                                f"in dependency '{dep_id}' output: {str(e)}"
+                            )
                             continue
                             
-                        # Use explicit input mappings if defined
-                        if node.input_mappings:
-                            for current_prompt_placeholder, mapping_config in node.input_mappings.items():
-                                if mapping_config.source_node_id != dep_id:
-                                    continue
-                                    
-                                try:
-                                    value_from_dependency = resolve_nested_path(
-                                        dep_result.output, 
-                                        mapping_config.source_output_key
-                                    )
-                                except (KeyError, IndexError, TypeError) as e:
-                                    validation_errors.append(
-                                        f"Node '{node.id}': Failed to resolve path '{mapping_config.source_output_key}' "
-                                        f"in dependency '{dep_id}' output: {str(e)}"
-                                    )
-                                    continue
-                                    
-                                context[current_prompt_placeholder] = value_from_dependency
+                        context[accessor.placeholder] = value_from_dependency
+                else:
+                    # Fallback: use dependency output directly
+                    # This maintains backward compatibility
+                    if isinstance(dep_result.output, dict):
+                        if 'text' in dep_result.output:
+                            context[dep_id] = str(dep_result.output['text'])
+                        elif 'result' in dep_result.output:
+                            context[dep_id] = dep_result.output['result']
                         else:
-                            # Fallback: use dependency output directly
-                            # This maintains backward compatibility
-                            if isinstance(dep_result.output, dict):
-                                if 'text' in dep_result.output:
-                                    context[dep_id] = str(dep_result.output['text'])
-                                elif 'result' in dep_result.output:
-                                    context[dep_id] = dep_result.output['result']
-                                else:
-                                    context[dep_id] = dep_result.output
-                            else:
-                                context[dep_id] = dep_result.output
-                    
-                    # Check for missing dependencies
-                    if missing_dependencies:
-                        error_msg = f"Node '{node.id}' skipped: Required dependencies failed or missing: {missing_dependencies}"
-                        logger.warning(error_msg)
-                        error_result = NodeExecutionResult(
-                            success=False,
-                            error=error_msg,
-                            metadata=NodeMetadata(
-                                node_id=node_id,
-                                node_type=node.type,
-                                start_time=start_time,
-                                end_time=datetime.utcnow(),
-                                error_type="MissingDependencyError",
-                                provider=node.provider
-                            )
-                        )
-                        await self._trigger_callbacks('node_error', error_result)
-                        return node_id, error_result
-                        
-                    # Check for validation errors
-                    if validation_errors:
-                        error_msg = f"Node '{node.id}' validation failed:\n" + "\n".join(validation_errors)
-                        logger.error(error_msg)
-                        error_result = NodeExecutionResult(
-                            success=False,
-                            error=error_msg,
-                            metadata=NodeMetadata(
-                                node_id=node_id,
-                                node_type=node.type,
-                                start_time=start_time,
-                                end_time=datetime.utcnow(),
-                                error_type="ValidationError",
-                                provider=node.provider
-                            )
-                        )
-                        await self._trigger_callbacks('node_error', error_result)
-                        return node_id, error_result
-                    
-                    # Execute node
-                    logger.debug(f"Node '{node.id}' (Name: '{node.name}') executing with context: {json.dumps(context, indent=2, default=str)}")
+                            context[dep_id] = dep_result.output
+                    else:
+                        context[dep_id] = dep_result.output
+            
+            # Check for missing dependencies
+            if missing_dependencies:
+                error_msg = f"Node '{node.id}' skipped: Required dependencies failed or missing: {missing_dependencies}"
+                logger.warning(error_msg)
+                error_result = NodeExecutionResult(
+                    success=False,
+                    error=error_msg,
+                    metadata=NodeMetadata(
+                        node_id=node_id,
+                        node_type=node.type,
+                        start_time=start_time,
+                        end_time=datetime.utcnow(),
+                        error_type="MissingDependencyError",
+                        provider=node.provider
+                    )
+                )
+                await self._trigger_callbacks('node_error', error_result)
+                return node_id, error_result
+                
+            # Check for validation errors
+            if validation_errors:
+                error_msg = f"Node '{node.id}' validation failed:\n" + "\n".join(validation_errors)
+                logger.error(error_msg)
+                error_result = NodeExecutionResult(
+                    success=False,
+                    error=error_msg,
+                    metadata=NodeMetadata(
+                        node_id=node_id,
+                        node_type=node.type,
+                        start_time=start_time,
+                        end_time=datetime.utcnow(),
+                        error_type="ValidationError",
+                        provider=node.provider
+                    )
+                )
+                await self._trigger_callbacks('node_error', error_result)
+                return node_id, error_result
+            
+            # Reuse a stored result when neither the node nor its inputs have changed
+            key = None
+            stored = None
+            if self.incremental:
+                key = result_key(
+                    node,
+                    getattr(node_instance, "llm_config", node.llm_config),
+                    [(dep_id, self._output_hashes.get(dep_id)) for dep_id in self.plan.predecessors[node_id]],
+                    self._inputs_hash
+                )
+                stored = self.result_store.get(key)
+                
+            if stored is not None:
+                result, self._output_hashes[node_id] = stored
+                self._reused_nodes.add(node_id)
+                self.metrics['reused_nodes'].append(node_id)
+                logger.info(f"Node '{node.id}' unchanged since a previous run; reusing stored result")
+            else:
+                # Execute node
+                logger.debug(f"Node '{node.id}' (Name: '{node.name}') executing with context: {json.dumps(context, indent=2, default=str)}")
+                if node.timeout is not None:
+                    # Backstop for node types that do not enforce their own deadline
+                    try:
+                        result = await asyncio.wait_for(node_instance.execute(context), node.timeout + NODE_TIMEOUT_GRACE)
+                    except asyncio.TimeoutError:
+                        raise TimeoutError(f"Node '{node.id}' timed out after {node.timeout}s")
+                else:
                     result = await node_instance.execute(context)
-                    
-                    # Update context and metrics
-                    if result.success:
-                        if self.persist_intermediate_outputs:
-                            self.global_context_manager.update_context(
-                                node_id,
-                                result.output,
-                                execution_id=self.chain_id
-                            )
-                        self._update_metrics(node_id, result)
-                    
-                    await self._trigger_callbacks('node_end', result)
-                    
-                    return node_id, result
-                    
-                except Exception as e:
-                    error_result = NodeExecutionResult(
-                        success=False,
-                        error=str(e),
-                        metadata=NodeMetadata(
-                            node_id=node_id,
-                            node_type=node.type,
-                            start_time=start_time,
-                            end_time=datetime.utcnow(),
-                            error_type=e.__class__.__name__,
-                            provider=node.provider
-                        )
+                if key is not None and result.success:
+                    self._output_hashes[node_id] = self.result_store.put(key, result)
+            
+            # Update context and metrics
+            if result.success:
+                if self.persist_intermediate_outputs:
+                    self.global_context_manager.update_context(
+                        node_id,
+                        result.output,
+                        execution_id=self.chain_id
                     )
-                    await self._trigger_callbacks('node_error', error_result)
-                    return node_id, error_result
+                if stored is None:
+                    self._update_metrics(node_id, result)
+            
+            await self._trigger_callbacks('node_end', result)
+            
+            return node_id, result
+            
+        except Exception as e:
+            error_result = NodeExecutionResult(
+                success=False,
+                error=str(e),
+                metadata=NodeMetadata(
+                    node_id=node_id,
+                    node_type=node.type,
+                    start_time=start_time,
+                    end_time=datetime.utcnow(),
+                    error_type=e.__class__.__name__,
+                    provider=node.provider
+                )
+            )
+            await self._trigger_callbacks('node_error', error_result)
+            return node_id, error_result
+        
+    def _validate_routers(self) -> None:
+        """Check that every route starts at direct dependents of its router.
+        
+        Raises:
+            ValueError: If a route names an unknown node or one that does not depend on
+                        the router, or if a routing expression is invalid
+        """
+        for node_id, node in self.nodes.items():
+            if node.type != "router" or node.router_config is None:
+                continue
+            for route, branch in node.router_config.routes.items():
+                for branch_id in branch:
+                    if branch_id not in self.nodes:
+                        raise ValueError(f"Route '{route}' of router '{node_id}' references unknown node '{branch_id}'")
+                    if node_id not in self.nodes[branch_id].dependencies:
+                        raise ValueError(f"Node '{branch_id}' on route '{route}' must depend on router '{node_id}'")
+            if node.router_config.expression:
+                try:
+                    compile_expression(node.router_config.expression)
+                except ExpressionError as e:
+                    raise ValueError(f"Router '{node_id}': {e}")
+        
+    def _apply_route(self, node_id: str, result: NodeExecutionResult) -> None:
+        """Record a router's decision; the roots of every other route will be skipped"""
+        route = (result.output or {}).get("route")
+        routes = self.nodes[node_id].router_config.routes
+        taken = set(routes.get(route, ()))
+        for name, branch in routes.items():
+            if name != route:
+                self._untaken_nodes.update(dependent_id for dependent_id in branch if dependent_id not in taken)
+        self.metrics['routes'][node_id] = route
+        
+    def _should_skip(self, node_id: str) -> bool:
+        """Whether a node whose predecessors have all finished lies on an untaken branch.
+        
+        Route roots that were not chosen are skipped, as is any node with at least one
+        skipped dependency and no dependencies other than skipped nodes and routers. A
+        node that joins a taken and an untaken branch still runs.
+        """
+        if node_id in self._untaken_nodes:
+            return True
+        dependencies = self.plan.predecessors[node_id]
+        return any(dep_id in self._skipped_nodes for dep_id in dependencies) and all(
+            dep_id in self._skipped_nodes or self.nodes[dep_id].type == "router" for dep_id in dependencies
+        )
+        
+    def _skip_node(self, node_id: str) -> None:
+        self._skipped_nodes.add(node_id)
+        logger.info(f"Skipping node '{node_id}': on an untaken router branch")
         
-        # Execute all nodes in the level
-        tasks = [process_node(node_id) for node_id in self.levels[level]]
-        current_level_node_outputs = dict(await asyncio.gather(*tasks))
+    def _release_output(self, node_id: str, results: Dict[str, NodeExecutionResult]) -> None:
+        """Drop a node's output once no remaining dependent needs it.
         
-        return current_level_node_outputs
+        The result stays in ``results`` (dependents only check its success) but without
+        its output, and a persisted copy is evicted from the context manager's cache so
+        it is only held in the context store.
+        """
+        result = results.get(node_id)
+        if result is None or result.output is None:
+            return
+        results[node_id] = result.model_copy(update={"output": None})
+        if self.persist_intermediate_outputs:
+            self.global_context_manager.evict_cached(node_id)
+        self.metrics['released_nodes'].append(node_id)
+        logger.debug(f"Released output of node '{node_id}'; no remaining consumers")
         
     def _update_metrics(self, node_id: str, result: NodeExecutionResult) -> None:
         """Update chain metrics with node execution results"""
@@ -376,11 +728,13 @@ class ScriptChain:
                 self.metrics['provider_usage'][provider] = {
                     'prompt_tokens': 0,
                     'completion_tokens': 0,
-                    'total_tokens': 0
+                    'total_tokens': 0,
+                    'cached_prompt_tokens': 0
                 }
             self.metrics['provider_usage'][provider]['prompt_tokens'] += result.usage.prompt_tokens
             self.metrics['provider_usage'][provider]['completion_tokens'] += result.usage.completion_tokens
             self.metrics['provider_usage'][provider]['total_tokens'] += result.usage.total_tokens
+            self.metrics['provider_usage'][provider]['cached_prompt_tokens'] += result.usage.cached_prompt_tokens
             
             # Update token usage by model
             model = result.usage.model
@@ -390,55 +744,19 @@ class ScriptChain:
             
         self.metrics['node_execution_times'][node_id] = datetime.utcnow()
         
-    def _should_continue(self, errors: List[str]) -> bool:
-        """Determine if execution should continue after errors.
-        
-        This method implements intelligent error handling:
-        - Continue if there are nodes that can still execute (don't depend on failed nodes)
-        - Stop only if all remaining nodes are blocked by failed dependencies
+    async def _write_journal(self, method: str, *args: Any) -> None:
+        """Call a journal method if journaling is enabled; journal failures never fail the chain.
         
-        Args:
-            errors: List of error messages
-            
-        Returns:
-            True if execution should continue, False otherwise
+        The write (and its fsync) runs in a worker thread so disk latency does not stall
+        the event loop; awaiting it keeps the chain's records in order.
         """
-        if not errors:
-            return True
+        if self.journal is None:
+            return
+        try:
+            await asyncio.to_thread(getattr(self.journal, method), *args)
+        except Exception as e:
+            logger.error(f"Error writing execution journal for chain {self.chain_id}: {str(e)}")
             
-        # Get list of failed node IDs from error messages
-        failed_nodes = set()
-        for error in errors:
-            # Extract node ID from error messages like "Node xyz failed: ..."
-            if "Node " in error and " failed:" in error:
-                try:
-                    node_id = error.split("Node ")[1].split(" failed:")[0]
-                    failed_nodes.add(node_id)
-                except (IndexError, AttributeError):
-                    continue
-        
-        # Check if there are any remaining levels that can still execute
-        # A level can execute if none of its nodes depend on failed nodes
-        for level_num in sorted(self.levels.keys()):
-            for node_id in self.levels[level_num]:
-                node = self.nodes[node_id]
-                
-                # Skip nodes that have already been processed
-                if node_id in failed_nodes:
-                    continue
-                    
-                # Check if this node's dependencies include any failed nodes
-                depends_on_failed_node = any(dep_id in failed_nodes for dep_id in node.dependencies)
-                
-                # If this node doesn't depend on failed nodes, we can continue
-                if not depends_on_failed_node:
-                    logger.info(f"Chain execution continuing: Node '{node_id}' can still execute independently")
-                    return True
-        
-        # If we get here, all remaining nodes depend on failed nodes
-        logger.warning(f"Chain execution stopping: All remaining nodes depend on failed nodes: {failed_nodes}")
-        return False
-        
     async def _trigger_callbacks(self, event: str, data: Any) -> None:
         """Trigger callbacks for an event.
         
@@ -457,6 +775,55 @@ class ScriptChain:
             except Exception as e:
                 logger.error(f"Error in callback {callback.__class__.__name__}: {str(e)}")
                 
+    def get_critical_path_priorities(self) -> Dict[str, float]:
+        """Get the expected length of the longest remaining path starting at each node.
+        
+        A node's weight is its average successful duration from the execution history.
+        Nodes without history are weighted with the mean of the known durations (or 1.0
+        when nothing is known yet), so the ranking degrades to the longest remaining
+        path by node count.
+        
+        Returns:
+            Dictionary mapping node IDs to their remaining path length in seconds
+        """
+        known = {}
+        for node_id in self.nodes:
+            duration = self.execution_history.expected_duration(self.plan.fingerprint, node_id)
+            if duration is not None:
+                known[node_id] = duration
+        default_weight = sum(known.values()) / len(known) if known else 1.0
+        
+        priorities: Dict[str, float] = {}
+        for node_id in reversed(self.topological_order):
+            downstream = max((priorities[succ] for succ in self.plan.successors[node_id]), default=0.0)
+            priorities[node_id] = known.get(node_id, default_weight) + downstream
+        return priorities
+        
+    def get_ancestors(self, node_ids: List[str], include_self: bool = False) -> Set[str]:
+        """Get every node the given nodes transitively depend on.
+        
+        Args:
+            node_ids: Node IDs to start from
+            include_self: Whether to include the given nodes themselves
+            
+        Returns:
+            Set of ancestor node IDs
+            
+        Raises:
+            ValueError: If a node ID is not part of this chain
+        """
+        unknown = [node_id for node_id in node_ids if node_id not in self.nodes]
+        if unknown:
+            raise ValueError(f"Unknown target node(s): {unknown}")
+        ancestors: Set[str] = set(node_ids) if include_self else set()
+        stack = list(node_ids)
+        while stack:
+            for dep_id in self.plan.predecessors[stack.pop()]:
+                if dep_id not in ancestors:
+                    ancestors.add(dep_id)
+                    stack.append(dep_id)
+        return ancestors
+        
     def get_node_dependencies(self, node_id: str) -> List[str]:
         """Get list of dependencies for a node.
         
@@ -466,7 +833,7 @@ class ScriptChain:
         Returns:
             List of dependency node IDs
         """
-        return list(self.graph.predecessors(node_id))
+        return list(self.plan.predecessors[node_id])
         
     def get_node_dependents(self, node_id: str) -> List[str]:
         """Get list of nodes that depend on this node.
@@ -477,7 +844,7 @@ class ScriptChain:
         Returns:
             List of dependent node IDs
         """
-        return list(self.graph.successors(node_id))
+        return list(self.plan.successors[node_id])
         
     def get_node_level(self, node_id: str) -> int:
         """Get execution level for a node.
@@ -3,6 +3,9 @@ from .openai_handler import OpenAIHandler
 from .anthropic_handler import AnthropicHandler
 from .google_gemini_handler import GoogleGeminiHandler
 from .deepseek_handler import DeepSeekHandler
+from .mock_handler import MockLLMHandler, Cassette, LatencyProfile
+from .errors import ProviderError, classify_provider_error
+from .batch import BatchBackend, OpenAIBatchBackend, MockBatchBackend
 # We will add other handlers here as they are created
 
 __all__ = [
@@ -10,5 +13,13 @@ __all__ = [
     "OpenAIHandler",
     "AnthropicHandler",
     "GoogleGeminiHandler",
-    "DeepSeekHandler"
+    "DeepSeekHandler",
+    "MockLLMHandler",
+    "Cassette",
+    "LatencyProfile",
+    "ProviderError",
+    "classify_provider_error",
+    "BatchBackend",
+    "OpenAIBatchBackend",
+    "MockBatchBackend"
 ] 
\ No newline at end of file
@@ -1,13 +1,42 @@
-from typing import Dict, Any, Tuple, Optional
-from anthropic import AsyncAnthropic # Ensure this matches your installed package
+from typing import Dict, Any, AsyncIterator, Tuple, Optional
+from .client_registry import get_client_registry
 from app.models.config import LLMConfig, ModelProvider
 from .base_handler import BaseLLMHandler
+from .errors import classify_provider_error
+from app.utils.prompt_segments import NodePrompt, SegmentedPrompt
 import logging
 import os
 import json
 
 logger = logging.getLogger(__name__)
 
+def _user_content(prompt: NodePrompt) -> Any:
+    """User message content, with a stable prompt prefix (see SegmentedPrompt) marked for
+    prompt caching. Anthropic ignores the mark for prefixes below the model's minimum
+    cacheable length."""
+    if not isinstance(prompt, SegmentedPrompt):
+        # No known prefix (e.g. a truncated prompt): sent as is, a deliberate cache miss
+        return prompt
+    if not prompt.prefix or not prompt.suffix.strip():
+        return prompt
+    return [
+        {"type": "text", "text": prompt.prefix, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": prompt.suffix}
+    ]
+
+def _usage_stats(usage: Any) -> Dict[str, int]:
+    """Usage dict from an Anthropic usage object. Anthropic's input_tokens excludes the
+    tokens read from or written to the prompt cache, so they are added back."""
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    prompt_tokens = usage.input_tokens + cache_read + cache_write
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": usage.output_tokens,
+        "total_tokens": prompt_tokens + usage.output_tokens,
+        "cached_prompt_tokens": cache_read
+    }
+
 class AnthropicHandler(BaseLLMHandler):
     """Handler for Anthropic LLM provider."""
 
@@ -23,7 +52,8 @@ class AnthropicHandler(BaseLLMHandler):
         if not api_key:
             return "", None, "API key for Anthropic is missing."
 
-        client = AsyncAnthropic(api_key=api_key)
+        # Shared client: its connection pool stays warm across calls
+        client = get_client_registry().anthropic(api_key)
         
         # Anthropic's `messages.create` is preferred. It takes a list of messages.
         # The `prompt` we receive here is the fully formatted user message.
@@ -43,7 +73,7 @@ class AnthropicHandler(BaseLLMHandler):
 
         # For now, we assume `prompt` is the primary user content.
         # Anthropic expects messages in a specific order, typically starting with user.
-        messages.append({"role": "user", "content": prompt})
+        messages.append({"role": "user", "content": _user_content(prompt)})
 
         # Prepare system prompt for Anthropic, ensuring it's always a list
         if isinstance(system_prompt_content, str) and system_prompt_content.strip():
@@ -52,84 +82,121 @@ class AnthropicHandler(BaseLLMHandler):
             system_param = []
 
         try:
-            async with client: # AsyncAnthropic client can be used as a context manager
-                logger.info(f"🔄 Making Anthropic API call: model={llm_config.model}, max_tokens={llm_config.max_tokens}")
-                logger.debug(f"Sending request to Anthropic: model={llm_config.model}, system_prompt_present={bool(system_param)}, messages_count={len(messages)}, temp={llm_config.temperature}, max_tokens={llm_config.max_tokens}")
-                logger.info(f"ANTHROPIC_HANDLER: Preparing to call messages.create.")
-                logger.info(f"ANTHROPIC_HANDLER: llm_config.model = {llm_config.model}")
-                logger.info(f"ANTHROPIC_HANDLER: system_param = {system_param}")
-                logger.info(f"ANTHROPIC_HANDLER: type(system_param) = {type(system_param)}")
-                logger.info(f"ANTHROPIC_HANDLER: messages = {messages}")
-                logger.info(f"ANTHROPIC_HANDLER: llm_config.max_tokens = {llm_config.max_tokens}")
-                logger.info(f"ANTHROPIC_HANDLER: llm_config.temperature = {llm_config.temperature}")
-                logger.info(f"ANTHROPIC_HANDLER: llm_config.top_p = {llm_config.top_p}")
+            logger.info(f"🔄 Making Anthropic API call: model={llm_config.model}, max_tokens={llm_config.max_tokens}")
+            logger.debug(f"Sending request to Anthropic: model={llm_config.model}, system_prompt_present={bool(system_param)}, messages_count={len(messages)}, temp={llm_config.temperature}, max_tokens={llm_config.max_tokens}")
+            logger.info(f"ANTHROPIC_HANDLER: Preparing to call messages.create.")
+            logger.info(f"ANTHROPIC_HANDLER: llm_config.model = {llm_config.model}")
+            logger.info(f"ANTHROPIC_HANDLER: system_param = {system_param}")
+            logger.info(f"ANTHROPIC_HANDLER: type(system_param) = {type(system_param)}")
+            logger.info(f"ANTHROPIC_HANDLER: messages = {messages}")
+            logger.info(f"ANTHROPIC_HANDLER: llm_config.max_tokens = {llm_config.max_tokens}")
+            logger.info(f"ANTHROPIC_HANDLER: llm_config.temperature = {llm_config.temperature}")
+            logger.info(f"ANTHROPIC_HANDLER: llm_config.top_p = {llm_config.top_p}")
                 
-                # Prepare kwargs for the API call, only include top_p if it's a valid float
-                api_kwargs = {
-                    "model": llm_config.model,
-                    "system": system_param,
-                    "messages": messages,
-                    "max_tokens": llm_config.max_tokens,
-                    "temperature": llm_config.temperature,
-                }
-                if isinstance(llm_config.top_p, float):
-                    api_kwargs["top_p"] = llm_config.top_p
-                # Add any custom parameters if not Anthropic
-                if llm_config.provider != ModelProvider.ANTHROPIC:
-                    api_kwargs.update(llm_config.custom_parameters)
-
-                response = await client.messages.create(**api_kwargs)
-                logger.debug(f"Received response from Anthropic: {response}")
-
-                text_content = ""
-                if response.content and isinstance(response.content, list) and len(response.content) > 0:
-                    # Check for function calls first
-                    if hasattr(response.content[0], 'function_call') and response.content[0].function_call:
-                        # If it's a function call, return it as a JSON string
-                        try:
-                            arguments = json.loads(response.content[0].function_call.arguments)
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Malformed function_call arguments: {response.content[0].function_call.arguments}")
-                            return "", None, f"Malformed function_call arguments: {response.content[0].function_call.arguments}"
-                        text_content = json.dumps({
-                            "function_call": {
-                                "name": response.content[0].function_call.name,
-                                "arguments": arguments
-                            }
-                        })
-                        logger.info(f"📝 Generated content preview:\n{text_content}")
-                        return text_content, None, None
-                    # Then check for regular text content
-                    elif hasattr(response.content[0], 'text'):
-                        text_content = response.content[0].text.strip()
+            # Prepare kwargs for the API call, only include top_p if it's a valid float
+            api_kwargs = {
+                "model": llm_config.model,
+                "system": system_param,
+                "messages": messages,
+                "max_tokens": llm_config.max_tokens,
+                "temperature": llm_config.temperature,
+            }
+            if isinstance(llm_config.top_p, float):
+                api_kwargs["top_p"] = llm_config.top_p
+            # Add any custom parameters if not Anthropic
+            if llm_config.provider != ModelProvider.ANTHROPIC:
+                api_kwargs.update(llm_config.custom_parameters)
+
+            response = await client.messages.create(**api_kwargs)
+            logger.debug(f"Received response from Anthropic: {response}")
+
+            text_content = ""
+            if response.content and isinstance(response.content, list) and len(response.content) > 0:
+                # Check for function calls first
+                if hasattr(response.content[0], 'function_call') and response.content[0].function_call:
+                    # If it's a function call, return it as a JSON string
+                    try:
+                        arguments = json.loads(response.content[0].function_call.arguments)
+                    except json.JSONDecodeError as e:
+                        logger.error(f"Malformed function_call arguments: {response.content[0].function_call.arguments}")
+                        return "", None, f"Malformed function_call arguments: {response.content[0].function_call.arguments}"
+                    text_content = json.dumps({
+                        "function_call": {
+                            "name": response.content[0].function_call.name,
+                            "arguments": arguments
+                        }
+                    })
+                    logger.info(f"📝 Generated content preview:\n{text_content}")
+                    return text_content, None, None
+                # Then check for regular text content
+                elif hasattr(response.content[0], 'text'):
+                    text_content = response.content[0].text.strip()
                 
-                logger.info(f"✅ Anthropic API call completed: {len(text_content) if text_content else 0} chars")
+            logger.info(f"✅ Anthropic API call completed: {len(text_content) if text_content else 0} chars")
                 
-                # Add content preview
-                if text_content:
-                    preview = text_content[:200] + "..." if len(text_content) > 200 else text_content
-                    logger.info(f"📝 Generated content preview:\n{preview}")
+            # Add content preview
+            if text_content:
+                preview = text_content[:200] + "..." if len(text_content) > 200 else text_content
+                logger.info(f"📝 Generated content preview:\n{preview}")
                 
-                if not text_content:
-                    logger.warning(f"Anthropic response missing expected text content: {response}")
-                    # Check stop_reason, e.g., if max_tokens was hit
-                    if response.stop_reason == "max_tokens":
-                        return "", None, "Anthropic generation stopped due to max_tokens limit."
-                    return "", None, "Anthropic response missing content or content is not text."
-
-                usage_stats = None
-                if response.usage:
-                    usage_stats = {
-                        "prompt_tokens": response.usage.input_tokens,
-                        "completion_tokens": response.usage.output_tokens,
-                        # Anthropic usage object doesn't always have a direct 'total_tokens'.
-                        # If needed, it would be input_tokens + output_tokens.
-                        "total_tokens": response.usage.input_tokens + response.usage.output_tokens
-                    }
+            if not text_content:
+                logger.warning(f"Anthropic response missing expected text content: {response}")
+                # Check stop_reason, e.g., if max_tokens was hit
+                if response.stop_reason == "max_tokens":
+                    return "", None, "Anthropic generation stopped due to max_tokens limit."
+                return "", None, "Anthropic response missing content or content is not text."
+
+            usage_stats = None
+            if response.usage:
+                usage_stats = _usage_stats(response.usage)
                 
-                return text_content, usage_stats, None
+            return text_content, usage_stats, None
             
         except Exception as e:
             logger.error(f"Error during Anthropic API call: {str(e)}", exc_info=True)
             # You might want to classify Anthropic-specific exceptions here
-            return "", None, f"Anthropic API Error: {str(e)}" 
\ No newline at end of file
+            raise classify_provider_error(e, f"Anthropic API Error: {str(e)}") from e
+
+    async def stream_text(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """Stream text deltas from the Anthropic API, then the final usage. 'tools' is ignored."""
+        api_key = llm_config.api_key or os.getenv("ANTHROPIC_API_KEY")
+        if not api_key:
+            yield "", None, "API key for Anthropic is missing."
+            return
+
+        client = get_client_registry().anthropic(api_key)
+        system_prompt_content = context.get("system_prompt")
+        api_kwargs = {
+            "model": llm_config.model,
+            "system": [{"type": "text", "text": system_prompt_content}] if isinstance(system_prompt_content, str) and system_prompt_content.strip() else [],
+            "messages": [{"role": "user", "content": _user_content(prompt)}],
+            "max_tokens": llm_config.max_tokens,
+            "temperature": llm_config.temperature,
+        }
+        if isinstance(llm_config.top_p, float):
+            api_kwargs["top_p"] = llm_config.top_p
+        if llm_config.provider != ModelProvider.ANTHROPIC:
+            api_kwargs.update(llm_config.custom_parameters)
+
+        try:
+            logger.info(f"🔄 Streaming Anthropic API call: model={llm_config.model}, max_tokens={llm_config.max_tokens}")
+            async with client.messages.stream(**api_kwargs) as stream:
+                async for text in stream.text_stream:
+                    if text:
+                        yield text, None, None
+                final_message = await stream.get_final_message()
+            usage_stats = None
+            if final_message.usage:
+                usage_stats = _usage_stats(final_message.usage)
+            logger.info("✅ Anthropic streaming call completed")
+            yield "", usage_stats, None
+
+        except Exception as e:
+            logger.error(f"Error during Anthropic streaming API call: {str(e)}", exc_info=True)
+            raise classify_provider_error(e, f"Anthropic API Error: {str(e)}") from e
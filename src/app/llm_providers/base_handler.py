@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, AsyncIterator, Tuple, Optional
 from app.models.config import LLMConfig
 
 class BaseLLMHandler(ABC):
@@ -29,5 +29,35 @@ class BaseLLMHandler(ABC):
                   (e.g., {"prompt_tokens": X, "completion_tokens": Y, "total_tokens": Z}).
                   Return None if usage info is not available.
                 - error (Optional[str]): An error message if generation failed, None otherwise.
+
+        Raises:
+            ProviderError: If the provider API call itself fails. LLMService retries
+                transient failures and turns the rest into an error tuple.
+        """
+        pass
+
+    async def stream_text(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """Stream text from the provider as it is generated.
+
+        Takes the same arguments as generate_text() and yields the same kind of tuples:
+        ``(text_delta, None, None)`` for each chunk of text, then one final
+        ``("", usage, None)`` once the response is complete. If generation fails, the
+        last tuple is ``("", None, error)``, or ProviderError is raised as for
+        generate_text(). Deltas are not stripped, so joining them gives the full response.
+
+        The default implementation does not stream: it yields the whole generate_text()
+        result as a single delta. Handlers override it with a streaming API call.
         """
-        pass 
\ No newline at end of file
+        text, usage, error = await self.generate_text(llm_config, prompt, context, tools)
+        if error:
+            yield "", None, error
+            return
+        if text:
+            yield text, None, None
+        yield "", usage, None
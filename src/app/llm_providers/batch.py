@@ -0,0 +1,216 @@
+"""
+Provider batch APIs: submit many requests as one job, poll it, collect the results
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from app.models.config import LLMConfig
+from .client_registry import get_client_registry
+
+logger = logging.getLogger(__name__)
+
+# Batch job statuses after which polling stops
+TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+class BatchJob(BaseModel):
+    """State of a submitted batch job"""
+    id: str
+    status: str
+    request_count: int = 0
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+class BatchBackend(ABC):
+    """Abstract base class for provider batch APIs."""
+
+    @abstractmethod
+    def build_request(self, custom_id: str, llm_config: LLMConfig, prompt: str) -> Dict[str, Any]:
+        """One request of a batch, in the provider's batch input format."""
+        pass
+
+    @abstractmethod
+    async def submit(self, requests: List[Dict[str, Any]]) -> str:
+        """Submit a batch job and return its ID."""
+        pass
+
+    @abstractmethod
+    async def poll(self, batch_id: str) -> BatchJob:
+        """Get the current state of a batch job."""
+        pass
+
+    @abstractmethod
+    async def results(self, batch_id: str) -> Dict[str, Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """Results of a finished batch job.
+
+        Returns:
+            ``(text, usage, error)`` per custom ID, as BaseLLMHandler.generate_text()
+            returns them; requests that did not finish are missing
+        """
+        pass
+
+def openai_batch_request(custom_id: str, llm_config: LLMConfig, prompt: str) -> Dict[str, Any]:
+    """A chat completion request line of the OpenAI batch input file format"""
+    body: Dict[str, Any] = {"model": llm_config.model, "messages": [{"role": "user", "content": prompt}]}
+    for name, value in (
+        ("temperature", llm_config.temperature),
+        ("max_tokens", llm_config.max_tokens),
+        ("top_p", llm_config.top_p),
+        ("frequency_penalty", llm_config.frequency_penalty),
+        ("presence_penalty", llm_config.presence_penalty),
+        ("stop", llm_config.stop_sequences),
+    ):
+        if value is not None:
+            body[name] = value
+    return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+
+def parse_openai_batch_result(line: Dict[str, Any]) -> Tuple[str, Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+    """Custom ID and ``(text, usage, error)`` of one line of an OpenAI batch output (or error) file"""
+    custom_id = line.get("custom_id", "")
+    if line.get("error"):
+        error = line["error"]
+        return custom_id, ("", None, f"OpenAI batch error: {error.get('message', error) if isinstance(error, dict) else error}")
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if response.get("status_code") != 200:
+        message = (body.get("error") or {}).get("message", body)
+        return custom_id, ("", None, f"OpenAI batch error (status {response.get('status_code')}): {message}")
+    choices = body.get("choices") or []
+    if not choices or not (choices[0].get("message") or {}).get("content"):
+        return custom_id, ("", None, "OpenAI response missing content.")
+    usage = body.get("usage")
+    usage_stats = {
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "total_tokens": usage.get("total_tokens", 0),
+        "cached_prompt_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    } if usage else None
+    return custom_id, (choices[0]["message"]["content"].strip(), usage_stats, None)
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API for chat completions (half price, separate rate limits, done within 24h).
+
+    Uses `api_key` or OPENAI_API_KEY for every request of the batch.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, completion_window: str = "24h"):
+        self.api_key = api_key
+        self.completion_window = completion_window
+
+    def _client(self):
+        api_key = self.api_key or os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("API key for OpenAI is missing.")
+        return get_client_registry().openai(api_key)
+
+    def build_request(self, custom_id: str, llm_config: LLMConfig, prompt: str) -> Dict[str, Any]:
+        return openai_batch_request(custom_id, llm_config, prompt)
+
+    async def submit(self, requests: List[Dict[str, Any]]) -> str:
+        client = self._client()
+        content = "\n".join(json.dumps(request) for request in requests).encode("utf-8")
+        input_file = await client.files.create(file=("batch.jsonl", content), purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window
+        )
+        return batch.id
+
+    async def poll(self, batch_id: str) -> BatchJob:
+        batch = await self._client().batches.retrieve(batch_id)
+        errors = getattr(batch, "errors", None)
+        error_data = getattr(errors, "data", None) or []
+        return BatchJob(
+            id=batch.id,
+            status=batch.status,
+            request_count=getattr(batch.request_counts, "total", 0) if batch.request_counts else 0,
+            error="; ".join(error.message or error.code or "" for error in error_data) or None
+        )
+
+    async def results(self, batch_id: str) -> Dict[str, Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        client = self._client()
+        batch = await client.batches.retrieve(batch_id)
+        results = {}
+        # Failed requests are written to a separate error file
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for raw in content.text.splitlines():
+                if raw.strip():
+                    custom_id, result = parse_openai_batch_result(json.loads(raw))
+                    results[custom_id] = result
+        return results
+
+class MockBatchBackend(BatchBackend):
+    """In-process stand-in for a provider batch API, for tests and local runs.
+
+    Speaks the OpenAI batch file format: requests are serialized to JSONL on submit,
+    and each batch completes `completion_delay` seconds later with one output line
+    per request. `responder(body)` produces each completion's text (default: echoes
+    the prompt); if it raises, that request fails with the exception's message.
+    """
+
+    def __init__(self, completion_delay: float = 0.0, responder: Optional[Callable[[Dict[str, Any]], str]] = None):
+        self.completion_delay = completion_delay
+        self.responder = responder or (lambda body: body["messages"][-1]["content"])
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+
+    def build_request(self, custom_id: str, llm_config: LLMConfig, prompt: str) -> Dict[str, Any]:
+        return openai_batch_request(custom_id, llm_config, prompt)
+
+    async def submit(self, requests: List[Dict[str, Any]]) -> str:
+        custom_ids = [request["custom_id"] for request in requests]
+        if len(set(custom_ids)) != len(custom_ids):
+            raise ValueError("Batch custom_id values must be unique")
+        batch_id = f"batch_mock_{next(self._ids)}"
+        self.batches[batch_id] = {
+            "input": "\n".join(json.dumps(request) for request in requests),
+            "submitted_at": time.monotonic(),
+            "request_count": len(requests)
+        }
+        await asyncio.sleep(0)
+        return batch_id
+
+    async def poll(self, batch_id: str) -> BatchJob:
+        batch = self.batches[batch_id]
+        finished = time.monotonic() - batch["submitted_at"] >= self.completion_delay
+        return BatchJob(id=batch_id, status="completed" if finished else "in_progress", request_count=batch["request_count"])
+
+    def _output_line(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        body = request["body"]
+        try:
+            text = self.responder(body)
+        except Exception as e:
+            return {"custom_id": request["custom_id"], "response": None, "error": {"code": "mock_error", "message": str(e)}}
+        prompt_tokens = sum(len(message["content"].split()) for message in body["messages"])
+        completion_tokens = len(text.split())
+        return {
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "body": {
+                "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+            }},
+            "error": None
+        }
+
+    async def results(self, batch_id: str) -> Dict[str, Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        if not (await self.poll(batch_id)).done:
+            raise ValueError(f"Batch {batch_id} has not finished")
+        results = {}
+        for raw in self.batches[batch_id]["input"].splitlines():
+            custom_id, result = parse_openai_batch_result(self._output_line(json.loads(raw)))
+            results[custom_id] = result
+        return results
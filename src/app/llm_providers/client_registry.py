@@ -0,0 +1,121 @@
+"""
+Registry of long-lived provider SDK clients with pooled, keep-alive HTTP connections
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient as AnthropicHttpxClient
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient as OpenAIHttpxClient
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class ClientPoolConfig(BaseModel):
+    """HTTP connection pool settings shared by every provider client"""
+    max_connections: int = Field(100, ge=1, description="Maximum concurrent connections per client")
+    max_keepalive_connections: int = Field(20, ge=0, description="Idle connections kept open per client")
+    keepalive_expiry: float = Field(30.0, ge=0, description="Seconds an idle connection is kept open")
+    http2: bool = Field(True, description="Negotiate HTTP/2 when the optional h2 package is installed")
+
+    @classmethod
+    def from_env(cls) -> "ClientPoolConfig":
+        """Settings from LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE, LLM_HTTP_KEEPALIVE_EXPIRY and LLM_HTTP2"""
+        return cls(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 100)),
+            max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 30.0)),
+            http2=os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes")
+        )
+
+class ClientRegistry:
+    """Shares one SDK client per (provider, api_key, base_url) for the life of the app.
+
+    Clients are never closed per request, so their connection pools (and TLS sessions)
+    are reused. HTTP connections belong to the event loop that opened them; if the
+    registry is used from a different loop, the old clients are dropped and rebuilt.
+    """
+
+    def __init__(self, config: Optional[ClientPoolConfig] = None):
+        self.config = config or ClientPoolConfig()
+        self.http2 = self.config.http2 and _http2_available()
+        if self.config.http2 and not self.http2:
+            logger.info("HTTP/2 requested for LLM clients but the 'h2' package is not installed; using HTTP/1.1")
+        self._clients: Dict[Tuple[str, str, Optional[str]], Any] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
+            keepalive_expiry=self.config.keepalive_expiry
+        )
+
+    def _get(self, provider: str, api_key: str, base_url: Optional[str], build: Callable[[], Any]) -> Any:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None and self._loop is not loop:
+            if self._clients:
+                logger.debug("Event loop changed; discarding LLM clients bound to the previous loop")
+                self._clients = {}
+            self._loop = loop
+        key = (provider, api_key, base_url)
+        client = self._clients.get(key)
+        if client is None:
+            client = self._clients[key] = build()
+        return client
+
+    def openai(self, api_key: str, base_url: Optional[str] = None) -> AsyncOpenAI:
+        """Shared AsyncOpenAI client (also used for OpenAI-compatible APIs such as DeepSeek)"""
+        return self._get("openai", api_key, base_url, lambda: AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=OpenAIHttpxClient(limits=self._limits(), http2=self.http2),
+            max_retries=0  # LLMService retries (see app.services.retry)
+        ))
+
+    def anthropic(self, api_key: str, base_url: Optional[str] = None) -> AsyncAnthropic:
+        """Shared AsyncAnthropic client"""
+        return self._get("anthropic", api_key, base_url, lambda: AsyncAnthropic(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=AnthropicHttpxClient(limits=self._limits(), http2=self.http2),
+            max_retries=0  # LLMService retries (see app.services.retry)
+        ))
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    async def aclose(self) -> None:
+        """Close every client and its connection pool"""
+        clients, self._clients = self._clients, {}
+        for (provider, _, base_url), client in clients.items():
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Error closing {provider} client ({base_url or 'default endpoint'}): {str(e)}")
+
+_client_registry: Optional[ClientRegistry] = None
+
+def configure_client_registry(config: Optional[ClientPoolConfig] = None) -> ClientRegistry:
+    """(Re)create the process-wide client registry; `config` defaults to ClientPoolConfig.from_env()"""
+    global _client_registry
+    _client_registry = ClientRegistry(config or ClientPoolConfig.from_env())
+    return _client_registry
+
+def get_client_registry() -> ClientRegistry:
+    """Get the process-wide client registry, creating it from the environment on first use."""
+    if _client_registry is None:
+        return configure_client_registry()
+    return _client_registry
@@ -1,7 +1,9 @@
-from typing import Dict, Any, Tuple, Optional
-from openai import AsyncOpenAI
+from typing import Dict, Any, AsyncIterator, Tuple, Optional
+from .client_registry import get_client_registry
 from app.models.config import LLMConfig, ModelProvider
 from .base_handler import BaseLLMHandler
+from .errors import classify_provider_error
+from .openai_handler import openai_usage_stats
 import logging
 import os
 import json
@@ -33,8 +35,9 @@ class DeepSeekHandler(BaseLLMHandler):
             logger.error("API key for DeepSeek is missing. Ensure DEEPSEEK_API_KEY is set in .env or llm_config.api_key is provided for DeepSeek requests.")
             return "", None, "API key for DeepSeek is missing. Set DEEPSEEK_API_KEY or provide in llm_config specifically for DeepSeek."
 
-        client = AsyncOpenAI(
-            api_key=api_key,
+        # Shared client: its connection pool stays warm across calls
+        client = get_client_registry().openai(
+            api_key,
             base_url=llm_config.custom_parameters.get('base_url', DEEPSEEK_BASE_URL) # Allow override from custom_parameters
         )
 
@@ -105,15 +108,60 @@ class DeepSeekHandler(BaseLLMHandler):
 
             usage_stats = None
             if response.usage:
-                usage_stats = {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                }
+                usage_stats = openai_usage_stats(response.usage)
             
             return text_content, usage_stats, None
 
         except Exception as e:
             logger.error(f"Error during DeepSeek API call (via OpenAI SDK): {str(e)}", exc_info=True)
             # Consider more specific error handling for OpenAI SDK exceptions if needed
-            return "", None, f"DeepSeek API Error (via OpenAI SDK): {str(e)}" 
\ No newline at end of file
+            raise classify_provider_error(e, f"DeepSeek API Error (via OpenAI SDK): {str(e)}") from e
+
+    async def stream_text(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """Stream text deltas from the DeepSeek API via OpenAI SDK, then the final usage. 'tools' is ignored."""
+        api_key = os.getenv("DEEPSEEK_API_KEY") or llm_config.api_key
+        if not api_key:
+            yield "", None, "API key for DeepSeek is missing. Set DEEPSEEK_API_KEY or provide in llm_config specifically for DeepSeek."
+            return
+
+        client = get_client_registry().openai(
+            api_key,
+            base_url=llm_config.custom_parameters.get('base_url', DEEPSEEK_BASE_URL)
+        )
+
+        messages = [{"role": "user", "content": prompt}]
+        system_prompt_content = context.get("system_prompt")
+        if system_prompt_content:
+            messages.insert(0, {"role": "system", "content": system_prompt_content})
+
+        try:
+            logger.info(f"🔄 Streaming DeepSeek API call: model={llm_config.model}, max_tokens={llm_config.max_tokens}")
+            request_params = {
+                "model": llm_config.model,
+                "messages": messages,
+                "max_tokens": llm_config.max_tokens,
+                "temperature": llm_config.temperature,
+                "top_p": llm_config.top_p,
+            }
+            request_params.update({k: v for k, v in llm_config.custom_parameters.items() if k != 'base_url'})
+            request_params.update({"stream": True, "stream_options": {"include_usage": True}})
+
+            stream = await client.chat.completions.create(**request_params)
+            usage_stats = None
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content, None, None
+                if getattr(chunk, "usage", None):
+                    usage_stats = openai_usage_stats(chunk.usage)
+            logger.info("✅ DeepSeek streaming call completed")
+            yield "", usage_stats, None
+
+        except Exception as e:
+            logger.error(f"Error during DeepSeek streaming API call (via OpenAI SDK): {str(e)}", exc_info=True)
+            raise classify_provider_error(e, f"DeepSeek API Error (via OpenAI SDK): {str(e)}") from e
@@ -0,0 +1,116 @@
+"""
+Provider-independent classification of LLM API failures
+"""
+
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional
+import anthropic
+import httpx
+import openai
+
+# Error kinds
+RATE_LIMIT = "rate_limit"
+SERVER_ERROR = "server_error"
+TIMEOUT = "timeout"
+CONNECTION = "connection"
+AUTHENTICATION = "authentication"
+INVALID_REQUEST = "invalid_request"
+CIRCUIT_OPEN = "circuit_open"
+UNKNOWN = "unknown"
+
+# Transient failures that are worth another attempt
+RETRYABLE_KINDS = {RATE_LIMIT, SERVER_ERROR, TIMEOUT, CONNECTION}
+
+_TIMEOUT_ERRORS = (asyncio.TimeoutError, httpx.TimeoutException, openai.APITimeoutError, anthropic.APITimeoutError)
+_CONNECTION_ERRORS = (httpx.TransportError, openai.APIConnectionError, anthropic.APIConnectionError)
+
+class ProviderError(Exception):
+    """Exception raised by a provider handler when the provider API call fails.
+
+    Attributes:
+        kind: One of the error kinds above
+        status_code: HTTP status of the failed response, if there was one
+        retry_after: Seconds the provider asked us to wait before retrying, if it did
+    """
+
+    def __init__(self, message: str, kind: str = UNKNOWN, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.kind = kind
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.kind in RETRYABLE_KINDS
+
+def _kind_for_status(status_code: int) -> str:
+    if status_code == 429:
+        return RATE_LIMIT
+    if status_code == 408:
+        return TIMEOUT
+    if status_code in (401, 403):
+        return AUTHENTICATION
+    if status_code == 409 or status_code >= 500:
+        # 409 is a transient lock conflict on OpenAI; 529 is Anthropic's "overloaded"
+        return SERVER_ERROR
+    if 400 <= status_code < 500:
+        return INVALID_REQUEST
+    return UNKNOWN
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """Seconds to wait according to retry-after-ms / Retry-After response headers.
+
+    Retry-After may be a number of seconds or an HTTP date; unparseable or missing
+    values give None.
+    """
+    if not headers:
+        return None
+    try:
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms is not None:
+            return max(0.0, float(retry_after_ms) / 1000)
+        retry_after = headers.get("retry-after")
+    except Exception:
+        return None
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def classify_provider_error(error: Exception, message: Optional[str] = None) -> ProviderError:
+    """Wrap any exception from a provider SDK call in a ProviderError.
+
+    Works on OpenAI (and OpenAI-compatible), Anthropic and Google API exceptions
+    by their HTTP status, plus timeouts and connection failures.
+
+    Args:
+        error: Exception raised by the SDK
+        message: Message for the ProviderError (defaults to str(error))
+    """
+    if isinstance(error, ProviderError):
+        return error
+    message = message or str(error)
+    status_code = getattr(error, "status_code", None)
+    if not isinstance(status_code, int):
+        # google.api_core exceptions carry the HTTP status as `code`
+        code = getattr(error, "code", None)
+        status_code = code if isinstance(code, int) and 100 <= code < 600 else None
+    response = getattr(error, "response", None)
+    retry_after = parse_retry_after(getattr(response, "headers", None))
+    if status_code is not None:
+        kind = _kind_for_status(status_code)
+    elif isinstance(error, _TIMEOUT_ERRORS):
+        kind = TIMEOUT
+    elif isinstance(error, _CONNECTION_ERRORS):
+        kind = CONNECTION
+    else:
+        kind = UNKNOWN
+    return ProviderError(message, kind=kind, status_code=status_code, retry_after=retry_after)
@@ -1,8 +1,9 @@
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, AsyncIterator, Tuple, Optional
 import google.generativeai as genai
 from google.generativeai.types import GenerationConfig
 from app.models.config import LLMConfig, ModelProvider
 from .base_handler import BaseLLMHandler
+from .errors import classify_provider_error
 import logging
 import os
 
@@ -11,6 +12,31 @@ logger = logging.getLogger(__name__)
 class GoogleGeminiHandler(BaseLLMHandler):
     """Handler for Google Gemini LLM provider."""
 
+    @staticmethod
+    def _generation_config(llm_config: LLMConfig) -> GenerationConfig:
+        """Map LLMConfig onto a Gemini GenerationConfig"""
+        # Map LLMConfig parameters to GenerationConfig
+        # Gemini uses 'candidate_count', 'stop_sequences', 'max_output_tokens', 'temperature', 'top_p', 'top_k'
+        # We need to ensure our llm_config fields are correctly mapped.
+        generation_config_params = {
+            "temperature": llm_config.temperature if llm_config.temperature is not None else None,
+            "top_p": llm_config.top_p if llm_config.top_p is not None else None,
+            "top_k": llm_config.custom_parameters.get("top_k") if "top_k" in llm_config.custom_parameters else None,
+            "max_output_tokens": llm_config.max_tokens if llm_config.max_tokens is not None else None,
+            # "stop_sequences": llm_config.stop_sequences if llm_config.stop_sequences else None # Needs to be a list of strings
+        }
+
+        # Add custom parameters if they exist and match GenerationConfig fields
+        if llm_config.custom_parameters:
+            for key, value in llm_config.custom_parameters.items():
+                if key in ["candidate_count", "stop_sequences"]: # Add other valid GenerationConfig keys here
+                    generation_config_params[key] = value
+
+        # Filter out None values, as GenerationConfig expects actual values or to omit the param
+        filtered_gen_config_params = {k: v for k, v in generation_config_params.items() if v is not None}
+
+        return GenerationConfig(**filtered_gen_config_params)
+
     async def generate_text(
         self,
         llm_config: LLMConfig,
@@ -31,29 +57,9 @@ class GoogleGeminiHandler(BaseLLMHandler):
             
             model = genai.GenerativeModel(llm_config.model)
 
-            # Map LLMConfig parameters to GenerationConfig
-            # Gemini uses 'candidate_count', 'stop_sequences', 'max_output_tokens', 'temperature', 'top_p', 'top_k'
-            # We need to ensure our llm_config fields are correctly mapped.
-            generation_config_params = {
-                "temperature": llm_config.temperature if llm_config.temperature is not None else None,
-                "top_p": llm_config.top_p if llm_config.top_p is not None else None,
-                "top_k": llm_config.custom_parameters.get("top_k") if "top_k" in llm_config.custom_parameters else None,
-                "max_output_tokens": llm_config.max_tokens if llm_config.max_tokens is not None else None,
-                # "stop_sequences": llm_config.stop_sequences if llm_config.stop_sequences else None # Needs to be a list of strings
-            }
-            
-            # Add custom parameters if they exist and match GenerationConfig fields
-            if llm_config.custom_parameters:
-                for key, value in llm_config.custom_parameters.items():
-                    if key in ["candidate_count", "stop_sequences"]: # Add other valid GenerationConfig keys here
-                        generation_config_params[key] = value
-            
-            # Filter out None values, as GenerationConfig expects actual values or to omit the param
-            filtered_gen_config_params = {k: v for k, v in generation_config_params.items() if v is not None}
-            
-            gen_config = GenerationConfig(**filtered_gen_config_params)
+            gen_config = self._generation_config(llm_config)
 
-            logger.debug(f"Sending request to Google Gemini: model={llm_config.model}, prompt_length={len(prompt)}, config={filtered_gen_config_params}")
+            logger.debug(f"Sending request to Google Gemini: model={llm_config.model}, prompt_length={len(prompt)}, config={gen_config}")
             
             response = await model.generate_content_async(
                 prompt,
@@ -98,7 +104,9 @@ class GoogleGeminiHandler(BaseLLMHandler):
                 usage_stats = {
                     "prompt_tokens": response.usage_metadata.prompt_token_count if hasattr(response.usage_metadata, 'prompt_token_count') else 0,
                     "completion_tokens": response.usage_metadata.candidates_token_count if hasattr(response.usage_metadata, 'candidates_token_count') else 0, # Or equivalent field
-                    "total_tokens": response.usage_metadata.total_token_count if hasattr(response.usage_metadata, 'total_token_count') else 0
+                    "total_tokens": response.usage_metadata.total_token_count if hasattr(response.usage_metadata, 'total_token_count') else 0,
+                    # Prompt tokens served from Gemini's implicit context cache
+                    "cached_prompt_tokens": getattr(response.usage_metadata, 'cached_content_token_count', 0) or 0
                 }
                 if usage_stats["prompt_tokens"] == 0 and usage_stats["total_tokens"] > 0 and usage_stats["completion_tokens"] == 0: # sometimes only total is populated
                      # This is a guess, better to use specific fields if available
@@ -110,4 +118,54 @@ class GoogleGeminiHandler(BaseLLMHandler):
         except Exception as e:
             logger.error(f"Error during Google Gemini API call: {str(e)}", exc_info=True)
             # Classify Gemini-specific exceptions if needed
-            return "", None, f"Google Gemini API Error: {str(e)}" 
\ No newline at end of file
+            raise classify_provider_error(e, f"Google Gemini API Error: {str(e)}") from e
+
+    async def stream_text(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """Stream text deltas from the Google Gemini API, then the final usage. 'tools' is ignored."""
+        api_key = llm_config.api_key or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            yield "", None, "API key for Google Gemini is missing."
+            return
+
+        try:
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(llm_config.model)
+            logger.info(f"🔄 Streaming Google Gemini API call: model={llm_config.model}, max_tokens={llm_config.max_tokens}")
+            response = await model.generate_content_async(
+                prompt,
+                generation_config=self._generation_config(llm_config),
+                stream=True
+            )
+            usage_stats = None
+            received_text = False
+            async for chunk in response:
+                text = "".join(part.text for part in chunk.parts if hasattr(part, 'text')) if chunk.parts else ""
+                if text:
+                    received_text = True
+                    yield text, None, None
+                # Every chunk carries cumulative usage; the last one is the total
+                if getattr(chunk, 'usage_metadata', None):
+                    usage_stats = {
+                        "prompt_tokens": getattr(chunk.usage_metadata, 'prompt_token_count', 0),
+                        "completion_tokens": getattr(chunk.usage_metadata, 'candidates_token_count', 0),
+                        "total_tokens": getattr(chunk.usage_metadata, 'total_token_count', 0),
+                        "cached_prompt_tokens": getattr(chunk.usage_metadata, 'cached_content_token_count', 0) or 0
+                    }
+
+            if not received_text and response.prompt_feedback and response.prompt_feedback.block_reason:
+                block_reason_message = response.prompt_feedback.block_reason_message or "Content blocked"
+                logger.warning(f"Google Gemini generation blocked. Reason: {response.prompt_feedback.block_reason}, Message: {block_reason_message}")
+                yield "", None, f"Google Gemini generation failed: {block_reason_message}"
+                return
+            logger.info("✅ Google Gemini streaming call completed")
+            yield "", usage_stats, None
+
+        except Exception as e:
+            logger.error(f"Error during Google Gemini streaming API call: {str(e)}", exc_info=True)
+            raise classify_provider_error(e, f"Google Gemini API Error: {str(e)}") from e
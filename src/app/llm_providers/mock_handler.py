@@ -0,0 +1,251 @@
+"""
+Mock provider for offline load tests and benchmarks: replays recorded responses with
+simulated latency, errors and token usage
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Literal, Optional, Tuple, Union
+from pydantic import BaseModel, Field
+from app.models.config import LLMConfig
+from app.utils.token_counter import TokenCounter
+from .base_handler import BaseLLMHandler
+from .errors import CONNECTION, RATE_LIMIT, SERVER_ERROR, TIMEOUT, ProviderError
+
+logger = logging.getLogger(__name__)
+
+# HTTP status a provider would answer the simulated error kinds with
+_ERROR_STATUS = {RATE_LIMIT: 429, SERVER_ERROR: 503}
+
+class LatencyProfile(BaseModel):
+    """Distribution of simulated response latency, in seconds"""
+    distribution: Literal["fixed", "uniform", "normal", "lognormal"] = "fixed"
+    mean: float = Field(0.0, ge=0, description="Mean latency")
+    stddev: float = Field(0.0, ge=0, description="Standard deviation (uniform: half the range)")
+    first_token_fraction: float = Field(0.25, ge=0, le=1, description="Share of the latency before the first streamed chunk")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "fixed" or self.stddev == 0 or self.mean == 0:
+            return self.mean
+        if self.distribution == "uniform":
+            return rng.uniform(max(0.0, self.mean - self.stddev), self.mean + self.stddev)
+        if self.distribution == "normal":
+            return max(0.0, rng.gauss(self.mean, self.stddev))
+        # Lognormal with the requested mean and standard deviation: a long right tail, like real APIs
+        sigma_squared = math.log(1 + (self.stddev / self.mean) ** 2)
+        return rng.lognormvariate(math.log(self.mean) - sigma_squared / 2, math.sqrt(sigma_squared))
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyProfile":
+        """Profile from 'mean' or 'distribution:mean[:stddev]', e.g. 'lognormal:0.8:0.4'"""
+        parts = spec.split(":")
+        if len(parts) == 1:
+            return cls(mean=float(parts[0]))
+        return cls(distribution=parts[0], mean=float(parts[1]), stddev=float(parts[2]) if len(parts) > 2 else 0.0)
+
+class CassetteEntry(BaseModel):
+    """One recorded response"""
+    model: str
+    prompt: str
+    text: str
+    usage: Optional[Dict[str, int]] = None
+    latency: Optional[float] = Field(None, description="Seconds the recorded call took")
+
+class Cassette:
+    """Recorded responses keyed by (model, prompt), stored as one JSON file."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.entries: Dict[str, CassetteEntry] = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for raw in json.load(f).get("entries", []):
+                    entry = CassetteEntry.model_validate(raw)
+                    self.entries[self.key(entry.model, entry.prompt)] = entry
+
+    @staticmethod
+    def key(model: Optional[str], prompt: str) -> str:
+        return hashlib.sha256(json.dumps([model, prompt]).encode("utf-8")).hexdigest()
+
+    def get(self, model: Optional[str], prompt: str) -> Optional[CassetteEntry]:
+        return self.entries.get(self.key(model, prompt))
+
+    def put(self, entry: CassetteEntry) -> None:
+        self.entries[self.key(entry.model, entry.prompt)] = entry
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the cassette to `path` (default: the path it was loaded from)"""
+        path = path or self.path
+        if not path:
+            raise ValueError("Cassette has no path to save to")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": [entry.model_dump() for entry in self.entries.values()]}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class MockLLMHandler(BaseLLMHandler):
+    """Handler for ModelProvider.CUSTOM that never touches the network.
+
+    Prompts found in the cassette are answered with the recorded text and usage;
+    other prompts get `default_response` (a string, or a callable of the prompt), or
+    an error if it is None. With `record_from`, cassette misses are forwarded to that
+    (real) handler and recorded instead; call ``cassette.save()`` afterwards.
+
+    Every call waits for a latency sampled from `latency` (default: the recorded
+    latency, else none) and fails with a ProviderError of `error_kind` (default: a
+    retryable server error) with probability `error_rate`. Responses without recorded usage report estimated
+    token counts. Pass `seed` for reproducible latencies and errors.
+    """
+
+    def __init__(
+        self,
+        cassette: Optional[Cassette] = None,
+        latency: Optional[LatencyProfile] = None,
+        error_rate: float = 0.0,
+        error_kind: str = SERVER_ERROR,
+        default_response: Union[str, Callable[[str], str], None] = '{"text": "mock response"}',
+        record_from: Optional[BaseLLMHandler] = None,
+        seed: Optional[int] = None
+    ):
+        self.cassette = cassette if cassette is not None else Cassette()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.default_response = default_response
+        self.record_from = record_from
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.replayed = 0
+        self.recorded = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls) -> "MockLLMHandler":
+        """Handler from LLM_MOCK_CASSETTE, LLM_MOCK_LATENCY (see LatencyProfile.parse),
+        LLM_MOCK_ERROR_RATE, LLM_MOCK_SEED and LLM_MOCK_STRICT.
+
+        Strict unless LLM_MOCK_STRICT is false: prompts missing from the cassette fail
+        instead of getting a canned default response, so a misconfigured provider is
+        never silently answered.
+        """
+        latency = os.getenv("LLM_MOCK_LATENCY")
+        seed = os.getenv("LLM_MOCK_SEED")
+        handler = cls(
+            cassette=Cassette(os.getenv("LLM_MOCK_CASSETTE")),
+            latency=LatencyProfile.parse(latency) if latency else None,
+            error_rate=float(os.getenv("LLM_MOCK_ERROR_RATE", 0.0)),
+            seed=int(seed) if seed else None
+        )
+        if os.getenv("LLM_MOCK_STRICT", "true").lower() in ("1", "true", "yes"):
+            handler.default_response = None
+        return handler
+
+    def _simulated_error(self) -> Optional[ProviderError]:
+        if self.error_rate <= 0 or self._rng.random() >= self.error_rate:
+            return None
+        self.failures += 1
+        message = {
+            RATE_LIMIT: "rate limit exceeded",
+            TIMEOUT: "request timed out",
+            CONNECTION: "connection reset",
+        }.get(self.error_kind, "service unavailable")
+        return ProviderError(f"Mock API Error: simulated {message}", kind=self.error_kind, status_code=_ERROR_STATUS.get(self.error_kind))
+
+    def _latency(self, entry: Optional[CassetteEntry]) -> float:
+        if self.latency is not None:
+            return self.latency.sample(self._rng)
+        return (entry.latency or 0.0) if entry else 0.0
+
+    @staticmethod
+    def _estimated_usage(llm_config: LLMConfig, prompt: str, text: str) -> Dict[str, int]:
+        prompt_tokens = max(1, TokenCounter.estimate_tokens(prompt, llm_config.model, "custom"))
+        completion_tokens = max(1, TokenCounter.estimate_tokens(text, llm_config.model, "custom"))
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    async def _respond(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list]
+    ) -> Tuple[Optional[CassetteEntry], str, Optional[Dict[str, int]], Optional[str]]:
+        """The cassette entry (if any) and the response for a prompt, recording misses when configured"""
+        self.calls += 1
+        entry = self.cassette.get(llm_config.model, prompt)
+        if entry is not None:
+            self.replayed += 1
+            return entry, entry.text, entry.usage or self._estimated_usage(llm_config, prompt, entry.text), None
+        if self.record_from is not None:
+            started_at = time.perf_counter()
+            text, usage, error = await self.record_from.generate_text(llm_config, prompt, context, tools)
+            if not error:
+                self.cassette.put(CassetteEntry(
+                    model=llm_config.model, prompt=prompt, text=text, usage=usage,
+                    latency=round(time.perf_counter() - started_at, 4)
+                ))
+                self.recorded += 1
+            # The real call already took real time
+            return None, text, usage, error
+        if self.default_response is None:
+            return None, "", None, (
+                f"Mock provider has no recorded response for this prompt (model={llm_config.model}); "
+                "set LLM_MOCK_CASSETTE, or LLM_MOCK_STRICT=false for default responses"
+            )
+        text = self.default_response(prompt) if callable(self.default_response) else self.default_response
+        return None, text, self._estimated_usage(llm_config, prompt, text), None
+
+    async def generate_text(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list] = None
+    ) -> Tuple[str, Optional[Dict[str, int]], Optional[str]]:
+        """Replay (or record) the response for this prompt after the simulated latency."""
+        error = self._simulated_error()
+        if error is not None:
+            raise error
+        entry, text, usage, handler_error = await self._respond(llm_config, prompt, context, tools)
+        if self.record_from is None or entry is not None:
+            await asyncio.sleep(self._latency(entry))
+        return text, usage, handler_error
+
+    async def stream_text(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """Replay the response word by word, spreading the simulated latency over the chunks."""
+        error = self._simulated_error()
+        if error is not None:
+            raise error
+        entry, text, usage, handler_error = await self._respond(llm_config, prompt, context, tools)
+        if handler_error:
+            yield "", None, handler_error
+            return
+        latency = self._latency(entry) if self.record_from is None or entry is not None else 0.0
+        first_token_fraction = self.latency.first_token_fraction if self.latency else LatencyProfile().first_token_fraction
+        chunks = re.findall(r"\s*\S+\s*", text) or [text]
+        await asyncio.sleep(latency * first_token_fraction)
+        interval = latency * (1 - first_token_fraction) / len(chunks)
+        for index, chunk in enumerate(chunks):
+            if index and interval:
+                await asyncio.sleep(interval)
+            yield chunk, None, None
+        yield "", usage, None
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "replayed": self.replayed, "recorded": self.recorded, "failures": self.failures}
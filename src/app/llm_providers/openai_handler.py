@@ -1,13 +1,27 @@
-from typing import Dict, Any, Tuple, Optional
-from openai import AsyncOpenAI
+from typing import Dict, Any, AsyncIterator, Tuple, Optional
+from .client_registry import get_client_registry
 from app.models.config import LLMConfig, ModelProvider
 from .base_handler import BaseLLMHandler
+from .errors import classify_provider_error
 import logging
 import json
 import os
 
 logger = logging.getLogger(__name__)
 
+def openai_usage_stats(usage: Any) -> Dict[str, int]:
+    """Usage dict from an OpenAI-style usage object, including the prompt tokens the
+    provider served from its automatic prompt cache (reported only for long prompts)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    # DeepSeek reports its context cache hits as prompt_cache_hit_tokens
+    cached_tokens = getattr(details, "cached_tokens", None) or getattr(usage, "prompt_cache_hit_tokens", None) or 0
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "cached_prompt_tokens": cached_tokens
+    }
+
 class OpenAIHandler(BaseLLMHandler):
     """Handler for OpenAI LLM provider."""
 
@@ -23,7 +37,8 @@ class OpenAIHandler(BaseLLMHandler):
         if not api_key:
             return "", None, "API key for OpenAI is missing."
 
-        client = AsyncOpenAI(api_key=api_key)
+        # Shared client: its connection pool stays warm across calls
+        client = get_client_registry().openai(api_key)
         messages = []
         
         # Check for system prompt in context or templates (if you plan to support it via context)
@@ -35,65 +50,104 @@ class OpenAIHandler(BaseLLMHandler):
         messages.append({"role": "user", "content": prompt})
 
         try:
-            async with client:
-                logger.info(f"🔄 Making OpenAI API call: model={llm_config.model}, max_tokens={llm_config.max_tokens}")
-                logger.debug(f"Sending request to OpenAI: model={llm_config.model}, messages={messages}, temp={llm_config.temperature}, max_tokens={llm_config.max_tokens}, tools={tools}")
-                response = await client.chat.completions.create(
-                    model=llm_config.model,
-                    messages=messages,
-                    temperature=llm_config.temperature,
-                    max_tokens=llm_config.max_tokens,
-                    top_p=llm_config.top_p,
-                    frequency_penalty=llm_config.frequency_penalty,
-                    presence_penalty=llm_config.presence_penalty,
-                    stop=llm_config.stop_sequences,
-                    functions=tools if tools else None
-                )
-                logger.info(f"✅ OpenAI API call completed: {len(response.choices[0].message.content) if response.choices and response.choices[0].message and response.choices[0].message.content else 0} chars")
+            logger.info(f"🔄 Making OpenAI API call: model={llm_config.model}, max_tokens={llm_config.max_tokens}")
+            logger.debug(f"Sending request to OpenAI: model={llm_config.model}, messages={messages}, temp={llm_config.temperature}, max_tokens={llm_config.max_tokens}, tools={tools}")
+            response = await client.chat.completions.create(
+                model=llm_config.model,
+                messages=messages,
+                temperature=llm_config.temperature,
+                max_tokens=llm_config.max_tokens,
+                top_p=llm_config.top_p,
+                frequency_penalty=llm_config.frequency_penalty,
+                presence_penalty=llm_config.presence_penalty,
+                stop=llm_config.stop_sequences,
+                functions=tools if tools else None
+            )
+            logger.info(f"✅ OpenAI API call completed: {len(response.choices[0].message.content) if response.choices and response.choices[0].message and response.choices[0].message.content else 0} chars")
                 
-                # Add content preview
-                if response.choices and response.choices[0].message and response.choices[0].message.content:
-                    content = response.choices[0].message.content
-                    preview = content[:200] + "..." if len(content) > 200 else content
-                    logger.info(f"📝 Generated content preview:\n{preview}")
+            # Add content preview
+            if response.choices and response.choices[0].message and response.choices[0].message.content:
+                content = response.choices[0].message.content
+                preview = content[:200] + "..." if len(content) > 200 else content
+                logger.info(f"📝 Generated content preview:\n{preview}")
                 
-                logger.debug(f"Received response from OpenAI: {response}")
+            logger.debug(f"Received response from OpenAI: {response}")
 
-                text_content = ""
-                # Handle function call responses
-                if response.choices and response.choices[0].message:
-                    msg = response.choices[0].message
-                    if hasattr(msg, 'function_call') and msg.function_call:
-                        # If it's a function call, return it as a JSON string
-                        try:
-                            arguments = json.loads(msg.function_call.arguments)
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Malformed function_call arguments: {msg.function_call.arguments}")
-                            return "", None, f"Malformed function_call arguments: {msg.function_call.arguments}"
-                        text_content = json.dumps({
-                            "function_call": {
-                                "name": msg.function_call.name,
-                                "arguments": arguments
-                            }
-                        })
-                        logger.info(f"📝 Generated content preview:\n{text_content}")
-                        return text_content, None, None
-                    elif msg.content:
-                        text_content = msg.content.strip()
-                else:
-                    logger.warning(f"OpenAI response missing expected content: {response}")
-                    return "", None, "OpenAI response missing content."
+            text_content = ""
+            # Handle function call responses
+            if response.choices and response.choices[0].message:
+                msg = response.choices[0].message
+                if hasattr(msg, 'function_call') and msg.function_call:
+                    # If it's a function call, return it as a JSON string
+                    try:
+                        arguments = json.loads(msg.function_call.arguments)
+                    except json.JSONDecodeError as e:
+                        logger.error(f"Malformed function_call arguments: {msg.function_call.arguments}")
+                        return "", None, f"Malformed function_call arguments: {msg.function_call.arguments}"
+                    text_content = json.dumps({
+                        "function_call": {
+                            "name": msg.function_call.name,
+                            "arguments": arguments
+                        }
+                    })
+                    logger.info(f"📝 Generated content preview:\n{text_content}")
+                    return text_content, None, None
+                elif msg.content:
+                    text_content = msg.content.strip()
+            else:
+                logger.warning(f"OpenAI response missing expected content: {response}")
+                return "", None, "OpenAI response missing content."
 
-                usage_stats = None
-                if hasattr(response, 'usage') and response.usage:
-                    usage_stats = {
-                        "prompt_tokens": response.usage.prompt_tokens,
-                        "completion_tokens": response.usage.completion_tokens,
-                        "total_tokens": response.usage.total_tokens
-                    }
+            usage_stats = None
+            if hasattr(response, 'usage') and response.usage:
+                usage_stats = openai_usage_stats(response.usage)
                 
-                return text_content, usage_stats, None
+            return text_content, usage_stats, None
             
         except Exception as e:
             logger.error(f"Error during OpenAI API call: {str(e)}", exc_info=True)
-            return "", None, f"OpenAI API Error: {str(e)}" 
\ No newline at end of file
+            raise classify_provider_error(e, f"OpenAI API Error: {str(e)}") from e
+
+    async def stream_text(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """Stream text deltas from the OpenAI API, then the final usage. 'tools' is ignored."""
+        api_key = llm_config.api_key or os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            yield "", None, "API key for OpenAI is missing."
+            return
+
+        client = get_client_registry().openai(api_key)
+        messages = [{"role": "user", "content": prompt}]
+
+        try:
+            logger.info(f"🔄 Streaming OpenAI API call: model={llm_config.model}, max_tokens={llm_config.max_tokens}")
+            stream = await client.chat.completions.create(
+                model=llm_config.model,
+                messages=messages,
+                temperature=llm_config.temperature,
+                max_tokens=llm_config.max_tokens,
+                top_p=llm_config.top_p,
+                frequency_penalty=llm_config.frequency_penalty,
+                presence_penalty=llm_config.presence_penalty,
+                stop=llm_config.stop_sequences,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            usage_stats = None
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content, None, None
+                # With include_usage the last chunk carries usage and no choices
+                if getattr(chunk, "usage", None):
+                    usage_stats = openai_usage_stats(chunk.usage)
+            logger.info("✅ OpenAI streaming call completed")
+            yield "", usage_stats, None
+
+        except Exception as e:
+            logger.error(f"Error during OpenAI streaming API call: {str(e)}", exc_info=True)
+            raise classify_provider_error(e, f"OpenAI API Error: {str(e)}") from e
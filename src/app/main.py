@@ -11,6 +11,13 @@ from pathlib import Path
 
 from app.api.routes import router
 from app.utils.logging import setup_logger
+from app.services.execution_budget import configure_execution_budget
+from app.services.rate_limiter import configure_rate_limits
+from app.services.hedging import configure_hedging
+from app.services.response_cache import configure_response_cache
+from app.services.retry import configure_retries
+from app.services.provider_routing import configure_provider_routing
+from app.llm_providers.client_registry import configure_client_registry
 
 # Setup logging
 logger = setup_logger()
@@ -49,13 +56,32 @@ async def lifespan(app: FastAPI):
     # if not api_keys_to_load["OPENAI_API_KEY"] and not api_keys_to_load["ANTHROPIC_API_KEY"] etc.:
     #     logger.error("No API keys found for any supported providers. Application might not function correctly.")
     
+    # Global cap on concurrent node executions shared by every chain and node request
+    # (SCRIPTCHAIN_MAX_CONCURRENT_EXECUTIONS, loaded from .env above)
+    configure_execution_budget()
+    # Per-provider/per-model RPM and TPM limits (LLM_RATE_LIMITS JSON)
+    configure_rate_limits()
+    # Tail-latency hedging of LLM calls (LLM_HEDGING_ENABLED, LLM_HEDGING_PERCENTILE)
+    configure_hedging()
+    # Two-tier LLM response cache (LLM_CACHE_ENABLED, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL, LLM_CACHE_DIR)
+    configure_response_cache()
+    # Retries of transient provider failures and per-provider circuit breakers
+    # (LLM_RETRY_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY,
+    # LLM_CIRCUIT_FAILURE_THRESHOLD, LLM_CIRCUIT_RESET_TIMEOUT)
+    configure_retries()
+    # Routing groups of equivalent models across providers (LLM_ROUTING_GROUPS, JSON
+    # mapping a group name to a list of 'provider/model' members)
+    configure_provider_routing()
+    # Long-lived provider clients with pooled keep-alive connections
+    # (LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE, LLM_HTTP_KEEPALIVE_EXPIRY, LLM_HTTP2)
+    client_registry = configure_client_registry()
+    
     logger.info("Starting up the application...")
     
     yield
     
     # Shutdown
-    # Add any cleanup code here
-    pass
+    await client_registry.aclose()
 
 # Create FastAPI app
 app = FastAPI(
@@ -5,6 +5,8 @@ Data models and configurations for LLM nodes
 from app.models.config import MessageTemplate, LLMConfig
 from app.models.node_models import (
     NodeConfig,
+    MapConfig,
+    RouterConfig,
     NodeMetadata,
     NodeExecutionRecord,
     NodeExecutionResult,
@@ -16,6 +18,8 @@ __all__ = [
     "MessageTemplate",
     "LLMConfig",
     "NodeConfig",
+    "MapConfig",
+    "RouterConfig",
     "NodeMetadata",
     "NodeExecutionRecord",
     "NodeExecutionResult",
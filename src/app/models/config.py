@@ -186,6 +186,10 @@ class LLMConfig(BaseModel):
     presence_penalty: Optional[float] = None
     stop_sequences: Optional[list[str]] = None
     custom_parameters: Dict[str, Any] = Field(default_factory=dict, description="Provider-specific parameters")
+    hedge: Optional[bool] = Field(None, description="Send a duplicate request when a call outlives the model's p95 latency (None: use the service default)")
+    cache: Optional[bool] = Field(None, description="Let identical calls share a response, from the response cache or an identical call in flight (None: only when temperature is 0)")
+    cache_ttl: Optional[float] = Field(None, gt=0, description="Seconds a cached response stays valid (None: use the cache default)")
+    routing_group: Optional[str] = Field(None, description="Send the call to the healthiest member of this routing group instead of provider/model, failing over on errors")
     model_config = ConfigDict(extra="allow")
 
     @field_validator('api_key')
@@ -75,6 +75,30 @@ class ToolConfig(BaseModel):
                 raise ValueError("ToolConfig.parameters must be a valid JSON Schema object with type: 'object'. Do not provide example values.")
         return v
 
+class MapConfig(BaseModel):
+    """Fan-out configuration for 'map' nodes"""
+    items_path: str = Field(..., description="Dotted path to the list in the node's context; the first segment is a context key (input mapping placeholder, chain input or dependency ID), e.g. 'utterances' or 'parse.utterances'")
+    item_key: str = Field("item", description="Context key under which each element (or chunk) is given to its sub-execution")
+    item_type: str = Field("ai", description="Node type used for each sub-execution")
+    chunk_size: int = Field(1, ge=1, description="Number of consecutive elements per sub-execution; above 1 each sub-execution gets a list")
+    max_concurrency: Optional[int] = Field(None, ge=1, description="Maximum concurrent sub-executions (defaults to the chain's max_parallel)")
+    allow_partial: bool = Field(False, description="If true, failed sub-executions yield None instead of failing the node")
+
+class RouterConfig(BaseModel):
+    """Branch selection configuration for 'router' nodes"""
+    routes: Dict[str, List[str]] = Field(..., description="Route name -> IDs of the nodes that start that branch; each must depend on the router")
+    expression: Optional[str] = Field(None, description="Expression over the node's context returning a route name (or a bool for 'true'/'false' routes); if unset, the node's model picks the route")
+    default_route: Optional[str] = Field(None, description="Route taken when the model's answer (or the expression result) matches no route")
+
+    @model_validator(mode='after')
+    def validate_routes(self) -> 'RouterConfig':
+        """Require at least one route and a known default."""
+        if not self.routes:
+            raise ValueError("Router requires at least one route")
+        if self.default_route is not None and self.default_route not in self.routes:
+            raise ValueError(f"Default route '{self.default_route}' is not one of the routes: {list(self.routes)}")
+        return self
+
 class NodeConfig(BaseModel):
     """Configuration for a node in the workflow.
     
@@ -114,6 +138,9 @@ class NodeConfig(BaseModel):
     )
     tools: Optional[List[ToolConfig]] = None
     agentic: bool = Field(default=False, description="If true, run agentic multi-step loop; otherwise, run single-step deterministic logic.")
+    map_config: Optional[MapConfig] = Field(None, description="Fan-out configuration; required for nodes of type 'map'")
+    router_config: Optional[RouterConfig] = Field(None, description="Branch selection configuration; required for nodes of type 'router'")
+    map_item: bool = Field(default=False, exclude=True, description="Set by MapNode on its sub-executions, whose prompts show the context keys in input_selection")
 
     @field_validator('dependencies')
     @classmethod
@@ -124,6 +151,15 @@ class NodeConfig(BaseModel):
             raise ValueError(f"Node {node_id} cannot depend on itself")
         return v
 
+    @model_validator(mode='after')
+    def validate_type_config(self) -> 'NodeConfig':
+        """Require the type-specific configuration of map and router nodes."""
+        if self.type == "map" and self.map_config is None:
+            raise ValueError(f"Map node {self.id} requires map_config")
+        if self.type == "router" and self.router_config is None:
+            raise ValueError(f"Router node {self.id} requires router_config")
+        return self
+
     @field_validator('input_mappings')
     @classmethod
     def validate_input_mappings(cls, v: Dict[str, InputMapping], info) -> Dict[str, InputMapping]:
@@ -180,6 +216,7 @@ class UsageMetadata(BaseModel):
     prompt_tokens: int = Field(default=0, description="Number of tokens in the prompt")
     completion_tokens: int = Field(default=0, description="Number of tokens in the completion")
     total_tokens: int = Field(default=0, description="Total number of tokens used")
+    cached_prompt_tokens: int = Field(default=0, description="Prompt tokens served from the provider's prompt cache (included in prompt_tokens)")
     cost: float = Field(default=0.0, description="Cost of the API call in USD")
     api_calls: int = Field(default=1, description="Number of API calls made")
     model: str = Field(..., description="Model used for the execution")
@@ -202,6 +239,7 @@ class NodeExecutionResult(BaseModel):
     usage: Optional[UsageMetadata] = Field(None, description="Usage statistics from the execution")
     execution_time: Optional[float] = Field(None, description="Execution time in seconds")
     context_used: Optional[Dict[str, Any]] = Field(None, description="Context used for the execution")
+    skipped_nodes: Optional[List[str]] = Field(None, description="IDs of chain nodes that were not executed")
     token_stats: Optional[Dict[str, Any]] = Field(
         None,
         description="Token statistics including truncation and limits"
@@ -212,3 +250,11 @@ class NodeExecutionResult(BaseModel):
         json_encoders = {
             datetime: str
         }
+
+class BatchRecordResult(BaseModel):
+    """Result of running a chain on one input record of a batch."""
+    index: int = Field(..., ge=0, description="Position of the record in the batch input")
+    success: bool = Field(..., description="Whether the chain succeeded for this record")
+    result: Optional[NodeExecutionResult] = Field(None, description="Chain-level result, if the chain ran")
+    error: Optional[str] = Field(None, description="Error message if the record failed")
+    execution_time: Optional[float] = Field(None, description="Execution time in seconds")
@@ -4,8 +4,12 @@ Node implementations for the workflow engine
 
 from app.nodes.base import BaseNode
 from app.nodes.ai_node import AiNode
+from app.nodes.map_node import MapNode
+from app.nodes.router_node import RouterNode
 
 __all__ = [
     "BaseNode",
-    "AiNode"
+    "AiNode",
+    "MapNode",
+    "RouterNode"
 ]
@@ -4,7 +4,7 @@ Concrete node implementations using the data models
 
 import time
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional, Any, Union
+from typing import AsyncIterator, Dict, List, Tuple, Optional, Any, Union
 from openai import AsyncOpenAI, OpenAI
 from openai import APIError, RateLimitError, Timeout
 import logging
@@ -34,13 +34,15 @@ from app.utils.logging import logger
 from app.utils.tracking import track_usage
 from app.utils.callbacks import ScriptChainCallback
 from app.utils.token_counter import TokenCounter
+from app.utils.prompt_segments import NodePrompt, SegmentedPrompt, prompt_segments
 from app.llm_providers import OpenAIHandler, AnthropicHandler, GoogleGeminiHandler, DeepSeekHandler
-from app.services.llm_service import LLMService
-from app.services.tool_service import ToolService
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.tool_service import ToolService, get_tool_service
 from app.nodes.prompt_builder import build_tool_preamble, prepare_prompt, build_system_message_for_tool
 from app.nodes.tool_call_utils import detect_tool_call, format_tool_output
 from app.nodes.error_handling import OpenAIErrorHandler
 from app.nodes.constants import TOOL_INSTRUCTION
+from app.utils.deadline import DeadlineExceededError, deadline_scope, iterate_with_deadline, with_deadline
 
 logger = logging.getLogger(__name__)
 
@@ -61,14 +63,21 @@ class AiNode(BaseNode):
         self.context_manager = context_manager
         self.llm_config = llm_config
         self.callbacks = callbacks or []
-        self.llm_service = llm_service or LLMService()
-        self.tool_service = tool_service or ToolService()
+        self.llm_service = llm_service or get_llm_service()
+        self.tool_service = tool_service or get_tool_service()
     
     def build_tool_preamble(self, tools: list) -> str:
         """Generate a human-readable preamble describing available tools, their parameters, and usage examples."""
         return build_tool_preamble(tools)
 
-    async def prepare_prompt(self, inputs: Dict[str, Any]) -> str:
+    def _prompt_inputs(self, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Context values shown in the prompt: none, except for map sub-executions, which show
+        the keys in their input_selection (the context otherwise only feeds tool arguments)"""
+        if not context or not self.config.input_selection or not self.config.map_item:
+            return {}
+        return {key: value for key, value in context.items() if key in self.config.input_selection}
+
+    async def prepare_prompt(self, inputs: Dict[str, Any]) -> NodePrompt:
         """Prepare prompt with selected context from inputs, including a tool system message and preamble if tools are available."""
         # If this node uses tools, prepend a system message for the first tool (or all tools if needed)
         if self.config.tools:
@@ -77,7 +86,12 @@ class AiNode(BaseNode):
         else:
             system_msg = ''
         user_prompt = prepare_prompt(self.config, self.context_manager, self.llm_config, self.tool_service, inputs)
-        return (system_msg + '\n' + user_prompt).strip()
+        prefix, suffix = prompt_segments(user_prompt)
+        # The tool system message and preamble are the stable prefix (see SegmentedPrompt)
+        prefix = (system_msg + '\n' + prefix).lstrip()
+        if not prefix.strip():
+            return suffix.strip()
+        return SegmentedPrompt(prefix, suffix.rstrip())
 
     def _truncate_prompt(self, prompt: str, current_tokens: int) -> str:
         """Truncate prompt to fit within token limit.
@@ -170,7 +184,109 @@ class AiNode(BaseNode):
         Execute the text generation node using the appropriate LLM service and handle tool/function calls.
         - If agentic is False: single-step deterministic tool call (or LLM output)
         - If agentic is True: agentic 'thought loop' (multi-step, tool-calling, iterative reasoning)
+        The node's timeout (if set) is a deadline for all of its LLM and tool calls together.
+        """
+        with deadline_scope(self.config.timeout):
+            return await self._execute_steps(context, max_steps)
+
+    async def execute_stream(self, context: Dict[str, Any] = None) -> AsyncIterator[Union[str, NodeExecutionResult]]:
+        """
+        Execute the node, yielding generated text as it arrives.
+        Yields text deltas (str) followed by the NodeExecutionResult that execute() would
+        return; joining the deltas gives the raw generated text. Only single-step nodes
+        without tools stream: agentic and tool-calling nodes yield just their result.
+        The node's timeout (if set) bounds the whole stream.
         """
+        if self.config.agentic or self.config.tools:
+            yield await self.execute(context)
+            return
+
+        start_time = datetime.utcnow()
+        error_message_prefix = f"Node '{self.config.id}' (Name: '{self.config.name}', Provider: {self.llm_config.provider}, Model: {self.llm_config.model}): "
+        try:
+            prompt_template_for_handler = await self.prepare_prompt(self._prompt_inputs(context))
+        except KeyError as e:
+            yield NodeExecutionResult(
+                success=False,
+                error=f"{error_message_prefix}Prompt formatting error: Missing key '{str(e)}'.",
+                metadata=self._create_error_metadata(start_time, "PromptFormattingError"),
+                execution_time=(datetime.utcnow() - start_time).total_seconds()
+            )
+            return
+
+        chunks = []
+        usage_dict = None
+        handler_error = None
+        stream = iterate_with_deadline(
+            self.llm_service.stream(llm_config=self.llm_config, prompt=prompt_template_for_handler, context={}),
+            self.config.timeout,
+            "LLM stream"
+        )
+        try:
+            async for delta, chunk_usage, chunk_error in stream:
+                if chunk_error:
+                    handler_error = chunk_error
+                    break
+                usage_dict = chunk_usage or usage_dict
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+        except DeadlineExceededError as e:
+            logger.error(f"{error_message_prefix}{str(e)} (timeout {self.config.timeout}s)")
+            yield NodeExecutionResult(
+                success=False,
+                error=f"{error_message_prefix}Timed out after {self.config.timeout}s: {str(e)}",
+                metadata=self._create_error_metadata(start_time, "TimeoutError"),
+                execution_time=(datetime.utcnow() - start_time).total_seconds()
+            )
+            return
+        finally:
+            await stream.aclose()
+
+        if handler_error:
+            logger.error(f"{error_message_prefix}Handler error: {handler_error}")
+            yield NodeExecutionResult(
+                success=False,
+                error=f"{error_message_prefix}{handler_error}",
+                metadata=self._create_error_metadata(start_time, "LLMHandlerError"),
+                execution_time=(datetime.utcnow() - start_time).total_seconds()
+            )
+            return
+
+        output_data, validation_success, validation_error = self._process_and_validate_output("".join(chunks))
+        end_time = datetime.utcnow()
+        duration = (end_time - start_time).total_seconds()
+        usage_metadata = None
+        if usage_dict:
+            usage_metadata = UsageMetadata(
+                prompt_tokens=usage_dict.get("prompt_tokens", 0),
+                completion_tokens=usage_dict.get("completion_tokens", 0),
+                total_tokens=usage_dict.get("total_tokens", 0),
+                cached_prompt_tokens=usage_dict.get("cached_prompt_tokens", 0),
+                model=self.llm_config.model,
+                node_id=self.config.id,
+                provider=self.config.provider
+            )
+        yield NodeExecutionResult(
+            success=validation_success,
+            output=output_data,
+            error=f"{error_message_prefix}{validation_error}" if not validation_success else None,
+            metadata=NodeMetadata(
+                node_id=self.config.id,
+                node_type=self.config.type,
+                version=self.config.metadata.version if self.config.metadata else "1.0.0",
+                start_time=start_time,
+                end_time=end_time,
+                duration=duration,
+                provider=self.config.provider,
+                error_type="SchemaValidationError" if not validation_success else None
+            ),
+            usage=usage_metadata,
+            execution_time=duration
+        )
+
+    async def _execute_steps(self, context: Dict[str, Any] = None, max_steps: int = 5) -> NodeExecutionResult:
+        """Body of execute(); runs inside the node's deadline scope."""
         start_time = datetime.utcnow()
         context = context or {}
         error_message_prefix = f"Node '{self.config.id}' (Name: '{self.config.name}', Provider: {self.llm_config.provider}, Model: {self.llm_config.model}): "
@@ -178,9 +294,9 @@ class AiNode(BaseNode):
         tool_outputs = []
         step = 0
         try:
-            # Prepare the initial prompt (instructions only, no data)
+            # Prepare the initial prompt (instructions only; map sub-executions add their item)
             try:
-                prompt_template_for_handler = await self.prepare_prompt({})  # Pass empty dict to avoid data in prompt
+                prompt_template_for_handler = await self.prepare_prompt(self._prompt_inputs(context))
             except KeyError as e:
                 logger.error(f"{error_message_prefix}Missing key '{str(e)}' for prompt template. Context: {json.dumps(context, indent=2, default=str)}", exc_info=True)
                 return NodeExecutionResult(
@@ -194,12 +310,12 @@ class AiNode(BaseNode):
 
             # --- Deterministic (single-step) mode ---
             if not self.config.agentic:
-                generated_text, usage_dict, handler_error = await self.llm_service.generate(
+                generated_text, usage_dict, handler_error = await with_deadline(self.llm_service.generate(
                     llm_config=self.llm_config,
                     prompt=prompt_template_for_handler,
                     context={},  # No data in context for prompt
                     tools=tools
-                )
+                ), "LLM call")
                 tool_name, _ = detect_tool_call(generated_text)
                 # If this node is configured with a tool, always call the tool with context-derived arguments
                 if self.config.tools and len(self.config.tools) > 0:
@@ -227,7 +343,7 @@ class AiNode(BaseNode):
                             metadata=self._create_error_metadata(start_time, "ToolArgumentError"),
                             execution_time=(datetime.utcnow() - start_time).total_seconds()
                         )
-                    tool_exec_result = await self.tool_service.execute(tool_name, tool_args)
+                    tool_exec_result = await with_deadline(self.tool_service.execute(tool_name, tool_args), f"tool '{tool_name}'")
                     if tool_exec_result["success"]:
                         output = tool_exec_result["output"]
                         end_time = datetime.utcnow()
@@ -307,12 +423,12 @@ class AiNode(BaseNode):
                     ]
                     llm_input = prompt_template_for_handler + "\n" + "\n".join(tool_output_strs)
 
-                generated_text, usage_dict, handler_error = await self.llm_service.generate(
+                generated_text, usage_dict, handler_error = await with_deadline(self.llm_service.generate(
                     llm_config=self.llm_config,
                     prompt=llm_input,
                     context=context,
                     tools=tools
-                )
+                ), "LLM call")
                 last_llm_output = generated_text
 
                 tool_name, tool_args = detect_tool_call(generated_text)
@@ -336,7 +452,7 @@ class AiNode(BaseNode):
                     if missing_args:
                         logger.warning(f"Tool call '{tool_name}' missing arguments. Attempting to auto-fill from context failed: {missing_args}")
                         continue  # Skip this tool call, go to next agentic step
-                    tool_exec_result = await self.tool_service.execute(tool_name, tool_args)
+                    tool_exec_result = await with_deadline(self.tool_service.execute(tool_name, tool_args), f"tool '{tool_name}'")
                     tool_outputs.append(tool_exec_result)
                     if not tool_exec_result["success"]:
                         tool_error = tool_exec_result["error"]
@@ -380,6 +496,7 @@ class AiNode(BaseNode):
                             prompt_tokens=usage_dict.get("prompt_tokens", 0),
                             completion_tokens=usage_dict.get("completion_tokens", 0),
                             total_tokens=usage_dict.get("total_tokens", 0),
+                            cached_prompt_tokens=usage_dict.get("cached_prompt_tokens", 0),
                             model=self.llm_config.model,
                             node_id=self.config.id,
                             provider=self.config.provider
@@ -411,6 +528,14 @@ class AiNode(BaseNode):
                 metadata=self._create_error_metadata(start_time, "MaxStepsReached"),
                 execution_time=(datetime.utcnow() - start_time).total_seconds()
             )
+        except DeadlineExceededError as e:
+            logger.error(f"{error_message_prefix}{str(e)} (timeout {self.config.timeout}s)")
+            return NodeExecutionResult(
+                success=False,
+                error=f"{error_message_prefix}Timed out after {self.config.timeout}s: {str(e)}",
+                metadata=self._create_error_metadata(start_time, "TimeoutError"),
+                execution_time=(datetime.utcnow() - start_time).total_seconds()
+            )
         except Exception as e:
             logger.error(f"{error_message_prefix}Unexpected error in execute method: {str(e)}", exc_info=True)
             return NodeExecutionResult(
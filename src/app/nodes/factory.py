@@ -1,18 +1,23 @@
-# NOTE: All node logic is handled by AiNode, which supports both deterministic and agentic workflows via the agentic flag. There are no other node types at this time.
+# NOTE: LLM work is handled by AiNode, which supports both deterministic and agentic workflows via the agentic flag. MapNode fans a list out to AiNode (or other) sub-executions; RouterNode picks one downstream branch.
 from app.nodes.ai_node import AiNode
+from app.nodes.map_node import MapNode
+from app.nodes.router_node import RouterNode
 # from app.nodes.tool_node import ToolNode  # (future)
-# from app.nodes.router_node import RouterNode  # (future)
 
-def node_factory(node_config, context_manager, llm_config=None, callbacks=None, tool_service=None):
+def node_factory(node_config, context_manager, llm_config=None, callbacks=None, tool_service=None, max_parallel=None, llm_service=None):
     """
     Factory function to instantiate the correct node class based on node_config.type.
     Extend this as you add more node types.
+    max_parallel is the owning chain's concurrency limit, used by nodes that fan out.
+    llm_service overrides the process-wide LLMService (e.g. a BulkLLMService).
     """
     if node_config.type == "ai":
-        return AiNode(node_config, context_manager, llm_config, callbacks, tool_service=tool_service)
+        return AiNode(node_config, context_manager, llm_config, callbacks, llm_service=llm_service, tool_service=tool_service)
+    elif node_config.type == "map":
+        return MapNode(node_config, context_manager, llm_config, callbacks, tool_service=tool_service, max_parallel=max_parallel, llm_service=llm_service)
+    elif node_config.type == "router":
+        return RouterNode(node_config, context_manager, llm_config, callbacks, llm_service=llm_service)
     # elif node_config.type == "tool":
     #     return ToolNode(node_config, ...)
-    # elif node_config.type == "router":
-    #     return RouterNode(node_config, ...)
     else:
         raise ValueError(f"Unknown node type: {node_config.type}") 
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+Map node: runs one sub-execution per element (or chunk) of a list from upstream output
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.models.config import LLMConfig
+from app.models.node_models import NodeConfig, NodeExecutionResult, NodeMetadata, UsageMetadata
+from app.nodes.base import BaseNode
+from app.services.execution_budget import current_slot, get_execution_budget, slot_released
+from app.utils.callbacks import ScriptChainCallback
+from app.utils.context import GraphContextManager
+from app.utils.deadline import deadline_scope
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAP_CONCURRENCY = 5
+
+class MapNode(BaseNode):
+    """Fans a list out to bounded-parallel sub-executions and gathers their outputs.
+    
+    The list is read from the node's context at ``map_config.items_path``. Each
+    sub-execution is a node of ``map_config.item_type`` built from this node's own
+    configuration (prompt, model, LLM settings) and receives the rest of the context
+    plus its element under ``map_config.item_key``. The element and the node's mapped
+    inputs (or its ``input_selection``) are selected into each sub-execution's prompt,
+    so every item gets its own LLM call. The output is
+    ``{"results": [...], "count": n}`` with the sub-execution outputs in input order.
+    
+    Every sub-execution holds a slot of the execution budget, under the owner of the
+    map node's own slot (its chain); the map node hands its slot back while they run.
+    """
+    
+    def __init__(
+        self,
+        config: NodeConfig,
+        context_manager: GraphContextManager,
+        llm_config: Optional[LLMConfig] = None,
+        callbacks: Optional[List[ScriptChainCallback]] = None,
+        tool_service: Optional[Any] = None,
+        max_parallel: Optional[int] = None,
+        llm_service: Optional[Any] = None
+    ):
+        """Initialize the map node.
+        
+        Args:
+            config: Node configuration; ``map_config`` is required
+            context_manager: Context manager handed to every sub-execution
+            llm_config: LLM configuration handed to every sub-execution
+            callbacks: Callbacks handed to every sub-execution
+            tool_service: Tool service handed to every sub-execution
+            max_parallel: Concurrency limit of the owning chain, used when
+                          ``map_config.max_concurrency`` is not set
+            llm_service: LLM service handed to every sub-execution
+        """
+        super().__init__(config)
+        if config.map_config is None:
+            raise ValueError(f"Map node {config.id} requires map_config")
+        self.map_config = config.map_config
+        self.context_manager = context_manager
+        self.llm_config = llm_config
+        self.callbacks = callbacks or []
+        self.tool_service = tool_service
+        self.llm_service = llm_service
+        self.max_concurrency = self.map_config.max_concurrency or max_parallel or DEFAULT_MAP_CONCURRENCY
+        
+    def _chunks(self, items: List[Any]) -> List[Any]:
+        size = self.map_config.chunk_size
+        if size == 1:
+            return list(items)
+        return [items[i:i + size] for i in range(0, len(items), size)]
+        
+    def _prompt_input_keys(self) -> List[str]:
+        """Context keys shown in each sub-execution's prompt: the element and the node's inputs, not the whole list"""
+        list_key = self.map_config.items_path.split('.')[0]
+        keys = [self.map_config.item_key]
+        for key in self.config.input_selection or self.config.input_mappings:
+            if key != list_key and key not in keys:
+                keys.append(key)
+        return keys
+        
+    def _item_config(self, index: int) -> NodeConfig:
+        """Configuration of one sub-execution: this node, minus its graph wiring"""
+        return self.config.model_copy(update={
+            "id": f"{self.config.id}[{index}]",
+            "type": self.map_config.item_type,
+            "input_selection": self._prompt_input_keys(),
+            "map_item": True,
+            "dependencies": [],
+            "input_mappings": {},
+            "map_config": None,
+            "metadata": None
+        })
+        
+    def _failure(self, start_time: datetime, error: str, error_type: str) -> NodeExecutionResult:
+        return NodeExecutionResult(
+            success=False,
+            error=error,
+            metadata=NodeMetadata(
+                node_id=self.config.id,
+                node_type=self.config.type,
+                start_time=start_time,
+                end_time=datetime.utcnow(),
+                error_type=error_type,
+                provider=self.config.provider
+            )
+        )
+        
+    async def execute(self, context: Dict[str, Any]) -> NodeExecutionResult:
+        """Run every sub-execution and gather the outputs in input order.
+        
+        The node's timeout (if set) applies to all sub-executions together.
+        """
+        # Imported here: the node factory (also imported by app.chains) imports this module
+        from app.chains.compiler import resolve_path_parts
+        from app.nodes import factory
+        
+        start_time = datetime.utcnow()
+        context = context or {}
+        
+        try:
+            items = resolve_path_parts(context, self.map_config.items_path.split('.'))
+        except (KeyError, IndexError, TypeError) as e:
+            return self._failure(start_time, f"Map node '{self.config.id}': cannot resolve items path '{self.map_config.items_path}': {e}", "ValidationError")
+        if not isinstance(items, (list, tuple)):
+            return self._failure(
+                start_time,
+                f"Map node '{self.config.id}': items path '{self.map_config.items_path}' is a {type(items).__name__}, not a list",
+                "ValidationError"
+            )
+        
+        # Sub-executions see the rest of the context, but not the whole list
+        list_key = self.map_config.items_path.split('.')[0]
+        base_context = {key: value for key, value in context.items() if key != list_key}
+        chunks = self._chunks(list(items))
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        slot = current_slot()
+        budget, owner = slot if slot is not None else (get_execution_budget(), f"node:{self.config.id}")
+        
+        async def run_item(index: int, item: Any) -> NodeExecutionResult:
+            async with semaphore, budget.slot(owner):
+                node = factory.node_factory(
+                    node_config=self._item_config(index),
+                    context_manager=self.context_manager,
+                    llm_config=self.llm_config,
+                    callbacks=self.callbacks,
+                    tool_service=self.tool_service,
+                    llm_service=self.llm_service
+                )
+                return await node.execute({**base_context, self.map_config.item_key: item})
+        
+        logger.info(f"Map node '{self.config.id}' fanning out {len(chunks)} sub-executions (concurrency {self.max_concurrency})")
+        # The sub-executions take the budget slots; holding ours too could deadlock a small budget
+        async with slot_released():
+            with deadline_scope(self.config.timeout):
+                item_results = await asyncio.gather(
+                    *(run_item(index, item) for index, item in enumerate(chunks)),
+                    return_exceptions=True
+                )
+        
+        outputs = []
+        errors = []
+        usage = None
+        for index, item_result in enumerate(item_results):
+            if isinstance(item_result, BaseException):
+                if isinstance(item_result, asyncio.CancelledError):
+                    raise item_result
+                errors.append(f"[{index}] {item_result.__class__.__name__}: {item_result}")
+                outputs.append(None)
+                continue
+            if not item_result.success:
+                errors.append(f"[{index}] {item_result.error}")
+                outputs.append(None)
+            else:
+                outputs.append(item_result.output)
+            usage = self._add_usage(usage, item_result.usage)
+            
+        end_time = datetime.utcnow()
+        if errors and not self.map_config.allow_partial:
+            result = self._failure(
+                start_time,
+                f"Map node '{self.config.id}': {len(errors)} of {len(chunks)} sub-executions failed:\n" + "\n".join(errors),
+                "MapItemError"
+            )
+            result.usage = usage
+            return result
+            
+        output = {"results": outputs, "count": len(outputs)}
+        if errors:
+            output["errors"] = errors
+        return NodeExecutionResult(
+            success=True,
+            output=output,
+            metadata=NodeMetadata(
+                node_id=self.config.id,
+                node_type=self.config.type,
+                start_time=start_time,
+                end_time=end_time,
+                duration=(end_time - start_time).total_seconds(),
+                provider=self.config.provider
+            ),
+            usage=usage,
+            execution_time=(end_time - start_time).total_seconds()
+        )
+        
+    def _add_usage(self, total: Optional[UsageMetadata], usage: Optional[UsageMetadata]) -> Optional[UsageMetadata]:
+        """Sum sub-execution usage into one record attributed to the map node"""
+        if usage is None:
+            return total
+        if total is None:
+            return usage.model_copy(update={"node_id": self.config.id})
+        return total.model_copy(update={
+            "prompt_tokens": total.prompt_tokens + usage.prompt_tokens,
+            "completion_tokens": total.completion_tokens + usage.completion_tokens,
+            "total_tokens": total.total_tokens + usage.total_tokens,
+            "cached_prompt_tokens": total.cached_prompt_tokens + usage.cached_prompt_tokens,
+            "cost": total.cost + usage.cost,
+            "api_calls": total.api_calls + usage.api_calls
+        })
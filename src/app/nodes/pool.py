@@ -0,0 +1,141 @@
+"""
+Pool of node instances reused across chain executions
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.models.config import LLMConfig
+from app.models.node_models import NodeConfig
+
+logger = logging.getLogger(__name__)
+
+# Fields that change on every NodeConfig construction (or per chain) without changing behaviour
+_VOLATILE_FIELDS = {"level": True, "metadata": {"created_at", "modified_at", "timestamp", "start_time", "end_time"}}
+
+def node_config_hash(node_config: NodeConfig, llm_config: Optional[LLMConfig] = None) -> str:
+    """Hash of everything that determines how a node instance behaves.
+
+    Args:
+        node_config: Node configuration (execution level and metadata timestamps ignored)
+        llm_config: LLM configuration the instance is built with
+
+    Returns:
+        Hex digest shared by configurations that would build identical nodes
+    """
+    payload = {
+        "node": node_config.model_dump(mode="json", exclude=_VOLATILE_FIELDS),
+        "llm_config": llm_config.model_dump(mode="json") if llm_config else None,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class NodePool:
+    """LRU pool of node instances keyed by node configuration hash.
+
+    Nodes keep no per-execution state, so one built node can serve every execution of
+    the same configuration, including concurrent ones. Besides the configuration
+    hash, a node is only shared between callers that use the same factory, tool
+    service, parallelism limit and LLM service; the pool holds references to those
+    process-wide objects, so a key is never reused by a different object.
+
+    The context manager and callbacks belong to the calling chain. The pool keeps its
+    nodes without them and hands every caller a shallow copy bound to its own, so
+    chains that each bring a new context manager still share nodes, and the pool never
+    keeps a finished chain's context (and its node outputs) alive.
+
+    Hashing a configuration costs more than building most nodes, so the hash is
+    memoized per configuration object; configurations are treated as immutable once
+    they have been executed (the execution level, which chains set, is not hashed).
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._nodes: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+        # (id(node_config), id(llm_config)) -> (node_config, llm_config, hash); the objects
+        # are kept alive so their ids cannot be reused while the entry exists
+        self._hashes: "OrderedDict[Tuple[int, int], Tuple[NodeConfig, Optional[LLMConfig], str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(
+        self,
+        factory: Callable[..., Any],
+        node_config: NodeConfig,
+        context_manager: Any,
+        llm_config: Optional[LLMConfig] = None,
+        callbacks: Optional[List[Any]] = None,
+        tool_service: Optional[Any] = None,
+        max_parallel: Optional[int] = None,
+        llm_service: Optional[Any] = None
+    ) -> Any:
+        """Get a pooled node for this configuration, building it with `factory` on a miss.
+
+        Returns:
+            A node bound to `context_manager` and `callbacks`
+
+        Raises:
+            Whatever `factory` raises for an invalid configuration; failures are not pooled
+        """
+        key = (
+            self._config_hash(node_config, llm_config),
+            factory,
+            tool_service,
+            max_parallel,
+            llm_service
+        )
+        node = self._nodes.get(key)
+        if node is not None:
+            self._nodes.move_to_end(key)
+            self.hits += 1
+            return self._bind(node, context_manager, callbacks)
+        self.misses += 1
+        node = factory(
+            node_config=node_config,
+            context_manager=context_manager,
+            llm_config=llm_config,
+            callbacks=callbacks,
+            tool_service=tool_service,
+            max_parallel=max_parallel,
+            llm_service=llm_service
+        )
+        self._nodes[key] = self._bind(node, None, None)
+        while len(self._nodes) > self.maxsize:
+            self._nodes.popitem(last=False)
+        return self._bind(node, context_manager, callbacks)
+
+    @staticmethod
+    def _bind(node: Any, context_manager: Any, callbacks: Optional[List[Any]]) -> Any:
+        bound = copy.copy(node)
+        bound.context_manager = context_manager
+        bound.callbacks = callbacks or []
+        return bound
+
+    def _config_hash(self, node_config: NodeConfig, llm_config: Optional[LLMConfig]) -> str:
+        identity = (id(node_config), id(llm_config))
+        entry = self._hashes.get(identity)
+        if entry is not None:
+            self._hashes.move_to_end(identity)
+            return entry[2]
+        digest = node_config_hash(node_config, llm_config)
+        self._hashes[identity] = (node_config, llm_config, digest)
+        while len(self._hashes) > self.maxsize * 2:
+            self._hashes.popitem(last=False)
+        return digest
+
+    def clear(self) -> None:
+        self._nodes.clear()
+        self._hashes.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._nodes), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+_node_pool = NodePool(maxsize=int(os.getenv("SCRIPTCHAIN_NODE_POOL_SIZE", 512)))
+
+def get_node_pool() -> NodePool:
+    """Get the process-wide node pool"""
+    return _node_pool
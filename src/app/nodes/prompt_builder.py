@@ -2,6 +2,7 @@ import json
 from app.models.node_models import NodeConfig
 from app.models.config import LLMConfig
 from app.utils.token_counter import TokenCounter
+from app.utils.prompt_segments import NodePrompt, SegmentedPrompt
 from app.nodes.constants import TOOL_INSTRUCTION
 
 # Standalone function for building the tool preamble
@@ -53,7 +54,12 @@ def build_tool_preamble(tools: list) -> str:
 
 # Standalone function for preparing the prompt
 
-def prepare_prompt(config: NodeConfig, context_manager, llm_config: LLMConfig, tool_service, inputs: dict) -> str:
+def prepare_prompt(config: NodeConfig, context_manager, llm_config: LLMConfig, tool_service, inputs: dict) -> NodePrompt:
+    """Build the node's prompt: the tool preamble, then the template and input variables.
+
+    Returns a SegmentedPrompt whose stable prefix is the tool preamble, so handlers can
+    have the provider cache it (a truncated prompt is returned as a plain string).
+    """
     template = config.prompt
     selected_contexts = {}
     # Filter inputs based on selection
@@ -90,8 +96,8 @@ def prepare_prompt(config: NodeConfig, context_manager, llm_config: LLMConfig, t
         for k, v in formatted_inputs.items():
             user_lines.append(f"{k}: {v}")
     user_message = "\n".join(user_lines)
-    # Compose final prompt as system + user message
-    prompt_with_preamble = preamble + user_message
+    # Compose final prompt as system + user message; the preamble is the same on every call
+    prompt_with_preamble = SegmentedPrompt(preamble, user_message)
     # Validate total token count
     try:
         total_tokens = TokenCounter.count_tokens(
@@ -101,8 +107,16 @@ def prepare_prompt(config: NodeConfig, context_manager, llm_config: LLMConfig, t
         )
         # Only check token limits if max_context_tokens is set
         if llm_config.max_context_tokens is not None and total_tokens > llm_config.max_context_tokens:
-            # Truncate prompt if needed
-            prompt_with_preamble = prompt_with_preamble[:llm_config.max_context_tokens * 4]  # rough estimate
+            # Truncate prompt if needed; the cut may fall inside the preamble, so the result
+            # is a plain string and the call is deliberately not prompt-cached
+            prompt_with_preamble = str(prompt_with_preamble)[:llm_config.max_context_tokens * 4]  # rough estimate
     except ValueError:
         pass
-    return prompt_with_preamble 
\ No newline at end of file
+    return prompt_with_preamble
+
+# Standalone function for building the per-tool system message
+
+def build_system_message_for_tool(tool: dict) -> str:
+    """Build a short system message that points the LLM at a node's configured tool."""
+    description = tool.get('description') or ''
+    return f"SYSTEM: This step uses the '{tool['name']}' tool. {description}".strip() + "\n" + TOOL_INSTRUCTION
@@ -0,0 +1,156 @@
+"""
+Router node: picks one downstream branch so the chain can skip the others
+"""
+
+import json
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.models.config import LLMConfig
+from app.models.node_models import NodeConfig, NodeExecutionResult, NodeMetadata, UsageMetadata
+from app.nodes.base import BaseNode
+from app.services.llm_service import LLMService, get_llm_service
+from app.utils.callbacks import ScriptChainCallback
+from app.utils.context import GraphContextManager
+from app.utils.deadline import DeadlineExceededError, deadline_scope, with_deadline
+from app.utils.expressions import ExpressionError, compile_expression, evaluate
+
+logger = logging.getLogger(__name__)
+
+ROUTER_MAX_TOKENS = 16
+
+class RouterNode(BaseNode):
+    """Selects one of ``router_config.routes`` and outputs ``{"route": name}``.
+
+    With ``router_config.expression`` the route is computed from the node's context
+    without any model call; otherwise the node's model is asked to answer with one of
+    the route names. ScriptChain skips the nodes that start the untaken routes, and
+    every node below them that has nothing but skipped (or router) dependencies, so
+    they are never instantiated.
+    """
+
+    def __init__(
+        self,
+        config: NodeConfig,
+        context_manager: GraphContextManager,
+        llm_config: Optional[LLMConfig] = None,
+        callbacks: Optional[List[ScriptChainCallback]] = None,
+        llm_service: Optional[LLMService] = None
+    ):
+        super().__init__(config)
+        if config.router_config is None:
+            raise ValueError(f"Router node {config.id} requires router_config")
+        self.router_config = config.router_config
+        self.context_manager = context_manager
+        self.llm_config = llm_config
+        self.callbacks = callbacks or []
+        self.llm_service = llm_service or get_llm_service()
+        # Reject unsafe or malformed expressions before anything runs
+        self.expression = compile_expression(self.router_config.expression) if self.router_config.expression else None
+
+    def _metadata(self, start_time: datetime, error_type: Optional[str] = None) -> NodeMetadata:
+        end_time = datetime.utcnow()
+        return NodeMetadata(
+            node_id=self.config.id,
+            node_type=self.config.type,
+            start_time=start_time,
+            end_time=end_time,
+            duration=(end_time - start_time).total_seconds(),
+            error_type=error_type,
+            provider=self.config.provider
+        )
+
+    def _match_route(self, answer: str) -> Optional[str]:
+        """Map a free-text answer onto a route name (exact match first, then whole word)"""
+        cleaned = answer.strip().strip('."\'`*').strip().lower()
+        by_name = {name.lower(): name for name in self.router_config.routes}
+        if cleaned in by_name:
+            return by_name[cleaned]
+        for lowered, name in by_name.items():
+            if re.search(rf"\b{re.escape(lowered)}\b", cleaned):
+                return name
+        return None
+
+    def _routing_prompt(self, context: Dict[str, Any]) -> str:
+        lines = [self.config.prompt.strip()]
+        if context:
+            lines.append("\nInput variables:")
+            for key, value in context.items():
+                lines.append(f"{key}: {value if isinstance(value, str) else json.dumps(value, default=str)}")
+        lines.append(f"\nAnswer with exactly one of: {', '.join(self.router_config.routes)}.")
+        return "\n".join(lines)
+
+    async def execute(self, context: Dict[str, Any]) -> NodeExecutionResult:
+        """Pick the route for this context.
+
+        The node's timeout (if set) bounds the model call.
+        """
+        start_time = datetime.utcnow()
+        context = context or {}
+        usage = None
+
+        if self.expression is not None:
+            try:
+                value = evaluate(self.expression, context)
+            except ExpressionError as e:
+                return NodeExecutionResult(
+                    success=False,
+                    error=f"Router '{self.config.id}': {e}",
+                    metadata=self._metadata(start_time, "ExpressionError")
+                )
+            answer = ("true" if value else "false") if isinstance(value, bool) else str(value)
+        else:
+            llm_config = self.llm_config or LLMConfig(
+                provider=self.config.provider,
+                model=self.config.model,
+                temperature=0,
+                max_tokens=ROUTER_MAX_TOKENS
+            )
+            try:
+                with deadline_scope(self.config.timeout):
+                    answer, usage_dict, handler_error = await with_deadline(self.llm_service.generate(
+                        llm_config=llm_config,
+                        prompt=self._routing_prompt(context),
+                        context={}
+                    ), "routing LLM call")
+            except DeadlineExceededError as e:
+                return NodeExecutionResult(
+                    success=False,
+                    error=f"Router '{self.config.id}': Timed out after {self.config.timeout}s: {e}",
+                    metadata=self._metadata(start_time, "TimeoutError")
+                )
+            if handler_error:
+                return NodeExecutionResult(
+                    success=False,
+                    error=f"Router '{self.config.id}': {handler_error}",
+                    metadata=self._metadata(start_time, "LLMHandlerError")
+                )
+            if usage_dict:
+                usage = UsageMetadata(
+                    prompt_tokens=usage_dict.get("prompt_tokens", 0),
+                    completion_tokens=usage_dict.get("completion_tokens", 0),
+                    total_tokens=usage_dict.get("total_tokens", 0),
+                    cached_prompt_tokens=usage_dict.get("cached_prompt_tokens", 0),
+                    model=llm_config.model,
+                    node_id=self.config.id,
+                    provider=self.config.provider
+                )
+
+        route = self._match_route(answer or "") or self.router_config.default_route
+        if route is None:
+            return NodeExecutionResult(
+                success=False,
+                error=f"Router '{self.config.id}': {answer!r} matches none of the routes {list(self.router_config.routes)}",
+                metadata=self._metadata(start_time, "RoutingError"),
+                usage=usage
+            )
+        logger.info(f"Router '{self.config.id}' selected route '{route}'")
+        metadata = self._metadata(start_time)
+        return NodeExecutionResult(
+            success=True,
+            output={"route": route},
+            metadata=metadata,
+            usage=usage,
+            execution_time=metadata.duration
+        )
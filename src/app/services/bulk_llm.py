@@ -0,0 +1,171 @@
+"""
+Offline bulk mode: LLM calls gathered into provider batch jobs
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from app.llm_providers.batch import BatchBackend
+from app.models.config import LLMConfig
+from app.services.execution_budget import slot_released
+from app.services.llm_service import LLMService, get_llm_service
+
+logger = logging.getLogger(__name__)
+
+class _PendingCall:
+    """A call waiting for its batch"""
+    def __init__(self, llm_config: LLMConfig, prompt: str, future: asyncio.Future):
+        self.llm_config = llm_config
+        self.prompt = prompt
+        self.future = future
+
+    def resolve(self, result: Tuple[str, Optional[Dict[str, int]], Optional[str]]) -> None:
+        # The caller may have given up (e.g. its node timed out)
+        if not self.future.done():
+            self.future.set_result(result)
+
+class BulkLLMService:
+    """Drop-in replacement for LLMService that runs calls as provider batch jobs.
+
+    Calls made within `collect_window` seconds of each other are submitted as one
+    batch per provider, so sharing one instance between chains (``ScriptChain(...,
+    llm_service=bulk)``) gathers the ready nodes of all of them. Each caller waits
+    until its batch has finished, polled every `poll_interval` seconds. Batch jobs
+    cost less and have their own rate limits but take minutes to hours, so this is
+    for non-interactive runs; give the nodes no timeout or a generous one. A node
+    waiting for its batch hands its execution-budget slot back meanwhile, so parked
+    nodes neither cap the batch size nor hold up interactive work.
+
+    Providers without a backend, tool-calling calls, routed calls and configs with
+    their own API key go to the interactive `llm_service` instead.
+    """
+
+    def __init__(
+        self,
+        backends: Dict[Any, BatchBackend],
+        llm_service: Optional[LLMService] = None,
+        collect_window: float = 1.0,
+        max_batch_size: int = 50000,
+        poll_interval: float = 30.0
+    ):
+        self.backends = {self._provider_key(provider): backend for provider, backend in backends.items()}
+        self._llm_service = llm_service
+        self.collect_window = collect_window
+        self.max_batch_size = max_batch_size
+        self.poll_interval = poll_interval
+        self._pending: Dict[str, List[_PendingCall]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        self._jobs: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_calls = 0
+        self.failed_batches = 0
+        self.interactive_calls = 0
+
+    @property
+    def llm_service(self) -> LLMService:
+        return self._llm_service or get_llm_service()
+
+    @staticmethod
+    def _provider_key(provider: Any) -> str:
+        return str(getattr(provider, "value", provider))
+
+    async def generate(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        tools: Optional[list] = None
+    ) -> Tuple[str, Optional[Dict[str, int]], Optional[str]]:
+        """Same contract as LLMService.generate(); resolves once the call's batch has finished."""
+        provider = self._provider_key(llm_config.provider)
+        backend = self.backends.get(provider)
+        if backend is None or tools or llm_config.routing_group or llm_config.api_key:
+            self.interactive_calls += 1
+            return await self.llm_service.generate(llm_config, prompt, context, tools)
+
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(provider, [])
+        pending.append(_PendingCall(llm_config, prompt, future))
+        if len(pending) >= self.max_batch_size:
+            self._submit(provider)
+        elif provider not in self._timers:
+            self._timers[provider] = asyncio.create_task(self._submit_after_window(provider))
+        async with slot_released():
+            return await future
+
+    async def stream(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        tools: Optional[list] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """Same contract as LLMService.stream(); the whole text arrives as one delta."""
+        text, usage, error = await self.generate(llm_config, prompt, context, tools)
+        if error:
+            yield "", None, error
+            return
+        if text:
+            yield text, None, None
+        yield "", usage, None
+
+    async def flush(self) -> None:
+        """Submit every gathered call now instead of at the end of its collect window."""
+        for provider in list(self._pending):
+            self._submit(provider)
+        await asyncio.sleep(0)
+
+    async def _submit_after_window(self, provider: str) -> None:
+        await asyncio.sleep(self.collect_window)
+        self._timers.pop(provider, None)
+        self._submit(provider)
+
+    def _submit(self, provider: str) -> None:
+        timer = self._timers.pop(provider, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        calls = self._pending.pop(provider, [])
+        if not calls:
+            return
+        job = asyncio.create_task(self._run_batch(provider, calls))
+        self._jobs.add(job)
+        job.add_done_callback(self._jobs.discard)
+
+    async def _run_batch(self, provider: str, calls: List[_PendingCall]) -> None:
+        """Submit one batch, poll it until it finishes and hand each caller its result."""
+        backend = self.backends[provider]
+        by_id = {f"request-{index}": call for index, call in enumerate(calls)}
+        self.batches += 1
+        self.batched_calls += len(calls)
+        try:
+            batch_id = await backend.submit([
+                backend.build_request(custom_id, call.llm_config, call.prompt) for custom_id, call in by_id.items()
+            ])
+            logger.info(f"Submitted {provider} batch {batch_id} with {len(calls)} requests")
+            job = await backend.poll(batch_id)
+            while not job.done:
+                await asyncio.sleep(self.poll_interval)
+                job = await backend.poll(batch_id)
+            if job.status not in ("completed", "expired"):
+                raise RuntimeError(f"batch {batch_id} {job.status}" + (f": {job.error}" if job.error else ""))
+            # Expired batches still return the requests that finished in time
+            results = await backend.results(batch_id)
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error(f"{provider} batch of {len(calls)} requests failed: {str(e)}")
+            for call in calls:
+                call.resolve(("", None, f"{provider} batch failed: {e}"))
+            return
+        logger.info(f"{provider} batch {batch_id} {job.status}: {len(results)} of {len(calls)} results")
+        for custom_id, call in by_id.items():
+            call.resolve(results.get(custom_id) or ("", None, f"{provider} batch {batch_id} {job.status} without a result for this request"))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "pending_calls": {provider: len(calls) for provider, calls in self._pending.items()},
+            "running_batches": len(self._jobs),
+            "batches": self.batches,
+            "batched_calls": self.batched_calls,
+            "failed_batches": self.failed_batches,
+            "interactive_calls": self.interactive_calls,
+        }
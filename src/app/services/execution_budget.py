@@ -0,0 +1,148 @@
+"""
+Process-wide execution budget shared by every chain and node route
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_EXECUTIONS = 20
+
+class _HeldSlot:
+    """A slot held by the current task, which it can hand back while it is parked"""
+    def __init__(self, budget: "ExecutionBudget", owner: str):
+        self.budget = budget
+        self.owner = owner
+        self.held = True
+
+# Slot of the node execution running in the current task, if any
+_held_slot: ContextVar[Optional[_HeldSlot]] = ContextVar("scriptchain_execution_slot", default=None)
+
+class ExecutionBudget:
+    """
+    Caps the number of node executions in flight across the whole process.
+    Waiters are queued per owner (e.g. a chain ID) and slots are handed out
+    round-robin between owners, so one wide chain cannot starve the others.
+    """
+    def __init__(self, limit: int = DEFAULT_MAX_CONCURRENT_EXECUTIONS):
+        if limit < 1:
+            raise ValueError("Execution budget limit must be at least 1.")
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def waiting(self) -> int:
+        """Number of callers currently queued for a slot."""
+        return sum(len(queue) for queue in self._waiters.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {"limit": self.limit, "in_use": self.in_use, "waiting": self.waiting}
+
+    async def acquire(self, owner: str) -> None:
+        """Wait for a slot on behalf of `owner`."""
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(owner, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just before the cancellation landed; hand it on
+                self.release()
+            else:
+                self._discard(owner, future)
+            raise
+
+    def release(self) -> None:
+        """Return a slot and grant it to the next owner in round-robin order."""
+        self.in_use -= 1
+        while self.in_use < self.limit and self._waiters:
+            owner, queue = next(iter(self._waiters.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(owner)
+            else:
+                del self._waiters[owner]
+            if future.done():
+                continue
+            self.in_use += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, owner: str):
+        """Hold one slot for the duration of the block (see slot_released())."""
+        await self.acquire(owner)
+        held = _HeldSlot(self, owner)
+        token = _held_slot.set(held)
+        try:
+            yield
+        finally:
+            _held_slot.reset(token)
+            if held.held:
+                self.release()
+
+    def _discard(self, owner: str, future: asyncio.Future) -> None:
+        queue = self._waiters.get(owner)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiters[owner]
+
+def current_slot() -> Optional[Tuple[ExecutionBudget, str]]:
+    """Budget and owner of the slot the current task holds, if any"""
+    held = _held_slot.get()
+    if held is None or not held.held:
+        return None
+    return held.budget, held.owner
+
+@asynccontextmanager
+async def slot_released():
+    """Hand the current task's slot back for the duration of the block.
+
+    For executions that park on something which needs no execution capacity, such as a
+    provider batch job. The slot is queued for again when the block finishes; if the
+    block raises, it is not, and the enclosing slot() has nothing left to release.
+    Outside a slot this does nothing.
+    """
+    held = _held_slot.get()
+    if held is None or not held.held:
+        yield
+        return
+    held.held = False
+    held.budget.release()
+    yield
+    await held.budget.acquire(held.owner)
+    held.held = True
+
+_execution_budget: Optional[ExecutionBudget] = None
+
+def configure_execution_budget(limit: Optional[int] = None) -> ExecutionBudget:
+    """
+    (Re)create the process-wide budget. Called once at app startup; `limit` defaults to
+    the SCRIPTCHAIN_MAX_CONCURRENT_EXECUTIONS env var, then DEFAULT_MAX_CONCURRENT_EXECUTIONS.
+    """
+    global _execution_budget
+    if limit is None:
+        limit = int(os.getenv("SCRIPTCHAIN_MAX_CONCURRENT_EXECUTIONS", DEFAULT_MAX_CONCURRENT_EXECUTIONS))
+    _execution_budget = ExecutionBudget(limit)
+    logger.info(f"Execution budget configured: {limit} concurrent node executions")
+    return _execution_budget
+
+def get_execution_budget() -> ExecutionBudget:
+    """Get the process-wide budget, creating it from the environment on first use."""
+    if _execution_budget is None:
+        return configure_execution_budget()
+    return _execution_budget
@@ -0,0 +1,139 @@
+"""
+Latency tracking and hedged (duplicate) requests for LLM provider calls
+"""
+
+import asyncio
+import logging
+import math
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+class HedgingPolicy(BaseModel):
+    """When to send a duplicate request for a slow call"""
+    enabled: bool = Field(False, description="Hedge calls by default (LLMConfig.hedge overrides per node)")
+    percentile: float = Field(0.95, gt=0, lt=1, description="Latency percentile after which a hedge is sent")
+    min_samples: int = Field(20, ge=1, description="Latency samples needed before hedging a model")
+    max_hedges: int = Field(1, ge=1, description="Maximum duplicate requests per call")
+    min_delay: float = Field(0.05, ge=0, description="Never hedge earlier than this many seconds")
+
+class LatencyTracker:
+    """Sliding window of successful call latencies per (provider, model)"""
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+
+    def record(self, provider: str, model: str, latency: float) -> None:
+        samples = self._samples.get((provider, model))
+        if samples is None:
+            samples = self._samples[(provider, model)] = deque(maxlen=self.window)
+        samples.append(latency)
+
+    def count(self, provider: str, model: str) -> int:
+        return len(self._samples.get((provider, model), ()))
+
+    def percentile(self, provider: str, model: str, percentile: float) -> Optional[float]:
+        """Latency at the given percentile (0-1), or None without samples."""
+        samples = self._samples.get((provider, model))
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(percentile * len(ordered)) - 1))
+        return ordered[index]
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        metrics = {}
+        for (provider, model) in self._samples:
+            metrics[f"{provider}/{model}"] = {
+                "samples": self.count(provider, model),
+                "p50_seconds": round(self.percentile(provider, model, 0.5), 4),
+                "p95_seconds": round(self.percentile(provider, model, 0.95), 4),
+                "p99_seconds": round(self.percentile(provider, model, 0.99), 4),
+            }
+        return metrics
+
+def _failed(task: asyncio.Task) -> bool:
+    """A call failed if it raised or returned an error tuple (text, usage, error)."""
+    if task.exception() is not None:
+        return True
+    result = task.result()
+    return isinstance(result, tuple) and len(result) == 3 and bool(result[2])
+
+async def hedged_call(
+    make_call: Callable[[], Awaitable[Any]],
+    delay: float,
+    max_hedges: int = 1
+) -> Tuple[Any, int]:
+    """Run `make_call`, starting a duplicate every `delay` seconds until one answers.
+
+    The first successful response wins and the remaining attempts are cancelled. If
+    every attempt fails, the first failure is returned (or raised); failures are never
+    retried.
+
+    Args:
+        make_call: Factory returning a fresh awaitable for each attempt
+        delay: Seconds to wait for an answer before hedging
+        max_hedges: Maximum number of duplicate attempts
+
+    Returns:
+        Tuple of the winning result and the number of hedges sent
+    """
+    attempts = [asyncio.ensure_future(make_call())]
+    failures = []
+    try:
+        while True:
+            pending = [task for task in attempts if not task.done()]
+            can_hedge = len(attempts) <= max_hedges
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=delay if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            # Resolve in start order so ties go to the earliest attempt
+            for task in attempts:
+                if task in done:
+                    if _failed(task):
+                        failures.append(task)
+                    else:
+                        return task.result(), len(attempts) - 1
+            if len(failures) == len(attempts):
+                # Hedging is for latency, not retries: give up once every attempt failed
+                return failures[0].result(), len(attempts) - 1
+            if can_hedge and not done:
+                # Nothing answered in time: send a duplicate
+                attempts.append(asyncio.ensure_future(make_call()))
+    finally:
+        for task in attempts:
+            if not task.done():
+                task.cancel()
+
+_latency_tracker = LatencyTracker()
+
+def get_latency_tracker() -> LatencyTracker:
+    """Get the process-wide latency tracker, shared by every LLMService"""
+    return _latency_tracker
+
+_hedging_policy: Optional[HedgingPolicy] = None
+
+def configure_hedging(policy: Optional[HedgingPolicy] = None) -> HedgingPolicy:
+    """
+    (Re)create the process-wide hedging policy. Defaults to LLM_HEDGING_ENABLED and
+    LLM_HEDGING_PERCENTILE from the environment; hedging is off unless enabled.
+    """
+    global _hedging_policy
+    if policy is None:
+        policy = HedgingPolicy(
+            enabled=os.getenv("LLM_HEDGING_ENABLED", "false").lower() in ("1", "true", "yes"),
+            percentile=float(os.getenv("LLM_HEDGING_PERCENTILE", 0.95))
+        )
+    _hedging_policy = policy
+    return _hedging_policy
+
+def get_hedging_policy() -> HedgingPolicy:
+    """Get the process-wide hedging policy, creating it from the environment on first use."""
+    if _hedging_policy is None:
+        return configure_hedging()
+    return _hedging_policy
@@ -2,20 +2,90 @@ from app.llm_providers.openai_handler import OpenAIHandler
 from app.llm_providers.anthropic_handler import AnthropicHandler
 from app.llm_providers.google_gemini_handler import GoogleGeminiHandler
 from app.llm_providers.deepseek_handler import DeepSeekHandler
+from app.llm_providers.mock_handler import MockLLMHandler
 from app.models.config import LLMConfig, ModelProvider
-from typing import Dict, Any, Optional, Tuple
+from app.services.rate_limiter import RateLimiter, get_rate_limiter
+from app.services.hedging import HedgingPolicy, LatencyTracker, get_hedging_policy, get_latency_tracker, hedged_call
+from app.services.response_cache import ResponseCache, get_response_cache, response_cache_key, reuses_responses
+from app.services.single_flight import SingleFlight
+from app.services.retry import CircuitBreaker, CircuitBreakers, RetryPolicy, get_circuit_breakers, get_retry_policy
+from app.services.provider_routing import ProviderRouter, RouteTarget, get_provider_router
+from app.llm_providers.errors import ProviderError
+from app.utils.deadline import remaining_time
+from app.utils.token_counter import TokenCounter
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 class LLMService:
     """
     Service abstraction for LLM calls. Routes to the correct handler based on provider.
+    Calls are admitted through a per-provider/per-model RPM/TPM rate limiter and, when
+    hedging is enabled, duplicated once they outlive the model's tail latency.
+    Transient provider failures are retried with jittered backoff, and a per-provider
+    circuit breaker fails calls fast while a provider keeps failing.
+    Cacheable calls (see ResponseCache.should_cache()) are answered from the response
+    cache when an identical call has succeeded before, and share one provider call
+    with identical calls already in flight.
+    A config with a routing_group is sent to the healthiest member of that group
+    (see ProviderRouter) and fails over to the next member on error.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        rate_limiter: Optional[RateLimiter] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        latency_tracker: Optional[LatencyTracker] = None,
+        response_cache: Optional[ResponseCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breakers: Optional[CircuitBreakers] = None,
+        router: Optional[ProviderRouter] = None
+    ):
         self.handlers = {
             ModelProvider.OPENAI: OpenAIHandler(),
             ModelProvider.ANTHROPIC: AnthropicHandler(),
             ModelProvider.GOOGLE: GoogleGeminiHandler(),
             ModelProvider.DEEPSEEK: DeepSeekHandler(),
+            # Offline replay provider for load tests and benchmarks (LLM_MOCK_* env vars)
+            ModelProvider.CUSTOM: MockLLMHandler.from_env(),
         }
+        self._rate_limiter = rate_limiter
+        self._hedging = hedging
+        self._response_cache = response_cache
+        self.single_flight = single_flight or SingleFlight()
+        self._retry_policy = retry_policy
+        self._circuit_breakers = circuit_breakers
+        self._router = router
+        self.latency_tracker = latency_tracker or get_latency_tracker()
+
+    # Resolved on use so a long-lived service follows configure_rate_limits()/configure_hedging()/
+    # configure_response_cache()/configure_retries()/configure_provider_routing()
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self._rate_limiter or get_rate_limiter()
+
+    @property
+    def hedging(self) -> HedgingPolicy:
+        return self._hedging or get_hedging_policy()
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        return self._response_cache or get_response_cache()
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        return self._retry_policy or get_retry_policy()
+
+    @property
+    def circuit_breakers(self) -> CircuitBreakers:
+        return self._circuit_breakers or get_circuit_breakers()
+
+    @property
+    def router(self) -> ProviderRouter:
+        return self._router or get_provider_router()
 
     async def generate(
         self,
@@ -26,14 +96,365 @@ class LLMService:
     ) -> Tuple[str, Optional[Dict[str, int]], Optional[str]]:
         """
         Generate text using the specified LLM provider.
+        Waits for rate-limit capacity first, using TokenCounter's estimate of the prompt size.
+        Identical concurrent calls that may share a response (see reuses_responses())
+        are coalesced into one provider call. A cache hit or a coalesced call spends no
+        tokens, so it is returned without usage.
         """
         provider = llm_config.provider
         handler = self.handlers.get(provider)
-        if not handler:
+        if llm_config.routing_group:
+            if llm_config.routing_group not in self.router.groups:
+                return "", None, f"Unknown routing group: {llm_config.routing_group}"
+        elif not handler:
             return "", None, f"No handler for provider: {provider}"
-        return await handler.generate_text(
-            llm_config=llm_config,
-            prompt=prompt,
-            context=context or {},
-            tools=tools
+
+        cache = self.response_cache
+        use_cache = cache.should_cache(llm_config)
+        request_key = response_cache_key(llm_config, prompt, context, tools) if reuses_responses(llm_config) else None
+        if use_cache:
+            cached = cache.get(request_key)
+            if cached is not None:
+                return cached[0], None, None
+
+        async def call() -> Tuple[str, Optional[Dict[str, int]], Optional[str]]:
+            return await self._call(handler, llm_config, prompt, context or {}, tools)
+
+        async def fetch() -> Tuple[str, Optional[Dict[str, int]], Optional[str]]:
+            delay = None if llm_config.routing_group else self._hedge_delay(llm_config)
+            if llm_config.routing_group:
+                # Routed calls fail over to another member instead of hedging
+                result = await self._routed_call(llm_config, prompt, context or {}, tools)
+            elif delay is None:
+                result = await call()
+            else:
+                result, hedges = await hedged_call(call, delay, self.hedging.max_hedges)
+                if hedges:
+                    logger.info(f"Hedged {self._provider_key(provider)}/{llm_config.model} call after {delay:.2f}s ({hedges} duplicate request(s))")
+            if use_cache and not result[2]:
+                cache.put(request_key, result[0], result[1], llm_config.cache_ttl)
+            return result
+
+        if request_key is None:
+            return await fetch()
+        (text, usage, error), shared = await self.single_flight.do(request_key, fetch)
+        return (text, None, error) if shared else (text, usage, error)
+
+    async def _call(
+        self,
+        handler: Any,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list],
+        max_retries: Optional[int] = None
+    ) -> Tuple[str, Optional[Dict[str, int]], Optional[str]]:
+        """
+        One rate-limited provider request, retried with backoff on transient failures
+        while the provider's circuit is closed; successful latencies feed the tracker,
+        and every attempt feeds the routing health stats. Provider errors that are not
+        retried are returned as the error string.
+        """
+        provider = llm_config.provider
+        provider_key = self._provider_key(provider)
+        breaker = self.circuit_breakers.get(provider_key)
+        retry = 0
+        while True:
+            if not breaker.allow():
+                return "", None, self._circuit_open_message(provider, breaker)
+            estimated_tokens = TokenCounter.estimate_tokens(prompt, llm_config.model, provider)
+            await self.rate_limiter.acquire(provider, llm_config.model, estimated_tokens)
+            started_at = time.perf_counter()
+            try:
+                text, usage, error = await handler.generate_text(
+                    llm_config=llm_config,
+                    prompt=prompt,
+                    context=context,
+                    tools=tools
+                )
+            except ProviderError as e:
+                breaker.record(success=not e.retryable)
+                self.router.health.record(provider_key, llm_config.model, time.perf_counter() - started_at, success=False)
+                delay = self._retry_delay(e, retry, max_retries)
+                if delay is None:
+                    return "", None, str(e)
+                logger.warning(f"Retrying {self._provider_key(provider)}/{llm_config.model} call in {delay:.2f}s after {e.kind} error (retry {retry + 1}/{self.retry_policy.max_retries}): {e}")
+                retry += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                breaker.abandon()
+                raise
+            breaker.record(success=True)
+            elapsed = time.perf_counter() - started_at
+            self.router.health.record(provider_key, llm_config.model, elapsed, success=not error)
+            if not error:
+                self.latency_tracker.record(provider_key, llm_config.model, elapsed)
+            if usage:
+                self.rate_limiter.record_usage(provider, llm_config.model, estimated_tokens, usage.get("total_tokens"))
+            return text, usage, error
+
+    def _ranked_members(self, group_name: str) -> List[RouteTarget]:
+        """Members of a routing group, best first; providers with an open circuit last"""
+        return self.router.rank(group_name, is_open=lambda provider: self.circuit_breakers.get(provider).retry_in() > 0)
+
+    @staticmethod
+    def _member_config(llm_config: LLMConfig, member: RouteTarget) -> LLMConfig:
+        """The node's config with the provider and model of a routing group member"""
+        return llm_config.model_copy(update={
+            "provider": member.provider,
+            "model": member.model,
+            "routing_group": None,
+            # A key set on the node belongs to the node's own provider
+            "api_key": llm_config.api_key if member.provider == LLMService._provider_key(llm_config.provider) else None,
+            "custom_parameters": {**llm_config.custom_parameters, **member.custom_parameters},
+        })
+
+    async def _routed_call(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list]
+    ) -> Tuple[str, Optional[Dict[str, int]], Optional[str]]:
+        """
+        Call the members of llm_config.routing_group best first until one succeeds.
+        Only the last member retries transient failures; the others fail over at once.
+        """
+        group_name = llm_config.routing_group
+        members = self._ranked_members(group_name)
+        errors = []
+        for index, member in enumerate(members):
+            handler = self.handlers.get(member.provider)
+            if handler is None:
+                errors.append(f"{member.key}: no handler for provider")
+                continue
+            last = index == len(members) - 1
+            text, usage, error = await self._call(
+                handler, self._member_config(llm_config, member), prompt, context, tools,
+                max_retries=None if last else 0
+            )
+            if not error:
+                if errors:
+                    logger.info(f"Routing group '{group_name}' failed over to {member.key} ({'; '.join(errors)})")
+                return text, usage, None
+            errors.append(f"{member.key}: {error}")
+        return "", None, f"All members of routing group '{group_name}' failed: {'; '.join(errors)}"
+
+    def _retry_delay(self, error: ProviderError, retry: int, max_retries: Optional[int] = None) -> Optional[float]:
+        """Seconds to wait before retrying `error`, or None if it should not be retried.
+
+        Retrying stops once the retry budget (`max_retries`, default the policy's) is
+        spent, if the provider's Retry-After exceeds the policy's max_delay, or if
+        waiting would outlast the current deadline (the node's timeout).
+        """
+        max_retries = self.retry_policy.max_retries if max_retries is None else max_retries
+        if not error.retryable or retry >= max_retries:
+            return None
+        delay = self.retry_policy.backoff(retry, error.retry_after)
+        if delay is None:
+            logger.info(f"Not retrying {error.kind} error: Retry-After of {error.retry_after:.2f}s exceeds the {self.retry_policy.max_delay:.2f}s maximum backoff")
+            return None
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            logger.info(f"Not retrying {error.kind} error: a {delay:.2f}s backoff would pass the deadline ({remaining:.2f}s left)")
+            return None
+        return delay
+
+    def _circuit_open_message(self, provider: Any, breaker: CircuitBreaker) -> str:
+        return (
+            f"{self._provider_key(provider)} circuit breaker is open after {breaker.consecutive_failures} "
+            f"consecutive failures; calls are rejected for another {breaker.retry_in():.1f}s"
         )
+
+    async def stream(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        tools: Optional[list] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """
+        Stream text from the specified LLM provider as ``(delta, usage, error)`` tuples
+        (see BaseLLMHandler.stream_text()). Rate limited and cached like generate(); a
+        cache hit is yielded as a single delta. Streamed calls are never hedged, since a
+        duplicate could only help before the first token.
+        """
+        provider = llm_config.provider
+        handler = self.handlers.get(provider)
+        if llm_config.routing_group:
+            if llm_config.routing_group not in self.router.groups:
+                yield "", None, f"Unknown routing group: {llm_config.routing_group}"
+                return
+        elif not handler:
+            yield "", None, f"No handler for provider: {provider}"
+            return
+
+        cache = self.response_cache
+        cache_key = None
+        if cache.should_cache(llm_config):
+            cache_key = response_cache_key(llm_config, prompt, context, tools)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                if cached[0]:
+                    yield cached[0], None, None
+                yield "", None, None
+                return
+
+        if llm_config.routing_group:
+            stream = self._routed_stream(llm_config, prompt, context or {}, tools)
+        else:
+            stream = self._stream_call(handler, llm_config, prompt, context or {}, tools)
+        usage = None
+        error = None
+        chunks = []
+        try:
+            async for delta, chunk_usage, chunk_error in stream:
+                usage = chunk_usage or usage
+                error = chunk_error or error
+                if delta:
+                    chunks.append(delta)
+                yield delta, chunk_usage, chunk_error
+        finally:
+            await stream.aclose()
+        if not error and cache_key is not None:
+            cache.put(cache_key, "".join(chunks), usage, llm_config.cache_ttl)
+
+    async def _stream_call(
+        self,
+        handler: Any,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list],
+        max_retries: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """Streaming counterpart of _call(); retries only before the first delta."""
+        provider = llm_config.provider
+        provider_key = self._provider_key(provider)
+        breaker = self.circuit_breakers.get(provider_key)
+        retry = 0
+        while True:
+            if not breaker.allow():
+                yield "", None, self._circuit_open_message(provider, breaker)
+                return
+            estimated_tokens = TokenCounter.estimate_tokens(prompt, llm_config.model, provider)
+            await self.rate_limiter.acquire(provider, llm_config.model, estimated_tokens)
+            started_at = time.perf_counter()
+            usage = None
+            error = None
+            started = False
+            stream = handler.stream_text(
+                llm_config=llm_config,
+                prompt=prompt,
+                context=context,
+                tools=tools
+            )
+            try:
+                async for delta, chunk_usage, chunk_error in stream:
+                    usage = chunk_usage or usage
+                    error = chunk_error or error
+                    started = started or bool(delta)
+                    yield delta, chunk_usage, chunk_error
+            except ProviderError as e:
+                breaker.record(success=not e.retryable)
+                self.router.health.record(provider_key, llm_config.model, time.perf_counter() - started_at, success=False)
+                # Text already yielded cannot be taken back, so only retry before the first delta
+                delay = None if started else self._retry_delay(e, retry, max_retries)
+                if delay is None:
+                    yield "", None, str(e)
+                    return
+                logger.warning(f"Retrying {provider_key}/{llm_config.model} stream in {delay:.2f}s after {e.kind} error (retry {retry + 1}/{self.retry_policy.max_retries}): {e}")
+                retry += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                breaker.abandon()
+                raise
+            finally:
+                await stream.aclose()
+            breaker.record(success=True)
+            elapsed = time.perf_counter() - started_at
+            self.router.health.record(provider_key, llm_config.model, elapsed, success=not error)
+            if not error:
+                self.latency_tracker.record(provider_key, llm_config.model, elapsed)
+            if usage:
+                self.rate_limiter.record_usage(provider, llm_config.model, estimated_tokens, usage.get("total_tokens"))
+            return
+
+    async def _routed_stream(
+        self,
+        llm_config: LLMConfig,
+        prompt: str,
+        context: Dict[str, Any],
+        tools: Optional[list]
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, int]], Optional[str]]]:
+        """Streaming counterpart of _routed_call(); fails over only before the first delta."""
+        group_name = llm_config.routing_group
+        members = self._ranked_members(group_name)
+        errors = []
+        for index, member in enumerate(members):
+            handler = self.handlers.get(member.provider)
+            if handler is None:
+                errors.append(f"{member.key}: no handler for provider")
+                continue
+            last = index == len(members) - 1
+            stream = self._stream_call(
+                handler, self._member_config(llm_config, member), prompt, context, tools,
+                max_retries=None if last else 0
+            )
+            started = False
+            try:
+                async for delta, usage, error in stream:
+                    if error and not started and not last:
+                        errors.append(f"{member.key}: {error}")
+                        break
+                    if delta and not started and errors:
+                        logger.info(f"Routing group '{group_name}' failed over to {member.key} ({'; '.join(errors)})")
+                    started = started or bool(delta)
+                    yield delta, usage, error
+                else:
+                    return
+            finally:
+                await stream.aclose()
+        yield "", None, f"All members of routing group '{group_name}' failed: {'; '.join(errors)}"
+
+    def _hedge_delay(self, llm_config: LLMConfig) -> Optional[float]:
+        """Seconds after which to hedge this call, or None if it should not be hedged."""
+        enabled = llm_config.hedge if llm_config.hedge is not None else self.hedging.enabled
+        if not enabled:
+            return None
+        provider_key = self._provider_key(llm_config.provider)
+        if self.latency_tracker.count(provider_key, llm_config.model) < self.hedging.min_samples:
+            return None
+        latency = self.latency_tracker.percentile(provider_key, llm_config.model, self.hedging.percentile)
+        return max(self.hedging.min_delay, latency)
+
+    @staticmethod
+    def _provider_key(provider: Any) -> str:
+        return str(getattr(provider, "value", provider))
+
+    def get_rate_limit_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Wait-time metrics for every configured rate limit."""
+        return self.rate_limiter.get_metrics()
+
+    def get_latency_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Recent p50/p95/p99 latency per provider and model."""
+        return self.latency_tracker.get_metrics()
+
+    def get_circuit_breaker_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit state and failure counts per provider."""
+        return self.circuit_breakers.get_metrics()
+
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        """Response cache size and hit/miss counts, plus in-flight coalescing counts."""
+        return {**self.response_cache.stats(), "single_flight": self.single_flight.stats()}
+
+_llm_service: Optional[LLMService] = None
+
+def get_llm_service() -> LLMService:
+    """Get the process-wide LLM service shared by nodes that are not given their own"""
+    global _llm_service
+    if _llm_service is None:
+        _llm_service = LLMService()
+    return _llm_service
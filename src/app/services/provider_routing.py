@@ -0,0 +1,172 @@
+"""
+Routing groups of equivalent models across providers, ranked by live health
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from pydantic import BaseModel, Field, field_validator
+
+logger = logging.getLogger(__name__)
+
+class RouteTarget(BaseModel):
+    """One member of a routing group"""
+    provider: str = Field(..., description="Model provider, e.g. 'openai'")
+    model: str = Field(..., description="Model name at that provider")
+    custom_parameters: Dict[str, Any] = Field(default_factory=dict, description="Provider-specific parameters for this member")
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+class RoutingGroup(BaseModel):
+    """Models that are interchangeable for the nodes routed to this group"""
+    name: str
+    members: List[RouteTarget] = Field(..., min_length=1, description="Members in order of preference while no stats are known")
+
+    @field_validator("members", mode="before")
+    @classmethod
+    def parse_members(cls, members: List[Union[str, Dict[str, Any], RouteTarget]]) -> List[Any]:
+        """Accept 'provider/model' shorthand for members"""
+        parsed = []
+        for member in members:
+            if isinstance(member, str):
+                provider, _, model = member.partition("/")
+                if not model:
+                    raise ValueError(f"Routing group member {member!r} must be 'provider/model'")
+                member = {"provider": provider, "model": model}
+            parsed.append(member)
+        return parsed
+
+class _MemberStats:
+    """Exponentially weighted latency and error rate of one provider/model"""
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.updated_at = 0.0
+
+class ProviderHealth:
+    """EWMA latency and error rate per provider/model, fed by every LLM call.
+
+    A member's error rate decays towards zero while it gets no traffic (halving every
+    ``error_half_life`` seconds), so a provider that was demoted during an incident is
+    tried again once the incident is likely over.
+    """
+
+    def __init__(self, alpha: float = 0.2, error_half_life: float = 60.0):
+        self.alpha = alpha
+        self.error_half_life = error_half_life
+        self._stats: Dict[Tuple[str, str], _MemberStats] = {}
+
+    def record(self, provider: str, model: str, latency: float, success: bool) -> None:
+        stats = self._stats.get((provider, model))
+        if stats is None:
+            stats = self._stats[(provider, model)] = _MemberStats()
+        stats.error_rate = self.error_rate(provider, model)
+        stats.error_rate += self.alpha * ((0.0 if success else 1.0) - stats.error_rate)
+        # Failures often return fast; only successes say how long an answer takes
+        if success:
+            stats.latency = latency if stats.latency is None else stats.latency + self.alpha * (latency - stats.latency)
+        stats.calls += 1
+        stats.failures += 0 if success else 1
+        stats.updated_at = time.monotonic()
+
+    def latency(self, provider: str, model: str) -> Optional[float]:
+        stats = self._stats.get((provider, model))
+        return stats.latency if stats else None
+
+    def error_rate(self, provider: str, model: str) -> float:
+        stats = self._stats.get((provider, model))
+        if stats is None:
+            return 0.0
+        age = time.monotonic() - stats.updated_at
+        return stats.error_rate * 0.5 ** (age / self.error_half_life)
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            f"{provider}/{model}": {
+                "calls": stats.calls,
+                "failures": stats.failures,
+                "ewma_latency_seconds": round(stats.latency, 4) if stats.latency is not None else None,
+                "ewma_error_rate": round(self.error_rate(provider, model), 4),
+            }
+            for (provider, model), stats in self._stats.items()
+        }
+
+class ProviderRouter:
+    """Ranks the members of routing groups by live health.
+
+    Members are ordered by expected latency inflated by their error rate
+    (``latency / (1 - error_rate)``, the expected time to a successful answer when
+    failures cost about as long as successes). Members without latency samples are
+    assumed to be as fast as the group's fastest member, so they get measured as soon
+    as the others slow down or fail; ties keep group order. Members whose circuit is
+    open rank last.
+    """
+
+    def __init__(self, groups: Optional[Dict[str, RoutingGroup]] = None, health: Optional[ProviderHealth] = None):
+        self.groups = groups or {}
+        self.health = health or ProviderHealth()
+
+    def rank(self, group_name: str, is_open: Optional[Any] = None) -> List[RouteTarget]:
+        """Members of a group, best first.
+
+        Args:
+            group_name: Routing group name
+            is_open: Optional callable(provider) -> bool telling whether the provider's
+                     circuit breaker is open
+
+        Raises:
+            KeyError: If the group is not configured
+        """
+        group = self.groups[group_name]
+        latencies = [self.health.latency(member.provider, member.model) for member in group.members]
+        fastest = min((latency for latency in latencies if latency is not None), default=1.0)
+
+        def score(indexed: Tuple[int, RouteTarget]) -> Tuple[bool, float, int]:
+            index, member = indexed
+            latency = fastest if latencies[index] is None else latencies[index]
+            error_rate = min(self.health.error_rate(member.provider, member.model), 0.99)
+            return (bool(is_open and is_open(member.provider)), latency / (1 - error_rate), index)
+
+        return [member for _, member in sorted(enumerate(group.members), key=score)]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "groups": {name: [member.key for member in group.members] for name, group in self.groups.items()},
+            "health": self.health.get_metrics(),
+        }
+
+_provider_router: Optional[ProviderRouter] = None
+
+def configure_provider_routing(groups: Optional[Dict[str, List[Any]]] = None) -> ProviderRouter:
+    """
+    (Re)create the process-wide provider router.
+
+    `groups` maps a group name to its members, as 'provider/model' strings or
+    RouteTarget fields, e.g. {"fast-chat": ["openai/gpt-4o-mini",
+    "anthropic/claude-3-haiku-20240307", "google/gemini-1.5-flash"]}.
+    Defaults to the JSON in the LLM_ROUTING_GROUPS env var; no groups if unset.
+    """
+    global _provider_router
+    if groups is None:
+        raw = os.getenv("LLM_ROUTING_GROUPS")
+        try:
+            groups = json.loads(raw) if raw else {}
+        except json.JSONDecodeError as e:
+            logger.error(f"Ignoring malformed LLM_ROUTING_GROUPS: {str(e)}")
+            groups = {}
+    _provider_router = ProviderRouter({
+        name: RoutingGroup(name=name, members=members) for name, members in groups.items()
+    })
+    return _provider_router
+
+def get_provider_router() -> ProviderRouter:
+    """Get the process-wide provider router, creating it from the environment on first use."""
+    if _provider_router is None:
+        return configure_provider_routing()
+    return _provider_router
@@ -0,0 +1,197 @@
+"""
+Token-bucket rate limiting for LLM provider calls (requests and tokens per minute)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+class RateLimit(BaseModel):
+    """Per-minute limits for a provider, or for one model of a provider"""
+    requests_per_minute: Optional[int] = Field(None, gt=0, description="Maximum requests per minute (RPM)")
+    tokens_per_minute: Optional[int] = Field(None, gt=0, description="Maximum tokens per minute (TPM)")
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at capacity-per-minute."""
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.refill_rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be consumed (0 if available now)."""
+        self._refill()
+        # Requests larger than the whole bucket only need a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_rate
+
+    def consume(self, amount: float) -> None:
+        """Take `amount` out of the bucket; may go negative to record debt."""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Correct a previous reservation (positive delta takes more, negative refunds)."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+class _LimitState:
+    """Buckets, FIFO lock and wait metrics for one (provider, model) limit."""
+    def __init__(self, limit: RateLimit):
+        self.limit = limit
+        self.request_bucket = TokenBucket(limit.requests_per_minute) if limit.requests_per_minute else None
+        self.token_bucket = TokenBucket(limit.tokens_per_minute) if limit.tokens_per_minute else None
+        self.lock = asyncio.Lock()
+        self.requests = 0
+        self.waiting = 0
+        self.delayed_requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+class RateLimiter:
+    """
+    Async RPM/TPM limiter keyed by provider and model.
+    A provider-wide limit (model=None) and a model-specific limit can both apply to a
+    call; the call proceeds only once every applicable bucket has capacity. Callers
+    waiting on the same limit are served in arrival order.
+    """
+    def __init__(self, limits: Optional[Dict[Tuple[str, Optional[str]], RateLimit]] = None):
+        self._states: Dict[Tuple[str, Optional[str]], _LimitState] = {}
+        for (provider, model), limit in (limits or {}).items():
+            self.set_limit(provider, limit, model=model)
+
+    @staticmethod
+    def _provider_key(provider: Any) -> str:
+        return str(getattr(provider, "value", provider))
+
+    def set_limit(self, provider: Any, limit: RateLimit, model: Optional[str] = None) -> None:
+        """Set (or replace) the limit for a provider, or for one of its models."""
+        self._states[(self._provider_key(provider), model)] = _LimitState(limit)
+
+    def _applicable(self, provider: Any, model: Optional[str]) -> List[_LimitState]:
+        provider_key = self._provider_key(provider)
+        states = []
+        # Fixed order (provider-wide first) so nested locks can never deadlock
+        for key in ((provider_key, None), (provider_key, model)):
+            state = self._states.get(key)
+            if state is not None and state not in states:
+                states.append(state)
+        return states
+
+    async def acquire(self, provider: Any, model: Optional[str], tokens: int) -> float:
+        """
+        Wait until one request of `tokens` estimated tokens fits every applicable limit.
+        Returns the time spent waiting, in seconds.
+        """
+        states = self._applicable(provider, model)
+        if not states:
+            return 0.0
+        start = time.monotonic()
+        for state in states:
+            state.waiting += 1
+        acquired: List[_LimitState] = []
+        try:
+            for state in states:
+                await state.lock.acquire()
+                acquired.append(state)
+            while True:
+                wait = 0.0
+                for state in states:
+                    if state.request_bucket:
+                        wait = max(wait, state.request_bucket.wait_time(1))
+                    if state.token_bucket:
+                        wait = max(wait, state.token_bucket.wait_time(tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            for state in states:
+                if state.request_bucket:
+                    state.request_bucket.consume(1)
+                if state.token_bucket:
+                    state.token_bucket.consume(tokens)
+        finally:
+            for state in reversed(acquired):
+                state.lock.release()
+            for state in states:
+                state.waiting -= 1
+        waited = time.monotonic() - start
+        for state in states:
+            state.requests += 1
+            state.total_wait += waited
+            state.max_wait = max(state.max_wait, waited)
+            if waited > 0.001:
+                state.delayed_requests += 1
+        if waited > 0.001:
+            logger.info(f"Rate limiter delayed {self._provider_key(provider)}/{model} call by {waited:.2f}s")
+        return waited
+
+    def record_usage(self, provider: Any, model: Optional[str], estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Reconcile the token reservation made by acquire() with the usage the provider reported."""
+        if actual_tokens is None:
+            return
+        for state in self._applicable(provider, model):
+            if state.token_bucket:
+                state.token_bucket.adjust(actual_tokens - estimated_tokens)
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Wait-time metrics per limit, keyed 'provider' or 'provider/model'."""
+        metrics = {}
+        for (provider, model), state in self._states.items():
+            key = f"{provider}/{model}" if model else provider
+            metrics[key] = {
+                "requests_per_minute": state.limit.requests_per_minute,
+                "tokens_per_minute": state.limit.tokens_per_minute,
+                "requests": state.requests,
+                "waiting": state.waiting,
+                "delayed_requests": state.delayed_requests,
+                "total_wait_seconds": round(state.total_wait, 4),
+                "avg_wait_seconds": round(state.total_wait / state.requests, 4) if state.requests else 0.0,
+                "max_wait_seconds": round(state.max_wait, 4),
+                "available_tokens": round(state.token_bucket.tokens, 1) if state.token_bucket else None,
+            }
+        return metrics
+
+_rate_limiter: Optional[RateLimiter] = None
+
+def configure_rate_limits(limits: Optional[Dict[str, Dict[str, int]]] = None) -> RateLimiter:
+    """
+    (Re)create the process-wide rate limiter.
+
+    `limits` maps 'provider' or 'provider/model' to RateLimit fields, e.g.
+    {"openai": {"requests_per_minute": 500}, "openai/gpt-4": {"tokens_per_minute": 30000}}.
+    Defaults to the JSON in the LLM_RATE_LIMITS env var; no limits if unset.
+    """
+    global _rate_limiter
+    if limits is None:
+        raw = os.getenv("LLM_RATE_LIMITS")
+        try:
+            limits = json.loads(raw) if raw else {}
+        except json.JSONDecodeError as e:
+            logger.error(f"Ignoring malformed LLM_RATE_LIMITS: {str(e)}")
+            limits = {}
+    parsed = {}
+    for key, value in limits.items():
+        provider, _, model = key.partition("/")
+        parsed[(provider, model or None)] = RateLimit(**value)
+    _rate_limiter = RateLimiter(parsed)
+    return _rate_limiter
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter, creating it from the environment on first use."""
+    if _rate_limiter is None:
+        return configure_rate_limits()
+    return _rate_limiter
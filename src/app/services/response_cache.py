@@ -0,0 +1,229 @@
+"""
+Two-tier cache of LLM responses: an in-memory LRU in front of an optional on-disk store
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from pydantic import BaseModel, Field
+from app.models.config import LLMConfig
+
+logger = logging.getLogger(__name__)
+
+# LLMConfig fields that do not change what the provider returns
+_NON_GENERATION_FIELDS = {"api_key", "hedge", "cache", "cache_ttl", "max_context_tokens"}
+
+CachedResponse = Tuple[str, Optional[Dict[str, int]]]
+
+def response_cache_key(
+    llm_config: LLMConfig,
+    prompt: str,
+    context: Optional[Dict[str, Any]] = None,
+    tools: Optional[list] = None
+) -> str:
+    """Hash of everything that determines an LLM response.
+
+    Args:
+        llm_config: Provider, model and sampling parameters (API key, hedging and
+                    cache settings ignored)
+        prompt: Fully formatted prompt
+        context: Context passed to the handler (e.g. a system prompt)
+        tools: Tool/function definitions offered to the model
+
+    Returns:
+        Hex digest shared by calls that would send the same request
+    """
+    payload = {
+        "llm_config": llm_config.model_dump(mode="json", exclude=_NON_GENERATION_FIELDS),
+        "prompt": prompt,
+        "context": context or {},
+        "tools": tools or [],
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def reuses_responses(llm_config: LLMConfig) -> bool:
+    """Whether identical calls with this configuration may share one response.
+
+    ``llm_config.cache`` decides when set; otherwise only deterministic
+    (temperature 0) calls do, so sampled calls still get independent samples.
+    """
+    if llm_config.cache is not None:
+        return llm_config.cache
+    return llm_config.temperature == 0
+
+class ResponseCachePolicy(BaseModel):
+    """Which LLM responses are cached, and where"""
+    enabled: bool = Field(False, description="Cache deterministic calls whose LLMConfig.cache is unset (off: only configs with cache=True use it)")
+    max_entries: int = Field(1000, ge=1, description="Responses kept in the in-memory LRU")
+    ttl: Optional[float] = Field(86400.0, gt=0, description="Default seconds a response stays valid (None: forever)")
+    directory: Optional[str] = Field(None, description="Directory of the on-disk store (None: memory only)")
+
+class ResponseCache:
+    """LRU of LLM responses backed by one JSON file per response on disk.
+
+    Only successful responses are stored. Entries expire after their TTL in both
+    tiers; a disk hit is promoted into memory. The disk store is bounded by TTL
+    only, and disk errors are logged and treated as misses.
+    """
+
+    def __init__(self, policy: Optional[ResponseCachePolicy] = None):
+        self.policy = policy or ResponseCachePolicy()
+        # key -> (expires_at wall-clock time or None, text, usage)
+        self._entries: "OrderedDict[str, Tuple[Optional[float], str, Optional[Dict[str, int]]]]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expired = 0
+
+    def should_cache(self, llm_config: LLMConfig) -> bool:
+        """Whether calls with this configuration use the cache.
+
+        Caching is opt-in: ``llm_config.cache`` decides when set; otherwise only
+        deterministic (temperature 0) calls are cached, and only if the policy is enabled.
+        """
+        if llm_config.cache is not None:
+            return llm_config.cache
+        return self.policy.enabled and reuses_responses(llm_config)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.policy.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Look up a response.
+
+        Returns:
+            Tuple of the cached text and its original usage, or None on a miss
+        """
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, text, usage = entry
+            if expires_at is None or expires_at > now:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return text, usage
+            del self._entries[key]
+            self.expired += 1
+        if self.policy.directory:
+            stored = self._read(key, now)
+            if stored is not None:
+                expires_at, text, usage = stored
+                self._remember(key, expires_at, text, usage)
+                self.disk_hits += 1
+                return text, usage
+        self.misses += 1
+        return None
+
+    def put(self, key: str, text: str, usage: Optional[Dict[str, int]] = None, ttl: Optional[float] = None) -> None:
+        """Store a successful response.
+
+        Args:
+            key: Key from response_cache_key()
+            text: Generated text
+            usage: Token usage of the original call
+            ttl: Seconds the response stays valid (None: the policy default)
+        """
+        ttl = ttl if ttl is not None else self.policy.ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._remember(key, expires_at, text, usage)
+        self.stores += 1
+        if self.policy.directory:
+            self._write(key, expires_at, text, usage)
+
+    def _remember(self, key: str, expires_at: Optional[float], text: str, usage: Optional[Dict[str, int]]) -> None:
+        self._entries[key] = (expires_at, text, usage)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.policy.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read(self, key: str, now: float) -> Optional[Tuple[Optional[float], str, Optional[Dict[str, int]]]]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable response cache entry {key[:12]}: {str(e)}")
+            self._remove(path)
+            return None
+        expires_at = stored.get("expires_at")
+        if expires_at is not None and expires_at <= now:
+            self.expired += 1
+            self._remove(path)
+            return None
+        return expires_at, stored["text"], stored.get("usage")
+
+    def _write(self, key: str, expires_at: Optional[float], text: str, usage: Optional[Dict[str, int]]) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({"expires_at": expires_at, "text": text, "usage": usage}, f)
+            # Atomic, so concurrent readers never see a partial entry
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing response cache entry {key[:12]}: {str(e)}")
+            self._remove(tmp_path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """Drop the in-memory entries (the on-disk store is left alone)"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.policy.enabled,
+            "size": len(self._entries),
+            "maxsize": self.policy.max_entries,
+            "persistent": bool(self.policy.directory),
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "expired": self.expired,
+        }
+
+_response_cache: Optional[ResponseCache] = None
+
+def configure_response_cache(policy: Optional[ResponseCachePolicy] = None) -> ResponseCache:
+    """
+    (Re)create the process-wide response cache. Defaults to LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL and LLM_CACHE_DIR from the environment.
+    LLM_CACHE_ENABLED is off unless set, so only nodes whose LLMConfig sets
+    cache=True are cached; without LLM_CACHE_DIR responses are kept in memory only.
+    """
+    global _response_cache
+    if policy is None:
+        ttl = os.getenv("LLM_CACHE_TTL", "86400")
+        policy = ResponseCachePolicy(
+            enabled=os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes"),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000)),
+            ttl=float(ttl) if ttl.lower() not in ("", "none", "0") else None,
+            directory=os.getenv("LLM_CACHE_DIR") or None
+        )
+    _response_cache = ResponseCache(policy)
+    return _response_cache
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache, creating it from the environment on first use."""
+    if _response_cache is None:
+        return configure_response_cache()
+    return _response_cache
@@ -0,0 +1,153 @@
+"""
+Retries with jittered exponential backoff and per-provider circuit breakers for LLM calls
+"""
+
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+class RetryPolicy(BaseModel):
+    """How transient provider failures (see ProviderError.retryable) are retried"""
+    max_retries: int = Field(3, ge=0, description="Retries after the first attempt")
+    base_delay: float = Field(0.5, ge=0, description="Backoff ceiling for the first retry, in seconds")
+    max_delay: float = Field(30.0, ge=0, description="Largest backoff ceiling, in seconds")
+
+    def backoff(self, retry: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before retry number `retry` (0 for the first retry), or None
+        if the provider asks for a longer wait than ``max_delay``.
+
+        A Retry-After from the provider is used as is, up to ``max_delay``: retrying
+        sooner would only be rejected again, so a longer one is not retried at all.
+        Otherwise the delay is drawn uniformly between 0 and an exponentially growing
+        ceiling ("full jitter"), so callers that failed together do not retry together.
+        """
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+class CircuitBreakerPolicy(BaseModel):
+    """When a provider is considered down, and for how long"""
+    failure_threshold: int = Field(5, ge=1, description="Consecutive transient failures that open the circuit")
+    reset_timeout: float = Field(30.0, gt=0, description="Seconds the circuit stays open before a probe call is let through")
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one provider.
+
+    Consecutive transient failures open the circuit, and calls then fail fast instead
+    of queueing for a provider that is down. After ``reset_timeout`` one probe call
+    is let through (half-open): success closes the circuit, failure re-opens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, policy: Optional[CircuitBreakerPolicy] = None):
+        self.policy = policy or CircuitBreakerPolicy()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Whether a call may be made now; call record() or abandon() after an allowed call."""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.policy.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool) -> None:
+        """Record the outcome of an allowed call (success: the provider was reachable and healthy)"""
+        self.probe_in_flight = False
+        if success:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            return
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.policy.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """Forget an allowed call that ended without an outcome (e.g. it was cancelled)"""
+        self.probe_in_flight = False
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.policy.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "retry_in_seconds": round(self.retry_in(), 3),
+        }
+
+class CircuitBreakers:
+    """One CircuitBreaker per provider, created on first use"""
+    def __init__(self, policy: Optional[CircuitBreakerPolicy] = None):
+        self.policy = policy or CircuitBreakerPolicy()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = self._breakers[provider] = CircuitBreaker(self.policy)
+        return breaker
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {provider: breaker.stats() for provider, breaker in self._breakers.items()}
+
+_retry_policy: Optional[RetryPolicy] = None
+_circuit_breakers: Optional[CircuitBreakers] = None
+
+def configure_retries(
+    policy: Optional[RetryPolicy] = None,
+    breaker_policy: Optional[CircuitBreakerPolicy] = None
+) -> RetryPolicy:
+    """
+    (Re)create the process-wide retry policy and circuit breakers. Defaults to
+    LLM_RETRY_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY,
+    LLM_CIRCUIT_FAILURE_THRESHOLD and LLM_CIRCUIT_RESET_TIMEOUT from the environment.
+    """
+    global _retry_policy, _circuit_breakers
+    _retry_policy = policy or RetryPolicy(
+        max_retries=int(os.getenv("LLM_RETRY_MAX_RETRIES", 3)),
+        base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", 0.5)),
+        max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", 30.0))
+    )
+    _circuit_breakers = CircuitBreakers(breaker_policy or CircuitBreakerPolicy(
+        failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", 5)),
+        reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET_TIMEOUT", 30.0))
+    ))
+    return _retry_policy
+
+def get_retry_policy() -> RetryPolicy:
+    """Get the process-wide retry policy, creating it from the environment on first use."""
+    if _retry_policy is None:
+        configure_retries()
+    return _retry_policy
+
+def get_circuit_breakers() -> CircuitBreakers:
+    """Get the process-wide circuit breakers, creating them from the environment on first use."""
+    if _circuit_breakers is None:
+        configure_retries()
+    return _circuit_breakers
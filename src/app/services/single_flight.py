@@ -0,0 +1,67 @@
+"""
+Single-flight coalescing of identical concurrent calls
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """One outstanding call and the number of callers waiting for it"""
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Shares one outstanding call between concurrent callers with the same key.
+
+    The first caller for a key starts the call as a separate task; callers arriving
+    while it runs wait for the same task and receive its result (or exception). Each
+    caller waits through asyncio.shield(), so a caller that is cancelled or times out
+    leaves without cancelling the call for the others. Only when the last waiter has
+    gone is the call cancelled. Once a call finishes its key is free again; results
+    are not kept (see ResponseCache for that).
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, make_call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run `make_call` unless a call with this key is already in flight.
+
+        Args:
+            key: Identity of the call, e.g. a response cache key
+            make_call: Factory returning the awaitable to run when no call is in flight
+
+        Returns:
+            Tuple of the call's result and whether it was shared with an earlier caller
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(make_call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Everyone waiting has gone away: nobody needs the result
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), "calls": self.calls, "coalesced": self.coalesced}
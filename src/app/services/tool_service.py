@@ -90,3 +90,12 @@ class ToolService:
         service.register_tool(CalculatorTool())
         service.register_tool(TranscriptParserTool())
         service.register_tool(SpeakerListerTool())
+
+_tool_service: Optional[ToolService] = None
+
+def get_tool_service() -> ToolService:
+    """Get the process-wide tool service used by nodes that are not given one (no tools registered)"""
+    global _tool_service
+    if _tool_service is None:
+        _tool_service = ToolService()
+    return _tool_service
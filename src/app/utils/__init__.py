@@ -5,5 +5,7 @@ Utility functions and classes for the application
 from app.utils.context import GraphContextManager
 from app.utils.callbacks import LoggingCallback, MetricsCallback
 from app.utils.tracking import track_token_usage
+from app.utils.execution_history import ExecutionHistory
+from app.utils.result_store import ResultStore
 
-__all__ = ['GraphContextManager', 'LoggingCallback', 'MetricsCallback', 'track_token_usage']
+__all__ = ['GraphContextManager', 'LoggingCallback', 'MetricsCallback', 'track_token_usage', 'ExecutionHistory', 'ResultStore']
@@ -137,7 +137,10 @@ class GraphContextManager:
 
     def get_node_output(self, node_id: str) -> Any:
         """Get the output of a specific node from persistent storage"""
-        return self.context_cache.get(node_id, {}).get('data', {})
+        if node_id in self.context_cache:
+            return self.context_cache[node_id].get('data', {})
+        # Evicted (or written by another process): read it back from the store
+        return self.get_context(node_id)
 
     def get_context(self, node_id: str) -> Dict[str, Any]:
         """Get context for a specific node.
@@ -192,6 +195,17 @@ class GraphContextManager:
             logger.error(f"Error setting context for node {node_id}: {str(e)}")
             raise
 
+    def evict_cached(self, node_id: str) -> None:
+        """Drop a node's context from the in-memory cache only.
+        
+        The context store file is left untouched, so get_context() and
+        get_node_output() will read the entry back on next access.
+        
+        Args:
+            node_id: ID of the node whose cached context should be dropped
+        """
+        self.context_cache.pop(node_id, None)
+
     def clear_context(self, node_id: Optional[str] = None) -> None:
         """Clear context cache for a specific node or all nodes"""
         try:
@@ -0,0 +1,92 @@
+"""
+Per-task execution deadlines carried in a context variable
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Optional
+
+# Absolute time.monotonic() deadline of the current task, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("scriptchain_deadline", default=None)
+
+class DeadlineExceededError(asyncio.TimeoutError):
+    """Exception raised when an operation runs past the current deadline"""
+    pass
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]):
+    """Run the block under a deadline `timeout` seconds from now.
+
+    Nested scopes can only tighten the deadline, never extend it. A timeout of None
+    keeps the enclosing deadline (if any).
+    """
+    if timeout is None:
+        yield
+        return
+    deadline = time.monotonic() + timeout
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline (never negative), or None without a deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+async def with_deadline(awaitable: Awaitable[Any], operation: str = "operation") -> Any:
+    """Await `awaitable`, cancelling it if the current deadline passes first.
+
+    Raises:
+        DeadlineExceededError: If the deadline passed
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceededError(f"Deadline exceeded during {operation}")
+
+async def iterate_with_deadline(
+    iterator: AsyncIterator[Any],
+    timeout: Optional[float] = None,
+    operation: str = "operation"
+) -> AsyncIterator[Any]:
+    """Yield from `iterator` until it ends or the deadline passes.
+
+    Generators cannot hold a deadline_scope() across their yields, so the deadline is
+    fixed when iteration starts: `timeout` seconds from now, or the current deadline
+    if that is sooner. The iterator is closed when iteration stops for any reason.
+
+    Raises:
+        DeadlineExceededError: If the deadline passed before the iterator finished
+    """
+    remaining = remaining_time()
+    if timeout is not None:
+        remaining = timeout if remaining is None else min(remaining, timeout)
+    deadline = time.monotonic() + remaining if remaining is not None else None
+    try:
+        while True:
+            try:
+                if deadline is None:
+                    item = await iterator.__anext__()
+                else:
+                    item = await asyncio.wait_for(iterator.__anext__(), timeout=max(0.0, deadline - time.monotonic()))
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise DeadlineExceededError(f"Deadline exceeded during {operation}")
+            yield item
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,151 @@
+"""
+Per-node execution history used for scheduling decisions
+"""
+
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime
+from app.models.node_models import NodeExecutionRecord, NodeExecutionResult
+from app.utils.logging import logger
+import asyncio
+import json
+import os
+import fcntl
+import threading
+
+class ExecutionHistory:
+    """Keeps a NodeExecutionRecord per (chain, node ID) and optionally persists them to a JSON file.
+
+    Records are scoped by chain (ScriptChain passes its plan fingerprint), so unrelated
+    chains that reuse common node IDs such as "summary" do not share statistics.
+    """
+
+    def __init__(self, store_path: Optional[str] = None):
+        """Initialize execution history.
+
+        Args:
+            store_path: Optional path to the history JSON file. Defaults to the
+                        SCRIPTCHAIN_EXECUTION_HISTORY_PATH env var; if neither is set
+                        the history is kept in memory only.
+        """
+        self.store_path = store_path or os.getenv("SCRIPTCHAIN_EXECUTION_HISTORY_PATH")
+        self.records: Dict[Tuple[str, str], NodeExecutionRecord] = {}
+        # Executions recorded so far, and how many of those the store file reflects
+        self._changes = 0
+        self._saved_changes = 0
+        self._save_lock = threading.Lock()
+        if self.store_path:
+            self._load()
+
+    def _load(self) -> None:
+        """Load records from the store file"""
+        if not os.path.exists(self.store_path):
+            return
+        try:
+            with open(self.store_path, 'r') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+                try:
+                    data = json.load(f)
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            self.records = {
+                (chain, node_id): NodeExecutionRecord(**record)
+                for chain, chain_records in data.items()
+                for node_id, record in chain_records.items()
+            }
+        except Exception as e:
+            logger.error(f"Error loading execution history: {str(e)}")
+            self.records = {}
+
+    def _snapshot(self) -> Optional[Tuple[int, Dict[str, Dict[str, Any]]]]:
+        """Serialize the records to write, or None if the store file is up to date"""
+        if not self.store_path or self._changes == self._saved_changes:
+            return None
+        data: Dict[str, Dict[str, Any]] = {}
+        for (chain, node_id), record in self.records.items():
+            data.setdefault(chain, {})[node_id] = record.model_dump(mode="json")
+        return self._changes, data
+
+    def _write(self, changes: int, data: Dict[str, Dict[str, Any]]) -> None:
+        with self._save_lock:
+            # A newer snapshot may have been written while this one waited
+            if changes <= self._saved_changes:
+                return
+            tmp_path = f"{self.store_path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.store_path)), exist_ok=True)
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f, indent=2)
+                # Atomic, so a concurrent _load never sees a partial file
+                os.replace(tmp_path, self.store_path)
+                self._saved_changes = changes
+            except Exception as e:
+                logger.error(f"Error saving execution history: {str(e)}")
+
+    def save(self) -> None:
+        """Persist records to the store file (no-op for in-memory history or when nothing changed)"""
+        snapshot = self._snapshot()
+        if snapshot:
+            self._write(*snapshot)
+
+    async def save_async(self) -> None:
+        """Like save(), but writes the file from a worker thread so the event loop keeps running"""
+        snapshot = self._snapshot()
+        if snapshot:
+            await asyncio.to_thread(self._write, *snapshot)
+
+    def record(self, chain: str, node_id: str, result: NodeExecutionResult, duration: float) -> NodeExecutionRecord:
+        """Fold one node execution into its record.
+
+        Args:
+            chain: Identity of the chain the node belongs to (its plan fingerprint)
+            node_id: ID of the executed node
+            result: Result of the execution
+            duration: Wall-clock execution time in seconds
+
+        Returns:
+            The updated record
+        """
+        record = self.records.get((chain, node_id)) or NodeExecutionRecord(node_id=node_id)
+        record.executions += 1
+        record.last_executed = datetime.utcnow()
+        if result.success:
+            record.successes += 1
+            # Running mean over successful executions only; failures tend to return early
+            record.avg_duration += (duration - record.avg_duration) / record.successes
+        else:
+            record.failures += 1
+
+        if result.usage:
+            model = result.usage.model
+            record.token_usage[model] = record.token_usage.get(model, 0) + result.usage.total_tokens
+            provider_usage = record.provider_usage.setdefault(result.usage.provider.value, {})
+            provider_usage[model] = provider_usage.get(model, 0) + result.usage.total_tokens
+
+        self.records[(chain, node_id)] = record
+        self._changes += 1
+        return record
+
+    def expected_duration(self, chain: str, node_id: str) -> Optional[float]:
+        """Get the average successful duration for a node, if it has ever succeeded.
+
+        Args:
+            chain: Identity of the chain the node belongs to (its plan fingerprint)
+            node_id: Node ID
+
+        Returns:
+            Average duration in seconds, or None if unknown
+        """
+        record = self.records.get((chain, node_id))
+        if record and record.successes > 0:
+            return record.avg_duration
+        return None
+
+# Process-wide history shared by every ScriptChain that is not given its own
+_default_history: Optional[ExecutionHistory] = None
+
+def get_execution_history() -> ExecutionHistory:
+    """Get the process-wide execution history"""
+    global _default_history
+    if _default_history is None:
+        _default_history = ExecutionHistory()
+    return _default_history
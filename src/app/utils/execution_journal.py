@@ -0,0 +1,183 @@
+"""
+Append-only execution journal used to checkpoint and resume chain executions
+"""
+
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from app.models.node_models import NodeConfig, NodeExecutionResult
+from app.utils.logging import logger
+import json
+import os
+
+class JournalNotFoundError(Exception):
+    """Exception raised when no journal exists for a chain ID"""
+    pass
+
+class ChainJournal:
+    """Contents of one chain's journal as read back from disk"""
+
+    def __init__(
+        self,
+        chain_id: str,
+        name: Optional[str],
+        nodes: List[NodeConfig],
+        options: Dict[str, Any],
+        inputs: Optional[Dict[str, Any]] = None,
+        targets: Optional[List[str]] = None
+    ):
+        self.chain_id = chain_id
+        self.name = name
+        self.nodes = nodes
+        self.options = options
+        self.inputs = inputs or {}
+        self.targets = targets
+        self.results: Dict[str, NodeExecutionResult] = {}
+        self.finished = False
+
+    @property
+    def completed_results(self) -> Dict[str, NodeExecutionResult]:
+        """Latest successful result per node; failed nodes are not considered complete"""
+        return {node_id: result for node_id, result in self.results.items() if result.success}
+
+class ExecutionJournal:
+    """Writes one JSON-lines file per chain ID and fsyncs every record.
+
+    A journal starts with a 'chain_start' record holding the node definitions, followed
+    by a 'node_result' record for every finished node and a 'chain_end' record once the
+    chain completes. A crash can at worst truncate the last line, which is ignored when
+    the journal is read back. The journal of a chain that succeeds is deleted, as
+    there is nothing left to resume.
+
+    The methods do blocking file I/O; ScriptChain calls them from a worker thread.
+    """
+
+    def __init__(self, journal_dir: Optional[str] = None, retain_finished: bool = False):
+        """Initialize the journal.
+
+        Args:
+            journal_dir: Directory for journal files. Defaults to the SCRIPTCHAIN_JOURNAL_DIR
+                         env var, then app/data/journals in the workspace.
+            retain_finished: Keep the journals of successful chains instead of deleting them
+        """
+        self.retain_finished = retain_finished
+        if journal_dir:
+            self.journal_dir = journal_dir
+        elif os.getenv("SCRIPTCHAIN_JOURNAL_DIR"):
+            self.journal_dir = os.environ["SCRIPTCHAIN_JOURNAL_DIR"]
+        else:
+            default_workspace_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+            self.journal_dir = os.path.join(default_workspace_root, "app", "data", "journals")
+        os.makedirs(self.journal_dir, exist_ok=True)
+
+    def _path(self, chain_id: str) -> str:
+        # Chain IDs are UUIDs; refuse anything that could escape the journal directory
+        if not chain_id or os.path.basename(chain_id) != chain_id or chain_id.startswith('.'):
+            raise ValueError(f"Invalid chain ID: {chain_id!r}")
+        return os.path.join(self.journal_dir, f"{chain_id}.jsonl")
+
+    def _append(self, chain_id: str, record: Dict[str, Any]) -> None:
+        record["timestamp"] = datetime.utcnow().isoformat()
+        line = json.dumps(record, default=str) + "\n"
+        with open(self._path(chain_id), 'a') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def exists(self, chain_id: str) -> bool:
+        return os.path.exists(self._path(chain_id))
+
+    def delete(self, chain_id: str) -> None:
+        try:
+            os.remove(self._path(chain_id))
+        except FileNotFoundError:
+            pass
+
+    def start_chain(
+        self,
+        chain_id: str,
+        name: str,
+        nodes: List[NodeConfig],
+        options: Optional[Dict[str, Any]] = None,
+        inputs: Optional[Dict[str, Any]] = None,
+        targets: Optional[List[str]] = None
+    ) -> None:
+        """Record the chain definition, inputs and targets; called once, before any node runs.
+
+        API keys are left out of the node definitions; resume() takes them again.
+        """
+        self._append(chain_id, {
+            "type": "chain_start",
+            "chain_id": chain_id,
+            "name": name,
+            "nodes": [node.model_dump(mode="json", exclude={"llm_config": {"api_key"}}) for node in nodes],
+            "options": options or {},
+            "inputs": inputs or {},
+            "targets": targets
+        })
+
+    def resume_chain(self, chain_id: str) -> None:
+        """Mark the point where a resumed execution picked the journal up"""
+        self._append(chain_id, {"type": "chain_resume", "chain_id": chain_id})
+
+    def record_result(self, chain_id: str, node_id: str, result: NodeExecutionResult) -> None:
+        """Durably record one finished node"""
+        self._append(chain_id, {
+            "type": "node_result",
+            "node_id": node_id,
+            "result": result.model_dump(mode="json")
+        })
+
+    def finish_chain(self, chain_id: str, success: bool) -> None:
+        """Record the end of the chain, deleting the journal if it succeeded (unless retain_finished)"""
+        if success and not self.retain_finished:
+            self.delete(chain_id)
+            return
+        self._append(chain_id, {"type": "chain_end", "success": success})
+
+    def load(self, chain_id: str) -> ChainJournal:
+        """Read a chain's journal back.
+
+        Args:
+            chain_id: ID of the journaled chain
+
+        Returns:
+            The chain definition and its recorded node results
+
+        Raises:
+            JournalNotFoundError: If there is no usable journal for the chain
+        """
+        path = self._path(chain_id)
+        if not os.path.exists(path):
+            raise JournalNotFoundError(f"No execution journal found for chain {chain_id}")
+
+        journal: Optional[ChainJournal] = None
+        with open(path, 'r') as f:
+            for line_number, line in enumerate(f, start=1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Most likely a write cut short by a crash
+                    logger.warning(f"Skipping unreadable line {line_number} in journal for chain {chain_id}")
+                    continue
+                record_type = record.get("type")
+                if record_type == "chain_start":
+                    journal = ChainJournal(
+                        chain_id=chain_id,
+                        name=record.get("name"),
+                        nodes=[NodeConfig(**node) for node in record["nodes"]],
+                        options=record.get("options", {}),
+                        inputs=record.get("inputs"),
+                        targets=record.get("targets")
+                    )
+                elif journal is None:
+                    continue
+                elif record_type == "node_result":
+                    journal.results[record["node_id"]] = NodeExecutionResult(**record["result"])
+                elif record_type == "chain_end":
+                    journal.finished = True
+                elif record_type == "chain_resume":
+                    journal.finished = False
+
+        if journal is None:
+            raise JournalNotFoundError(f"Execution journal for chain {chain_id} has no chain definition")
+        return journal
@@ -0,0 +1,180 @@
+"""
+Safe evaluation of small Python expressions over a node's context (used by router nodes)
+"""
+
+import ast
+import operator
+from typing import Any, Callable, Dict
+
+class ExpressionError(Exception):
+    """Exception raised when an expression is invalid, unsafe or fails to evaluate"""
+    pass
+
+# Largest string/list/tuple (in characters or items) that repetition may build
+MAX_SEQUENCE_LENGTH = 100000
+
+def _multiply(left: Any, right: Any) -> Any:
+    # Refuse to build huge strings/lists from e.g. 'a' * 10**9 or ('a' * 10000) * 10000
+    for sequence, count in ((left, right), (right, left)):
+        if isinstance(sequence, (str, list, tuple)) and isinstance(count, int) and len(sequence) * count > MAX_SEQUENCE_LENGTH:
+            raise ExpressionError(f"Sequence repetition producing more than {MAX_SEQUENCE_LENGTH} items is not allowed")
+    return left * right
+
+_BINARY_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _multiply,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+_COMPARISONS: Dict[type, Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+}
+
+_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "len": len,
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": bool,
+    "abs": abs,
+    "min": min,
+    "max": max,
+    "any": any,
+    "all": all,
+}
+
+# Side-effect free string methods; no other attribute access is allowed
+_STRING_METHODS = {"lower", "upper", "strip", "startswith", "endswith", "split", "count", "find"}
+
+_NAMED_CONSTANTS = {"True": True, "False": False, "None": None}
+
+def compile_expression(expression: str) -> ast.Expression:
+    """Parse an expression and reject any construct outside the safe subset.
+
+    Args:
+        expression: Expression source, e.g. ``"'billing' if 'invoice' in text.lower() else 'support'"``
+
+    Returns:
+        Parsed expression tree, ready for evaluate()
+
+    Raises:
+        ExpressionError: If the expression does not parse or uses a disallowed construct
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression {expression!r}: {e.msg}")
+    allowed = (
+        ast.Expression, ast.Constant, ast.Name, ast.Load, ast.Subscript, ast.Slice,
+        ast.List, ast.Tuple, ast.Dict, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+        ast.BinOp, ast.Compare, ast.IfExp, ast.Call, ast.Attribute,
+        *_BINARY_OPERATORS, *_COMPARISONS,
+    )
+    for node in ast.walk(tree):
+        if not isinstance(node, allowed):
+            raise ExpressionError(f"Expression {expression!r} uses disallowed syntax: {type(node).__name__}")
+        if isinstance(node, ast.Call):
+            if node.keywords:
+                raise ExpressionError(f"Expression {expression!r}: keyword arguments are not allowed")
+            func = node.func
+            if isinstance(func, ast.Name):
+                if func.id not in _FUNCTIONS:
+                    raise ExpressionError(f"Expression {expression!r} calls unknown function '{func.id}'")
+            elif not (isinstance(func, ast.Attribute) and func.attr in _STRING_METHODS):
+                raise ExpressionError(f"Expression {expression!r} calls a disallowed method")
+        elif isinstance(node, ast.Attribute):
+            if node.attr not in _STRING_METHODS:
+                raise ExpressionError(f"Expression {expression!r} accesses disallowed attribute '{node.attr}'")
+    return tree
+
+def evaluate(tree: ast.Expression, variables: Dict[str, Any]) -> Any:
+    """Evaluate a tree produced by compile_expression() against the given variables.
+
+    Raises:
+        ExpressionError: If evaluation fails (unknown name, bad index, type error, ...)
+    """
+    try:
+        return _eval(tree.body, variables)
+    except ExpressionError:
+        raise
+    except Exception as e:
+        raise ExpressionError(f"Expression evaluation failed: {e.__class__.__name__}: {e}")
+
+def safe_eval(expression: str, variables: Dict[str, Any]) -> Any:
+    """Compile and evaluate an expression in one step"""
+    return evaluate(compile_expression(expression), variables)
+
+def _eval(node: ast.AST, variables: Dict[str, Any]) -> Any:
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id in variables:
+            return variables[node.id]
+        if node.id in _NAMED_CONSTANTS:
+            return _NAMED_CONSTANTS[node.id]
+        raise ExpressionError(f"Unknown name '{node.id}'")
+    if isinstance(node, ast.Subscript):
+        return _eval(node.value, variables)[_eval(node.slice, variables)]
+    if isinstance(node, ast.Slice):
+        return slice(
+            _eval(node.lower, variables) if node.lower else None,
+            _eval(node.upper, variables) if node.upper else None,
+            _eval(node.step, variables) if node.step else None,
+        )
+    if isinstance(node, (ast.List, ast.Tuple)):
+        values = [_eval(element, variables) for element in node.elts]
+        return values if isinstance(node, ast.List) else tuple(values)
+    if isinstance(node, ast.Dict):
+        return {_eval(k, variables): _eval(v, variables) for k, v in zip(node.keys, node.values)}
+    if isinstance(node, ast.BoolOp):
+        if isinstance(node.op, ast.And):
+            result = True
+            for value in node.values:
+                result = _eval(value, variables)
+                if not result:
+                    return result
+            return result
+        result = False
+        for value in node.values:
+            result = _eval(value, variables)
+            if result:
+                return result
+        return result
+    if isinstance(node, ast.UnaryOp):
+        operand = _eval(node.operand, variables)
+        return (not operand) if isinstance(node.op, ast.Not) else -operand
+    if isinstance(node, ast.BinOp):
+        return _BINARY_OPERATORS[type(node.op)](_eval(node.left, variables), _eval(node.right, variables))
+    if isinstance(node, ast.Compare):
+        left = _eval(node.left, variables)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _eval(comparator, variables)
+            if not _COMPARISONS[type(op)](left, right):
+                return False
+            left = right
+        return True
+    if isinstance(node, ast.IfExp):
+        return _eval(node.body if _eval(node.test, variables) else node.orelse, variables)
+    if isinstance(node, ast.Call):
+        args = [_eval(arg, variables) for arg in node.args]
+        if isinstance(node.func, ast.Name):
+            return _FUNCTIONS[node.func.id](*args)
+        target = _eval(node.func.value, variables)
+        if not isinstance(target, str):
+            raise ExpressionError(f"Method '{node.func.attr}' is only available on strings")
+        return getattr(target, node.func.attr)(*args)
+    if isinstance(node, ast.Attribute):
+        raise ExpressionError(f"Attribute '{node.attr}' can only be called")
+    raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
@@ -0,0 +1,36 @@
+"""
+Prompts split into a stable prefix and a variable suffix, for provider prompt caching
+"""
+
+from typing import Tuple, Union
+
+class SegmentedPrompt(str):
+    """A prompt string that knows which leading part repeats across calls.
+
+    The value is ``prefix + suffix``, so it can be passed anywhere a prompt string is
+    expected; handlers that support provider prompt caching mark ``prefix`` (e.g. the
+    tool preamble) as cacheable. String operations return plain strings, which
+    lose the split; handlers send those without cache marks.
+    """
+
+    prefix: str
+    suffix: str
+
+    def __new__(cls, prefix: str, suffix: str) -> "SegmentedPrompt":
+        prompt = super().__new__(cls, prefix + suffix)
+        prompt.prefix = prefix
+        prompt.suffix = suffix
+        return prompt
+
+    def __getnewargs__(self) -> Tuple[str, str]:
+        return self.prefix, self.suffix
+
+# What node prompt builders return: segmented when there is a stable prefix, otherwise
+# (no tools, or the prompt was truncated) a plain string, i.e. a deliberate cache miss
+NodePrompt = Union[SegmentedPrompt, str]
+
+def prompt_segments(prompt: NodePrompt) -> Tuple[str, str]:
+    """(stable prefix, variable suffix) of a prompt; a plain string has no stable prefix"""
+    if isinstance(prompt, SegmentedPrompt):
+        return prompt.prefix, prompt.suffix
+    return "", prompt
@@ -0,0 +1,179 @@
+"""
+Content-addressed store of node results for incremental chain re-execution
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.models.config import LLMConfig
+from app.models.node_models import NodeConfig, NodeExecutionResult
+from app.utils.logging import logger
+import asyncio
+import hashlib
+import json
+import os
+import fcntl
+import threading
+
+DEFAULT_MAX_ENTRIES = 10000
+
+def _digest(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def output_hash(output: Any) -> str:
+    """Hash of a node output, used as the identity of that output downstream."""
+    return _digest(output)
+
+def result_key(
+    node: NodeConfig,
+    llm_config: Optional[LLMConfig],
+    upstream_hashes: List[Tuple[str, str]],
+    inputs_hash: Optional[str] = None
+) -> str:
+    """Content address of a node execution.
+
+    Args:
+        node: Node configuration (execution level and metadata are ignored)
+        llm_config: Effective LLM configuration of the node instance (API key ignored)
+        upstream_hashes: (dependency ID, output hash) pairs in dependency order
+        inputs_hash: Hash of the chain-level inputs, if the chain was given any
+
+    Returns:
+        Hex digest that changes whenever the node's own configuration or any of its
+        inputs change
+    """
+    return _digest({
+        "node": node.model_dump(mode="json", exclude={"level", "metadata", "llm_config"}),
+        "llm_config": llm_config.model_dump(mode="json", exclude={"api_key"}) if llm_config else None,
+        "inputs": [list(pair) for pair in upstream_hashes],
+        "chain_inputs": inputs_hash,
+    })
+
+class ResultStore:
+    """Maps result keys to successful node results, optionally persisted to a JSON file"""
+
+    def __init__(self, store_path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Initialize the result store.
+
+        Args:
+            store_path: Optional path to the store JSON file. Defaults to the
+                        SCRIPTCHAIN_RESULT_STORE_PATH env var; if neither is set the
+                        store is kept in memory only.
+            max_entries: Least recently used entries beyond this count are dropped
+        """
+        self.store_path = store_path or os.getenv("SCRIPTCHAIN_RESULT_STORE_PATH")
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Entries added or dropped so far, and how many of those the store file reflects
+        self._changes = 0
+        self._saved_changes = 0
+        self._save_lock = threading.Lock()
+        if self.store_path:
+            self._load()
+
+    def _load(self) -> None:
+        """Load entries from the store file"""
+        if not os.path.exists(self.store_path):
+            return
+        try:
+            with open(self.store_path, 'r') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+                try:
+                    self.entries = OrderedDict(json.load(f))
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        except Exception as e:
+            logger.error(f"Error loading result store: {str(e)}")
+            self.entries = OrderedDict()
+
+    def _snapshot(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Copy the entries to write, or None if the store file is up to date"""
+        if not self.store_path or self._changes == self._saved_changes:
+            return None
+        return self._changes, dict(self.entries)
+
+    def _write(self, changes: int, entries: Dict[str, Any]) -> None:
+        with self._save_lock:
+            # A newer snapshot may have been written while this one waited
+            if changes <= self._saved_changes:
+                return
+            tmp_path = f"{self.store_path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.store_path)), exist_ok=True)
+                with open(tmp_path, 'w') as f:
+                    json.dump(entries, f)
+                # Atomic, so a concurrent _load never sees a partial file
+                os.replace(tmp_path, self.store_path)
+                self._saved_changes = changes
+            except Exception as e:
+                logger.error(f"Error saving result store: {str(e)}")
+
+    def save(self) -> None:
+        """Persist entries to the store file (no-op for an in-memory store or when nothing changed)"""
+        snapshot = self._snapshot()
+        if snapshot:
+            self._write(*snapshot)
+
+    async def save_async(self) -> None:
+        """Like save(), but writes the file from a worker thread so the event loop keeps running"""
+        snapshot = self._snapshot()
+        if snapshot:
+            await asyncio.to_thread(self._write, *snapshot)
+
+    def get(self, key: str) -> Optional[Tuple[NodeExecutionResult, str]]:
+        """Look up a stored result.
+
+        Args:
+            key: Result key from result_key()
+
+        Returns:
+            Tuple of the stored result and its output hash, or None on a miss
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            result = NodeExecutionResult(**entry["result"])
+        except Exception as e:
+            logger.warning(f"Discarding unreadable result store entry {key[:12]}: {str(e)}")
+            del self.entries[key]
+            self._changes += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result, entry["output_hash"]
+
+    def put(self, key: str, result: NodeExecutionResult) -> str:
+        """Store a successful result.
+
+        Args:
+            key: Result key from result_key()
+            result: Successful node result
+
+        Returns:
+            Hash of the result's output
+        """
+        digest = output_hash(result.output)
+        self.entries[key] = {"result": result.model_dump(mode="json"), "output_hash": digest}
+        self.entries.move_to_end(key)
+        self._changes += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return digest
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+# Process-wide store shared by every incremental ScriptChain that is not given its own
+_default_store: Optional[ResultStore] = None
+
+def get_result_store() -> ResultStore:
+    """Get the process-wide result store"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ResultStore()
+    return _default_store
@@ -2,10 +2,13 @@
 Token counting utilities for different model providers
 """
 
+import logging
 import tiktoken
 from typing import Dict, List, Optional, Union
 from app.models.config import ModelProvider
 
+logger = logging.getLogger(__name__)
+
 class TokenCounter:
     """Token counting utility for different model providers"""
     
@@ -27,6 +30,9 @@ class TokenCounter:
             "gemini-ultra": "gemini"
         }
     }
+
+    # Loaded encodings by name; None once an encoding has failed to load
+    _encodings: Dict[str, Optional[tiktoken.Encoding]] = {}
     
     @classmethod
     def get_encoding_name(cls, model: str, provider: ModelProvider = "openai") -> str:
@@ -48,10 +54,34 @@ class TokenCounter:
             raise ValueError(f"No encoding found for model {model} from provider {provider}")
         return encoding
     
+    @classmethod
+    def get_encoding(cls, encoding_name: str) -> Optional[tiktoken.Encoding]:
+        """Load a tiktoken encoding, once per process.
+        
+        tiktoken downloads encodings it has not cached, which fails (slowly) offline,
+        so a failure is remembered too.
+        
+        Args:
+            encoding_name: tiktoken encoding name
+            
+        Returns:
+            The encoding, or None if it cannot be loaded
+        """
+        if encoding_name not in cls._encodings:
+            try:
+                cls._encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                logger.warning(f"Tokenizer {encoding_name} unavailable, estimating token counts instead: {e}")
+                cls._encodings[encoding_name] = None
+        return cls._encodings[encoding_name]
+    
     @classmethod
     def count_tokens(cls, text: str, model: str, provider: ModelProvider = "openai") -> int:
         """Count tokens in text for a specific model.
         
+        Custom models, and any model whose encoding cannot be loaded, get
+        estimate_tokens' approximation instead.
+        
         Args:
             text: Text to count tokens in
             model: Model name
@@ -63,35 +93,23 @@ class TokenCounter:
         Raises:
             ValueError: If model encoding is not found
         """
+        if provider == "custom":
+            # No known tokenizer for custom models
+            return cls.estimate_tokens(text, model, provider)
         if provider == "openai":
-            try:
-                encoding = tiktoken.get_encoding(cls.get_encoding_name(model, provider))
-                return len(encoding.encode(text))
-            except Exception as e:
-                raise ValueError(f"Error counting tokens for OpenAI model {model}: {str(e)}")
-        elif provider == "anthropic":
-            # Anthropic uses a similar tokenizer to GPT-3
-            try:
-                encoding = tiktoken.get_encoding("cl100k_base")
-                return len(encoding.encode(text))
-            except Exception as e:
-                raise ValueError(f"Error counting tokens for Anthropic model {model}: {str(e)}")
-        elif provider == "google":
-            # Google's tokenizer is similar to GPT-3
-            try:
-                encoding = tiktoken.get_encoding("cl100k_base")
-                return len(encoding.encode(text))
-            except Exception as e:
-                raise ValueError(f"Error counting tokens for Google model {model}: {str(e)}")
-        elif provider == "custom":
-            # For custom providers, use GPT-3 tokenizer as a fallback
-            try:
-                encoding = tiktoken.get_encoding("cl100k_base")
-                return len(encoding.encode(text))
-            except Exception as e:
-                raise ValueError(f"Error counting tokens for custom model {model}: {str(e)}")
+            encoding_name = cls.get_encoding_name(model, provider)
+        elif provider in ("anthropic", "google"):
+            # Anthropic's and Google's tokenizers are similar to GPT's
+            encoding_name = "cl100k_base"
         else:
             raise ValueError(f"Unsupported provider: {provider}")
+        encoding = cls.get_encoding(encoding_name)
+        if encoding is None:
+            return cls.estimate_tokens(text, model, provider)
+        try:
+            return len(encoding.encode(text))
+        except Exception as e:
+            raise ValueError(f"Error counting tokens for model {model}: {str(e)}")
     
     @classmethod
     def count_message_tokens(cls, messages: List[Dict[str, str]], model: str, provider: ModelProvider = "openai") -> int:
@@ -112,8 +130,10 @@ class TokenCounter:
         
         if provider == "openai":
             # OpenAI's token counting includes special tokens and formatting
+            encoding = cls.get_encoding(cls.get_encoding_name(model, provider))
+            if encoding is None:
+                return sum(cls.estimate_tokens(message["content"], model, provider) + 4 for message in messages)
             try:
-                encoding = tiktoken.get_encoding(cls.get_encoding_name(model, provider))
                 for message in messages:
                     # Add tokens for role and content
                     total_tokens += len(encoding.encode(message["role"]))
@@ -0,0 +1,119 @@
+"""
+Throughput benchmark for ScriptChain against the offline mock provider.
+
+Many concurrent chains of AI nodes run through the real LLMService and AiNode code
+paths with `ModelProvider.CUSTOM` served by MockLLMHandler. With zero simulated
+latency the wall-clock time is the engine's own overhead per node; with a lognormal
+provider latency the chains should overlap their waits instead of adding them up.
+Tool-calling nodes and single-node API requests are timed the same way.
+"""
+
+import asyncio
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import routes
+from app.chains.script_chain import ScriptChain
+from app.llm_providers.mock_handler import LatencyProfile, MockLLMHandler
+from app.models.config import LLMConfig, ModelProvider
+from app.models.node_models import NodeConfig, ToolConfig
+from app.services.execution_budget import ExecutionBudget
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.rate_limiter import RateLimiter
+from app.services.response_cache import ResponseCache, ResponseCachePolicy
+from app.services.tool_service import ToolService
+from app.utils.context import GraphContextManager
+
+CHAINS = 200
+LLM_CONFIG = LLMConfig(provider="custom", model="recorded-gpt-4", temperature=0.7)
+
+def make_service(latency=None):
+    service = LLMService(rate_limiter=RateLimiter(), response_cache=ResponseCache(ResponseCachePolicy(enabled=False)))
+    handler = MockLLMHandler(latency=latency, seed=1)
+    service.handlers[ModelProvider.CUSTOM] = handler
+    return service, handler
+
+def make_chain(index, service, context_manager, budget):
+    nodes = [
+        NodeConfig(id="extract", type="ai", model=LLM_CONFIG.model, prompt=f"Extract the facts of document {index}.", llm_config=LLM_CONFIG),
+        NodeConfig(id="classify", type="ai", model=LLM_CONFIG.model, prompt=f"Classify document {index}.", llm_config=LLM_CONFIG),
+        NodeConfig(id="summarise", type="ai", model=LLM_CONFIG.model, prompt="Summarise.", llm_config=LLM_CONFIG, dependencies=["extract", "classify"]),
+    ]
+    return ScriptChain(
+        nodes, context_manager=context_manager, persist_intermediate_outputs=False,
+        execution_budget=budget, llm_service=service
+    )
+
+async def run_chains(service, tmp_path):
+    context_manager = GraphContextManager(context_store_path=str(tmp_path / "context.json"))
+    budget = ExecutionBudget(limit=CHAINS * 3)
+    chains = [make_chain(i, service, context_manager, budget) for i in range(CHAINS)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(chain.execute() for chain in chains))
+    elapsed = time.perf_counter() - start
+    assert all(result.success for result in results)
+    return elapsed
+
+@pytest.mark.asyncio
+async def test_engine_overhead_per_node(tmp_path):
+    service, handler = make_service()
+    elapsed = await run_chains(service, tmp_path)
+    nodes = CHAINS * 3
+    print(f"\n{nodes} nodes in {elapsed:.2f}s: {elapsed / nodes * 1000:.2f}ms per node, {nodes / elapsed:.0f} nodes/s")
+    assert handler.stats()["calls"] == nodes
+    assert elapsed / nodes < 0.02
+
+@pytest.mark.asyncio
+async def test_concurrent_chains_overlap_provider_latency(tmp_path):
+    service, handler = make_service(LatencyProfile.parse("lognormal:0.05:0.03"))
+    elapsed = await run_chains(service, tmp_path)
+    # Two sequential levels of 50ms mean latency per chain, all chains in parallel
+    serial = CHAINS * 2 * 0.05
+    print(f"\n{CHAINS} chains at lognormal(50ms, 30ms) per call: {elapsed:.2f}s wall clock vs {serial:.1f}s serial")
+    assert handler.stats()["calls"] == CHAINS * 3
+    assert elapsed * 5 < serial
+
+@pytest.mark.asyncio
+async def test_tool_node_throughput(tmp_path):
+    service, handler = make_service()
+    tool_service = ToolService()
+    ToolService.register_default_tools(tool_service)
+    context_manager = GraphContextManager(context_store_path=str(tmp_path / "context.json"))
+    budget = ExecutionBudget(limit=CHAINS)
+    node = NodeConfig(
+        id="add", type="ai", model=LLM_CONFIG.model, prompt="Add {a} and {b}.",
+        llm_config=LLM_CONFIG, tools=[ToolConfig(name="calculator")]
+    )
+    chains = [
+        ScriptChain(
+            [node], context_manager=context_manager, persist_intermediate_outputs=False,
+            execution_budget=budget, llm_service=service, tool_service=tool_service
+        )
+        for _ in range(CHAINS)
+    ]
+    start = time.perf_counter()
+    results = await asyncio.gather(*(chain.execute(inputs={"a": 2, "b": 3}) for chain in chains))
+    elapsed = time.perf_counter() - start
+    print(f"\n{CHAINS} tool-calling nodes in {elapsed:.2f}s: {elapsed / CHAINS * 1000:.2f}ms per node")
+    assert all(result.output["add"].output == {"result": 5} for result in results)
+    assert handler.stats()["calls"] == CHAINS
+    assert elapsed / CHAINS < 0.02
+
+def test_text_generation_api_throughput(tmp_path, monkeypatch):
+    handler = MockLLMHandler(seed=1)
+    monkeypatch.setitem(get_llm_service().handlers, ModelProvider.CUSTOM, handler)
+    monkeypatch.setattr(routes, "context_manager", GraphContextManager(context_store_path=str(tmp_path / "context.json")))
+    app = FastAPI()
+    app.include_router(routes.router)
+    config = NodeConfig(id="generate", type="ai", model=LLM_CONFIG.model, prompt="Describe {topic}.", llm_config=LLM_CONFIG)
+    payload = {"config": config.model_dump(mode="json"), "context": {"topic": "batching"}}
+    requests = 100
+    with TestClient(app) as client:
+        start = time.perf_counter()
+        responses = [client.post("/api/v1/nodes/text-generation", json=payload) for _ in range(requests)]
+        elapsed = time.perf_counter() - start
+    print(f"\n{requests} text-generation requests in {elapsed:.2f}s: {elapsed / requests * 1000:.2f}ms per request")
+    assert all(response.status_code == 200 and response.json()["success"] for response in responses)
+    assert handler.stats()["calls"] == requests
+    assert elapsed / requests < 0.05
@@ -0,0 +1,43 @@
+"""
+Per-node setup overhead benchmark.
+
+Compares building an AiNode the old way (a fresh LLMService, with all four provider
+handlers, and a fresh ToolService per node) against acquiring it from the node pool
+with the shared service singletons, once every configuration has been seen.
+"""
+
+import time
+from app.models.config import LLMConfig
+from app.models.node_models import NodeConfig
+from app.nodes.ai_node import AiNode
+from app.nodes.factory import node_factory
+from app.nodes.pool import NodePool
+from app.services.llm_service import LLMService
+from app.services.tool_service import ToolService
+from app.utils.context import GraphContextManager
+
+ROUNDS = 2000
+
+def test_pooled_node_setup_is_cheaper(tmp_path):
+    context_manager = GraphContextManager(context_store_path=str(tmp_path / "context.json"))
+    llm_config = LLMConfig(provider="openai", model="gpt-4")
+    configs = [NodeConfig(id=f"n{i}", type="ai", model="gpt-4", prompt="p", llm_config=llm_config) for i in range(10)]
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS // len(configs)):
+        for config in configs:
+            AiNode(config, context_manager, llm_config, llm_service=LLMService(), tool_service=ToolService())
+    fresh = (time.perf_counter() - start) / ROUNDS
+
+    pool = NodePool()
+    for config in configs:  # the first execution of each configuration builds it
+        pool.acquire(node_factory, config, context_manager, llm_config=llm_config)
+    start = time.perf_counter()
+    for _ in range(ROUNDS // len(configs)):
+        for config in configs:
+            pool.acquire(node_factory, config, context_manager, llm_config=llm_config)
+    pooled = (time.perf_counter() - start) / ROUNDS
+
+    print(f"\nper-node setup: fresh services={fresh * 1e6:.0f}us pooled={pooled * 1e6:.0f}us")
+    assert pool.stats()["misses"] == len(configs)
+    assert pooled < fresh
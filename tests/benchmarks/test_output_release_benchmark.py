@@ -0,0 +1,54 @@
+"""
+Peak-memory benchmark for releasing intermediate outputs.
+
+Runs a linear chain whose nodes each emit a large parsed-transcript-like payload and
+compares tracemalloc peaks with and without release_intermediate_outputs.
+"""
+
+import tracemalloc
+import pytest
+from app.chains.script_chain import ScriptChain
+from app.models.node_models import NodeConfig
+from app.utils.context import GraphContextManager
+
+PAYLOAD_SEGMENTS = 5000
+
+def transcript(config, context):
+    """Emits ~1-2MB of segment dicts, as a transcript parser would."""
+    return {"segments": [{"speaker": i % 4, "text": f"{config.id} segment {i}"} for i in range(PAYLOAD_SEGMENTS)]}
+
+@pytest.fixture(autouse=True)
+def transcript_nodes(fake_nodes):
+    fake_nodes.respond = transcript
+    # Recorded contexts would keep every payload alive
+    fake_nodes.record_contexts = False
+
+def linear_chain(length):
+    return [
+        NodeConfig(id=f"n{i}", type="ai", model="gpt-4", prompt="p", dependencies=[f"n{i - 1}"] if i else [])
+        for i in range(length)
+    ]
+
+async def peak_memory(tmp_path, release, length=20):
+    chain = ScriptChain(
+        nodes=linear_chain(length),
+        context_manager=GraphContextManager(context_store_path=str(tmp_path / f"context-{release}.json")),
+        persist_intermediate_outputs=False,
+        release_intermediate_outputs=release
+    )
+    tracemalloc.start()
+    try:
+        result = await chain.execute()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert result.success
+    return peak
+
+@pytest.mark.asyncio
+async def test_release_bounds_peak_memory(tmp_path):
+    kept = await peak_memory(tmp_path, release=False)
+    released = await peak_memory(tmp_path, release=True)
+    print(f"\npeak memory: keep all={kept / 1e6:.1f}MB release={released / 1e6:.1f}MB")
+    # A 20-node chain should hold a handful of payloads at a time, not all twenty
+    assert released < kept * 0.35
@@ -0,0 +1,44 @@
+"""
+Repeated-call latency benchmark for the LLM response cache.
+
+A provider call is simulated with a fixed 50ms handler; repeats of the same
+deterministic call should be answered from memory in microseconds.
+"""
+
+import asyncio
+import time
+import pytest
+from app.llm_providers.base_handler import BaseLLMHandler
+from app.models.config import LLMConfig, ModelProvider
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import RateLimiter
+from app.services.response_cache import ResponseCache, ResponseCachePolicy
+
+PROVIDER_LATENCY = 0.05
+REPEATS = 2000
+
+class SlowHandler(BaseLLMHandler):
+    async def generate_text(self, llm_config, prompt, context, tools=None):
+        await asyncio.sleep(PROVIDER_LATENCY)
+        return "cached answer " * 50, {"prompt_tokens": 10, "completion_tokens": 100, "total_tokens": 110}, None
+
+@pytest.mark.asyncio
+async def test_cached_repeats_take_microseconds(tmp_path):
+    llm_config = LLMConfig(provider="openai", model="gpt-4", api_key="test-key", temperature=0)
+    prompt = "Summarise the quarterly report. " * 40
+    for directory in (None, str(tmp_path / "cache")):
+        service = LLMService(rate_limiter=RateLimiter(), response_cache=ResponseCache(ResponseCachePolicy(enabled=True, directory=directory)))
+        service.handlers[ModelProvider.OPENAI] = SlowHandler()
+
+        start = time.perf_counter()
+        await service.generate(llm_config, prompt)
+        uncached = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            await service.generate(llm_config, prompt)
+        cached = (time.perf_counter() - start) / REPEATS
+
+        print(f"\n[{'disk+memory' if directory else 'memory'}] provider call: {uncached * 1000:.1f}ms, cached repeat: {cached * 1e6:.1f}us")
+        assert cached < 0.001
+        assert cached * 100 < uncached
@@ -0,0 +1,99 @@
+import asyncio
+import inspect
+import pytest
+from datetime import datetime
+from app.chains import script_chain as script_chain_module
+from app.models.node_models import NodeExecutionResult, NodeMetadata
+from app.nodes import factory
+from app.utils.context import GraphContextManager
+
+class FakeNode:
+    """Stand-in for the nodes ScriptChain builds; behaves as its FakeNodes says."""
+    def __init__(self, config, fakes):
+        self.config = config
+        self.llm_config = config.llm_config
+        self.fakes = fakes
+
+    async def execute(self, context):
+        fakes = self.fakes
+        node_id = self.config.id
+        fakes.calls.append(node_id)
+        if fakes.record_contexts:
+            fakes.contexts[node_id] = dict(context)
+        fakes.event("start", node_id)
+        fakes.running += 1
+        fakes.peak = max(fakes.peak, fakes.running)
+        try:
+            if node_id in fakes.blocked:
+                await asyncio.Event().wait()
+            await asyncio.sleep(fakes.latencies.get(node_id, fakes.default_latency))
+            if fakes.respond is None:
+                output = {"text": node_id}
+            else:
+                output = fakes.respond(self.config, context)
+                if inspect.isawaitable(output):
+                    output = await output
+        except asyncio.CancelledError:
+            fakes.event("cancelled", node_id)
+            raise
+        finally:
+            fakes.running -= 1
+        fakes.event("end", node_id)
+        return output if isinstance(output, NodeExecutionResult) else fakes.result(self.config, output)
+
+class FakeNodes:
+    """Fake nodes for ScriptChain tests (see the fake_nodes fixture).
+
+    Every node runs for ``latencies[node_id]`` (default ``default_latency``) seconds,
+    or until cancelled if its ID is in ``blocked``, and outputs ``{"text": node_id}``
+    unless ``respond(config, context)`` (sync or async) returns another output dict or
+    a NodeExecutionResult. Node types in ``real_types`` are built by the real factory.
+    """
+    def __init__(self, real_factory):
+        self.real_factory = real_factory
+        self.real_types = set()
+        self.latencies = {}
+        self.default_latency = 0.0
+        self.blocked = set()
+        self.respond = None
+        self.record_contexts = True
+        # Node IDs in the order they were built / started, and the last context per node
+        self.created = []
+        self.calls = []
+        self.contexts = {}
+        # ("start" | "end" | "cancelled", node_id) in order, with their event-loop times
+        self.events = []
+        self.times = {}
+        self.running = 0
+        self.peak = 0
+
+    def event(self, kind, node_id):
+        self.events.append((kind, node_id))
+        self.times[(kind, node_id)] = asyncio.get_running_loop().time()
+
+    def result(self, config, output=None, success=True, error=None, usage=None):
+        return NodeExecutionResult(
+            success=success,
+            output=output,
+            error=error,
+            usage=usage,
+            metadata=NodeMetadata(node_id=config.id, node_type=config.type, start_time=datetime.utcnow())
+        )
+
+    def factory(self, node_config, context_manager, llm_config=None, callbacks=None, tool_service=None, max_parallel=None, llm_service=None):
+        self.created.append(node_config.id)
+        if node_config.type in self.real_types:
+            return self.real_factory(node_config, context_manager, llm_config, callbacks, tool_service, max_parallel, llm_service)
+        return FakeNode(node_config, self)
+
+@pytest.fixture
+def fake_nodes(monkeypatch):
+    """Make ScriptChain (and map nodes' sub-executions) build FakeNodes' fake nodes"""
+    fakes = FakeNodes(factory.node_factory)
+    monkeypatch.setattr(script_chain_module, "node_factory", fakes.factory)
+    monkeypatch.setattr(factory, "node_factory", fakes.factory)
+    return fakes
+
+@pytest.fixture
+def context_manager(tmp_path):
+    return GraphContextManager(context_store_path=str(tmp_path / "context.json"))
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from app.chains.script_chain import ScriptChain
+from app.llm_providers import batch as batch_module
+from app.llm_providers.batch import BatchBackend, BatchJob, MockBatchBackend, OpenAIBatchBackend, openai_batch_request, parse_openai_batch_result
+from app.models.config import LLMConfig
+from app.models.node_models import NodeConfig
+from app.services.bulk_llm import BulkLLMService
+from app.services.execution_budget import ExecutionBudget
+
+LLM_CONFIG = LLMConfig(provider="openai", model="gpt-4", temperature=0)
+
+class InteractiveService:
+    """Fake interactive LLM service."""
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, llm_config, prompt, context=None, tools=None):
+        self.calls.append(prompt)
+        return f"interactive:{prompt}", None, None
+
+def ai_node(node_id, prompt, dependencies=()):
+    return NodeConfig(id=node_id, type="ai", model="gpt-4", prompt=prompt, llm_config=LLM_CONFIG, dependencies=list(dependencies))
+
+def test_openai_batch_lines_round_trip():
+    request = openai_batch_request("request-0", LLM_CONFIG.model_copy(update={"max_tokens": 5}), "Hi")
+    assert request == {
+        "custom_id": "request-0", "method": "POST", "url": "/v1/chat/completions",
+        "body": {"model": "gpt-4", "messages": [{"role": "user", "content": "Hi"}], "temperature": 0, "max_tokens": 5}
+    }
+    ok = {"custom_id": "a", "response": {"status_code": 200, "body": {
+        "choices": [{"message": {"content": " hello "}}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3}
+    }}, "error": None}
+    assert parse_openai_batch_result(ok) == ("a", ("hello", {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3, "cached_prompt_tokens": 0}, None))
+    rejected = {"custom_id": "b", "response": {"status_code": 400, "body": {"error": {"message": "bad model"}}}, "error": None}
+    assert parse_openai_batch_result(rejected) == ("b", ("", None, "OpenAI batch error (status 400): bad model"))
+
+@pytest.mark.asyncio
+async def test_chains_sharing_the_service_are_batched_together(context_manager):
+    # AiNode parses its output from the completion's JSON
+    backend = MockBatchBackend(responder=lambda body: json.dumps({"text": body["messages"][0]["content"].upper()}))
+    bulk = BulkLLMService({"openai": backend}, collect_window=0.05, poll_interval=0.01)
+    chains = [
+        ScriptChain([
+            ai_node("a", f"first {i}"),
+            ai_node("b", f"second {i}"),
+            ai_node("c", "combine", dependencies=["a"]),
+        ], context_manager=context_manager, persist_intermediate_outputs=False, llm_service=bulk)
+        for i in range(2)
+    ]
+    results = await asyncio.gather(*(chain.execute() for chain in chains))
+    assert all(result.success for result in results)
+    assert results[1].output["a"].output["text"] == "FIRST 1"
+    assert results[1].output["c"].output["text"] == "COMBINE"
+    # The four independent nodes share one batch, the two dependents a second one
+    assert [batch["request_count"] for batch in backend.batches.values()] == [4, 2]
+    assert bulk.get_metrics()["batched_calls"] == 6
+
+@pytest.mark.asyncio
+async def test_parked_nodes_give_their_execution_slots_back(context_manager):
+    backend = MockBatchBackend(responder=lambda body: json.dumps({"text": "ok"}))
+    bulk = BulkLLMService({"openai": backend}, collect_window=0.05, poll_interval=0.01)
+    budget = ExecutionBudget(limit=4)
+    chain = ScriptChain(
+        [ai_node(f"n{i}", f"prompt {i}") for i in range(12)],
+        context_manager=context_manager, persist_intermediate_outputs=False,
+        max_parallel=12, execution_budget=budget, llm_service=bulk
+    )
+    result = await chain.execute()
+    assert result.success
+    # More nodes than the budget has slots, all in one batch
+    assert [batch["request_count"] for batch in backend.batches.values()] == [12]
+    assert budget.in_use == 0
+
+@pytest.mark.asyncio
+async def test_unbatchable_calls_use_the_interactive_service():
+    interactive = InteractiveService()
+    bulk = BulkLLMService({"openai": MockBatchBackend()}, llm_service=interactive, collect_window=0.01)
+    anthropic_config = LLM_CONFIG.model_copy(update={"provider": "anthropic"})
+    assert await bulk.generate(anthropic_config, "hi") == ("interactive:hi", None, None)
+    assert (await bulk.generate(LLM_CONFIG, "tools", tools=[{"name": "search"}]))[0] == "interactive:tools"
+    assert (await bulk.generate(LLM_CONFIG.model_copy(update={"api_key": "sk-own"}), "key"))[0] == "interactive:key"
+    assert bulk.get_metrics()["interactive_calls"] == 3
+
+@pytest.mark.asyncio
+async def test_failures_reach_the_callers():
+    def responder(body):
+        if "bad" in body["messages"][0]["content"]:
+            raise ValueError("content filtered")
+        return "fine"
+    bulk = BulkLLMService({"openai": MockBatchBackend(responder=responder)}, collect_window=0.01)
+    good, bad = await asyncio.gather(bulk.generate(LLM_CONFIG, "good"), bulk.generate(LLM_CONFIG, "bad"))
+    assert good[0] == "fine" and good[2] is None
+    assert bad == ("", None, "OpenAI batch error: content filtered")
+
+    class FailingBackend(MockBatchBackend):
+        async def poll(self, batch_id):
+            return BatchJob(id=batch_id, status="failed", error="invalid input file")
+    bulk = BulkLLMService({"openai": FailingBackend()}, collect_window=0.01)
+    text, usage, error = await bulk.generate(LLM_CONFIG, "prompt")
+    assert error == "openai batch failed: batch batch_mock_1 failed: invalid input file"
+    assert bulk.get_metrics()["failed_batches"] == 1
+
+@pytest.mark.asyncio
+async def test_full_batches_and_flush_submit_immediately():
+    backend = MockBatchBackend()
+    bulk = BulkLLMService({"openai": backend}, collect_window=60, max_batch_size=2, poll_interval=0.01)
+    results = await asyncio.wait_for(asyncio.gather(bulk.generate(LLM_CONFIG, "a"), bulk.generate(LLM_CONFIG, "b")), 1)
+    assert [text for text, _, _ in results] == ["a", "b"]
+    waiting = asyncio.create_task(bulk.generate(LLM_CONFIG, "c"))
+    await asyncio.sleep(0)
+    await bulk.flush()
+    assert (await asyncio.wait_for(waiting, 1))[0] == "c"
+    assert len(backend.batches) == 2
+
+@pytest.mark.asyncio
+async def test_mock_backend_polls_until_complete():
+    backend = MockBatchBackend(completion_delay=0.05)
+    bulk = BulkLLMService({"openai": backend}, collect_window=0, poll_interval=0.01)
+    assert (await bulk.generate(LLM_CONFIG, "slow"))[0] == "slow"
+    assert isinstance(backend, BatchBackend)
+
+@pytest.mark.asyncio
+async def test_openai_backend_uses_the_batch_api(monkeypatch):
+    calls = {}
+    output = json.dumps({"custom_id": "request-0", "response": {"status_code": 200, "body": {
+        "choices": [{"message": {"content": "done"}}], "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+    }}, "error": None})
+    batch = SimpleNamespace(
+        id="batch_1", status="completed", request_counts=SimpleNamespace(total=1),
+        errors=None, output_file_id="file_out", error_file_id=None
+    )
+
+    async def create_file(file, purpose):
+        calls["file"], calls["purpose"] = file, purpose
+        return SimpleNamespace(id="file_in")
+
+    async def create_batch(**kwargs):
+        calls["batch"] = kwargs
+        return batch
+
+    async def retrieve(batch_id):
+        return batch
+
+    async def content(file_id):
+        return SimpleNamespace(text=output + "\n")
+
+    client = SimpleNamespace(
+        files=SimpleNamespace(create=create_file, content=content),
+        batches=SimpleNamespace(create=create_batch, retrieve=retrieve)
+    )
+    monkeypatch.setattr(batch_module, "get_client_registry", lambda: SimpleNamespace(openai=lambda api_key: client))
+    backend = OpenAIBatchBackend(api_key="sk-test")
+    batch_id = await backend.submit([backend.build_request("request-0", LLM_CONFIG, "prompt")])
+    assert batch_id == "batch_1"
+    assert calls["purpose"] == "batch"
+    assert json.loads(calls["file"][1])["body"]["model"] == "gpt-4"
+    assert calls["batch"] == {"input_file_id": "file_in", "endpoint": "/v1/chat/completions", "completion_window": "24h"}
+    assert (await backend.poll(batch_id)).done
+    assert await backend.results(batch_id) == {"request-0": ("done", {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2, "cached_prompt_tokens": 0}, None)}
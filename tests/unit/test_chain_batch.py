@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from datetime import datetime
+from app.chains.batch import ChainBatch
+from app.models.config import ModelProvider
+from app.models.node_models import NodeConfig, NodeExecutionResult, NodeMetadata, UsageMetadata
+
+async def record_output(config, context):
+    """Echo the record's 'text' input after a record-specific delay"""
+    await asyncio.sleep(context.get("delay", 0.01))
+    if context.get("fail"):
+        return NodeExecutionResult(
+            success=False,
+            error="bad record",
+            metadata=NodeMetadata(node_id=config.id, node_type=config.type)
+        )
+    return NodeExecutionResult(
+        success=True,
+        output={"text": f"{config.id}:{context['text']}"},
+        metadata=NodeMetadata(node_id=config.id, node_type=config.type, start_time=datetime.utcnow(), provider=ModelProvider.OPENAI),
+        usage=UsageMetadata(total_tokens=10, model="gpt-4", node_id=config.id, provider=ModelProvider.OPENAI)
+    )
+
+@pytest.fixture(autouse=True)
+def records(fake_nodes):
+    fake_nodes.respond = record_output
+    return fake_nodes
+
+def summary_chain():
+    return [NodeConfig(id="summary", type="ai", model="gpt-4", prompt="Summarize {text}")]
+
+@pytest.mark.asyncio
+async def test_ordered_batch_preserves_input_order(context_manager):
+    records = [{"text": f"m{i}", "delay": 0.05 if i == 0 else 0.01} for i in range(6)]
+    batch = ChainBatch(summary_chain(), max_concurrency=3, context_manager=context_manager)
+    results = [item async for item in batch.run(records)]
+    assert [item.index for item in results] == list(range(6))
+    assert results[0].result.output["summary"].output["text"] == "summary:m0"
+    stats = batch.stats()
+    assert stats["succeeded"] == 6
+    assert stats["total_tokens"] == 60
+    assert stats["token_usage"] == {"gpt-4": 60}
+    assert stats["records_per_second"] > 0
+
+@pytest.mark.asyncio
+async def test_unordered_batch_yields_in_completion_order(context_manager):
+    records = [{"text": "slow", "delay": 0.1}, {"text": "fast", "delay": 0.01}]
+    batch = ChainBatch(summary_chain(), max_concurrency=2, ordered=False, context_manager=context_manager)
+    assert [item.index async for item in batch.run(records)] == [1, 0]
+
+@pytest.mark.asyncio
+async def test_failures_are_isolated_per_record(context_manager):
+    records = [{"text": "ok"}, {"text": "x", "fail": True}, "not a record", {"text": "ok too"}]
+    batch = ChainBatch(summary_chain(), max_concurrency=2, context_manager=context_manager)
+    results = [item async for item in batch.run(records)]
+    assert [item.success for item in results] == [True, False, False, True]
+    assert "bad record" in results[1].error
+    assert "must be an object" in results[2].error
+    assert batch.stats()["failed"] == 2
+
+@pytest.mark.asyncio
+async def test_batch_pulls_async_records_lazily(context_manager):
+    pulled = []
+    async def records():
+        for i in range(20):
+            pulled.append(i)
+            yield {"text": str(i)}
+    batch = ChainBatch(summary_chain(), max_concurrency=2, context_manager=context_manager)
+    stream = batch.run(records())
+    first = await stream.__anext__()
+    await stream.aclose()
+    assert first.index == 0
+    assert len(pulled) < 20
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped(context_manager, records):
+    batch = ChainBatch(summary_chain(), max_concurrency=3, context_manager=context_manager)
+    results = [item async for item in batch.run({"text": str(i)} for i in range(12))]
+    assert len(results) == 12
+    assert records.peak == 3
+
+def test_unknown_target_rejected_up_front():
+    with pytest.raises(ValueError):
+        ChainBatch(summary_chain(), targets=["nope"])
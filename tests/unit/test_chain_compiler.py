@@ -0,0 +1,84 @@
+import pytest
+from app.chains.compiler import ChainPlanCache, CircularDependencyError, chain_fingerprint, compile_chain
+from app.chains.script_chain import ScriptChain
+from app.models.node_models import InputMapping, NodeConfig
+from app.utils.context import GraphContextManager
+
+def make_node(node_id, dependencies=None, prompt=None, input_mappings=None):
+    return NodeConfig(
+        id=node_id,
+        type="ai",
+        model="gpt-4",
+        prompt=prompt or node_id,
+        dependencies=dependencies or [],
+        input_mappings=input_mappings or {}
+    )
+
+def diamond(prompt_suffix=""):
+    return [
+        make_node("a", prompt="a" + prompt_suffix),
+        make_node("b", ["a"]),
+        make_node("c", ["a"]),
+        make_node("d", ["b", "c"], input_mappings={
+            "first": InputMapping(source_node_id="b", source_output_key="items.0"),
+            "whole": InputMapping(source_node_id="c", source_output_key="text"),
+        }),
+    ]
+
+def test_plan_contents():
+    plan = compile_chain(diamond(), cache=ChainPlanCache())
+    assert plan.topological_order[0] == "a"
+    assert plan.topological_order[-1] == "d"
+    assert plan.predecessors["d"] == ("b", "c")
+    assert set(plan.successors["a"]) == {"b", "c"}
+    assert plan.node_levels == {"a": 0, "b": 1, "c": 1, "d": 2}
+    assert plan.levels[1] == ("b", "c")
+    (accessor,) = plan.input_accessors["d"]["b"]
+    assert accessor.placeholder == "first"
+    assert accessor.resolve({"items": ["x", "y"]}) == "x"
+
+def test_fingerprint_ignores_prompts_but_not_structure():
+    assert chain_fingerprint(diamond()) == chain_fingerprint(diamond(prompt_suffix=" edited"))
+    rewired = diamond()
+    rewired[3] = make_node("d", ["b"])
+    assert chain_fingerprint(diamond()) != chain_fingerprint(rewired)
+
+def test_repeat_submission_reuses_plan():
+    cache = ChainPlanCache()
+    first = compile_chain(diamond(), cache=cache)
+    second = compile_chain(diamond(prompt_suffix=" v2"), cache=cache)
+    assert second is first
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_cache_evicts_least_recently_used():
+    cache = ChainPlanCache(maxsize=2)
+    compile_chain([make_node("x")], cache=cache)
+    compile_chain([make_node("y")], cache=cache)
+    compile_chain([make_node("x")], cache=cache)
+    compile_chain([make_node("z")], cache=cache)
+    assert cache.get(chain_fingerprint([make_node("x")])) is not None
+    assert cache.get(chain_fingerprint([make_node("y")])) is None
+
+def test_invalid_chains_are_rejected_and_not_cached():
+    cache = ChainPlanCache()
+    with pytest.raises(CircularDependencyError):
+        compile_chain([make_node("a", ["b"]), make_node("b", ["a"])], cache=cache)
+    with pytest.raises(ValueError):
+        compile_chain([make_node("a", ["missing"])], cache=cache)
+    assert cache.stats()["size"] == 0
+
+def test_script_chain_uses_compiled_plan(tmp_path):
+    cache = ChainPlanCache()
+    context_manager = GraphContextManager(context_store_path=str(tmp_path / "context.json"))
+    first = ScriptChain(nodes=diamond(), context_manager=context_manager, plan_cache=cache)
+    second = ScriptChain(nodes=diamond(), context_manager=context_manager, plan_cache=cache)
+    assert second.plan is first.plan
+    assert second.nodes["d"].level == 2
+    assert second.get_level_nodes(1) == ["b", "c"]
+    assert set(second.graph.predecessors("d")) == {"b", "c"}
+
+def test_cycle_error_names_one_cycle():
+    nodes = [make_node("a", ["c"]), make_node("b", ["a"]), make_node("c", ["b"]), make_node("d", ["c"])]
+    with pytest.raises(CircularDependencyError, match="b -> c -> a"):
+        compile_chain(nodes, cache=ChainPlanCache())
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import routes
+from app.chains.script_chain import ScriptChain
+from app.models.node_models import NodeConfig
+from app.utils.context import GraphContextManager
+from app.utils.execution_journal import ExecutionJournal
+
+def make_node(node_id, dependencies=None):
+    return NodeConfig(id=node_id, type="ai", model="gpt-4", prompt=node_id, dependencies=dependencies or [])
+
+@pytest.fixture(autouse=True)
+def node_latency(fake_nodes):
+    fake_nodes.default_latency = 0.01
+
+@pytest.mark.asyncio
+async def test_results_stream_in_completion_order(fake_nodes, context_manager):
+    fake_nodes.latencies.update({"slow": 0.2, "fast": 0.01, "after_fast": 0.01})
+    chain = ScriptChain(
+        nodes=[make_node("slow"), make_node("fast"), make_node("after_fast", ["fast"])],
+        context_manager=context_manager,
+        persist_intermediate_outputs=False
+    )
+    streamed = [result.metadata.node_id async for result in chain.execute_stream()]
+    assert streamed == ["fast", "after_fast", "slow"]
+    assert chain.last_result.success
+    assert set(chain.last_result.output) == {"slow", "fast", "after_fast"}
+
+@pytest.mark.asyncio
+async def test_closing_stream_cancels_running_nodes(fake_nodes, context_manager):
+    fake_nodes.latencies.update({"quick": 0.01, "long": 5})
+    chain = ScriptChain(
+        nodes=[make_node("quick"), make_node("long"), make_node("never", ["long"])],
+        context_manager=context_manager,
+        persist_intermediate_outputs=False
+    )
+    stream = chain.execute_stream()
+    first = await stream.__anext__()
+    assert first.metadata.node_id == "quick"
+    await stream.aclose()
+    await asyncio.sleep(0)
+    assert ("cancelled", "long") in fake_nodes.events
+    assert ("start", "never") not in fake_nodes.events
+    assert chain.last_result is None
+
+def test_sse_endpoint_streams_node_and_chain_events(fake_nodes, tmp_path, monkeypatch):
+    monkeypatch.setattr(routes, "context_manager", GraphContextManager(context_store_path=str(tmp_path / "context.json")))
+    monkeypatch.setattr(routes, "execution_journal", ExecutionJournal(journal_dir=str(tmp_path / "journals")))
+    app = FastAPI()
+    app.include_router(routes.router)
+    payload = {
+        "nodes": [n.model_dump(mode="json") for n in [make_node("a"), make_node("b", ["a"])]],
+        "persist_intermediate_outputs": False
+    }
+    with TestClient(app) as client:
+        response = client.post("/api/v1/chains/execute/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    assert [name for name, _ in events] == ["chain_start", "node_result", "node_result", "chain_end"]
+    assert [data["metadata"]["node_id"] for name, data in events if name == "node_result"] == ["a", "b"]
+    assert events[-1][1]["success"] is True
+
+def test_sse_endpoint_rejects_unknown_targets(fake_nodes, tmp_path, monkeypatch):
+    monkeypatch.setattr(routes, "execution_journal", ExecutionJournal(journal_dir=str(tmp_path / "journals")))
+    app = FastAPI()
+    app.include_router(routes.router)
+    payload = {"nodes": [make_node("a").model_dump(mode="json")], "targets": ["missing"]}
+    with TestClient(app) as client:
+        response = client.post("/api/v1/chains/execute/stream", json=payload)
+    assert response.status_code == 400
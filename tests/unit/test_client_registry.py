@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from app.llm_providers import client_registry as registry_module
+from app.llm_providers import openai_handler
+from app.llm_providers.client_registry import ClientPoolConfig, ClientRegistry
+from app.llm_providers.openai_handler import OpenAIHandler
+from app.models.config import LLMConfig
+
+@pytest.mark.asyncio
+async def test_clients_are_shared_per_provider_key_and_base_url():
+    registry = ClientRegistry()
+    first = registry.openai("sk-a")
+    assert registry.openai("sk-a") is first
+    assert registry.openai("sk-b") is not first
+    assert registry.openai("sk-a", base_url="https://api.deepseek.com/v1") is not first
+    assert registry.anthropic("sk-a") is not first
+    assert len(registry) == 4
+    await registry.aclose()
+    assert first.is_closed()
+    assert len(registry) == 0
+
+@pytest.mark.asyncio
+async def test_pool_limits_and_http2_fallback(monkeypatch):
+    captured = {}
+    class RecordingHttpxClient(registry_module.OpenAIHttpxClient):
+        def __init__(self, **kwargs):
+            captured.update(kwargs)
+            super().__init__(**kwargs)
+    monkeypatch.setattr(registry_module, "OpenAIHttpxClient", RecordingHttpxClient)
+    monkeypatch.setattr(registry_module, "_http2_available", lambda: False)
+    registry = ClientRegistry(ClientPoolConfig(max_connections=7, max_keepalive_connections=3, keepalive_expiry=5, http2=True))
+    registry.openai("sk-a")
+    assert captured["limits"].max_connections == 7
+    assert captured["limits"].max_keepalive_connections == 3
+    assert captured["limits"].keepalive_expiry == 5
+    assert captured["http2"] is False
+    await registry.aclose()
+
+def test_clients_are_rebuilt_on_a_new_event_loop():
+    registry = ClientRegistry()
+    async def get():
+        return registry.openai("sk-a")
+    first = asyncio.run(get())
+    assert asyncio.run(get()) is not first
+
+def test_pool_config_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_HTTP_MAX_CONNECTIONS", "50")
+    monkeypatch.setenv("LLM_HTTP2", "false")
+    config = ClientPoolConfig.from_env()
+    assert config.max_connections == 50 and config.http2 is False
+
+@pytest.mark.asyncio
+async def test_openai_handler_reuses_the_registry_client(monkeypatch):
+    calls = []
+    async def create(**kwargs):
+        calls.append(kwargs["model"])
+        message = SimpleNamespace(content="hi", function_call=None)
+        usage = SimpleNamespace(prompt_tokens=1, completion_tokens=1, total_tokens=2)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    requested = []
+    class StubRegistry:
+        def openai(self, api_key, base_url=None):
+            requested.append(api_key)
+            return client
+    monkeypatch.setattr(openai_handler, "get_client_registry", lambda: StubRegistry())
+    handler = OpenAIHandler()
+    config = LLMConfig(provider="openai", model="gpt-4", api_key="test-key")
+    for _ in range(2):
+        assert await handler.generate_text(config, "prompt", {}) == ("hi", {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2, "cached_prompt_tokens": 0}, None)
+    assert requested == ["test-key", "test-key"]
+    assert calls == ["gpt-4", "gpt-4"]
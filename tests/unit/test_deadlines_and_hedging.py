@@ -0,0 +1,133 @@
+import asyncio
+import time
+import pytest
+from app.chains import script_chain as script_chain_module
+from app.chains.script_chain import ScriptChain
+from app.models.config import LLMConfig, ModelProvider
+from app.models.node_models import NodeConfig
+from app.nodes.ai_node import AiNode
+from app.services.hedging import HedgingPolicy, LatencyTracker, hedged_call
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import RateLimiter
+from app.utils.context import GraphContextManager
+from app.utils.deadline import DeadlineExceededError, deadline_scope, remaining_time, with_deadline
+
+class HangingLLMService:
+    async def generate(self, llm_config, prompt, context=None, tools=None):
+        await asyncio.sleep(10)
+        return "never", None, None
+
+class ScriptedHandler:
+    """Fake provider handler returning after the next scripted latency."""
+    def __init__(self, latencies):
+        self.latencies = list(latencies)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_text(self, llm_config, prompt, context, tools=None):
+        latency = self.latencies[min(self.calls, len(self.latencies) - 1)]
+        self.calls += 1
+        try:
+            await asyncio.sleep(latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"answer after {latency}", {"total_tokens": 5}, None
+
+def make_service(handler, enabled=True):
+    service = LLMService(
+        rate_limiter=RateLimiter(),
+        hedging=HedgingPolicy(enabled=enabled, min_samples=5, min_delay=0.01),
+        latency_tracker=LatencyTracker()
+    )
+    service.handlers[ModelProvider.OPENAI] = handler
+    return service
+
+LLM_CONFIG = LLMConfig(provider=ModelProvider.OPENAI, model="gpt-4")
+
+@pytest.mark.asyncio
+async def test_deadline_scopes_only_tighten():
+    assert remaining_time() is None
+    with deadline_scope(0.05):
+        with deadline_scope(10):
+            assert remaining_time() <= 0.05
+        with pytest.raises(DeadlineExceededError):
+            await with_deadline(asyncio.sleep(1), "sleep")
+    assert remaining_time() is None
+
+@pytest.mark.asyncio
+async def test_ai_node_enforces_timeout_around_llm_call(tmp_path):
+    config = NodeConfig(id="slow", type="ai", model="gpt-4", prompt="hi", timeout=0.05, llm_config=LLM_CONFIG)
+    node = AiNode(
+        config,
+        GraphContextManager(context_store_path=str(tmp_path / "context.json")),
+        LLM_CONFIG,
+        llm_service=HangingLLMService()
+    )
+    start = time.perf_counter()
+    result = await node.execute({})
+    assert time.perf_counter() - start < 1
+    assert not result.success
+    assert result.metadata.error_type == "TimeoutError"
+    assert "Timed out after 0.05s" in result.error
+
+@pytest.mark.asyncio
+async def test_script_chain_backstops_nodes_without_deadlines(fake_nodes, context_manager, monkeypatch):
+    fake_nodes.blocked.add("stuck")
+    monkeypatch.setattr(script_chain_module, "NODE_TIMEOUT_GRACE", 0.01)
+    chain = ScriptChain(
+        nodes=[NodeConfig(id="stuck", type="ai", model="gpt-4", prompt="x", timeout=0.05)],
+        context_manager=context_manager,
+        persist_intermediate_outputs=False
+    )
+    result = await chain.execute()
+    assert not result.success
+    assert "timed out after 0.05s" in result.error
+
+@pytest.mark.asyncio
+async def test_hedged_call_first_response_wins():
+    started = []
+    async def call():
+        attempt = len(started)
+        started.append(attempt)
+        await asyncio.sleep(1 if attempt == 0 else 0.01)
+        return f"attempt {attempt}", None, None
+    start = time.perf_counter()
+    result, hedges = await hedged_call(call, delay=0.02)
+    assert result[0] == "attempt 1"
+    assert hedges == 1
+    assert time.perf_counter() - start < 0.5
+
+@pytest.mark.asyncio
+async def test_hedged_call_does_not_retry_errors():
+    calls = []
+    async def call():
+        calls.append(1)
+        return "", None, "Provider API Error: boom"
+    result, hedges = await hedged_call(call, delay=0.01)
+    assert result[2] == "Provider API Error: boom"
+    assert hedges == 0 and len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_service_hedges_only_after_learning_latency():
+    # Five fast calls teach the tracker the p95; the sixth stalls and gets hedged
+    handler = ScriptedHandler([0.01] * 5 + [1.0, 0.01])
+    service = make_service(handler)
+    for _ in range(5):
+        await service.generate(LLM_CONFIG, "hi")
+    start = time.perf_counter()
+    text, usage, error = await service.generate(LLM_CONFIG, "hi")
+    assert error is None
+    assert time.perf_counter() - start < 0.5
+    assert handler.calls == 7
+    await asyncio.sleep(0)
+    assert handler.cancelled == 1
+
+@pytest.mark.asyncio
+async def test_hedging_can_be_disabled_per_call():
+    handler = ScriptedHandler([0.01] * 5 + [0.2])
+    service = make_service(handler)
+    for _ in range(5):
+        await service.generate(LLM_CONFIG, "hi")
+    await service.generate(LLM_CONFIG.model_copy(update={"hedge": False}), "hi")
+    assert handler.calls == 6
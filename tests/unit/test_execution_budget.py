@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from app.chains.script_chain import ScriptChain
+from app.models.node_models import NodeConfig
+from app.services.execution_budget import ExecutionBudget
+
+@pytest.mark.asyncio
+async def test_slots_are_granted_round_robin_between_owners():
+    budget = ExecutionBudget(limit=1)
+    order = []
+
+    async def worker(owner, tag):
+        async with budget.slot(owner):
+            order.append(tag)
+            await asyncio.sleep(0)
+
+    await budget.acquire("blocker")
+    # chain-a queues three waiters before chain-b queues one
+    tasks = [asyncio.create_task(worker("chain-a", f"a{i}")) for i in range(3)]
+    tasks.append(asyncio.create_task(worker("chain-b", "b0")))
+    await asyncio.sleep(0)
+    budget.release()
+    await asyncio.gather(*tasks)
+    assert order[:2] == ["a0", "b0"]
+    assert budget.in_use == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    budget = ExecutionBudget(limit=1)
+    await budget.acquire("a")
+    waiter = asyncio.create_task(budget.acquire("b"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    budget.release()
+    assert budget.in_use == 0
+    assert budget.waiting == 0
+
+@pytest.mark.asyncio
+async def test_budget_is_shared_across_concurrent_chains(context_manager, fake_nodes):
+    fake_nodes.default_latency = 0.01
+    budget = ExecutionBudget(limit=3)
+    chains = [
+        ScriptChain(
+            nodes=[NodeConfig(id=f"c{c}n{i}", type="ai", model="gpt-4", prompt="p") for i in range(5)],
+            context_manager=context_manager,
+            max_parallel=5,
+            persist_intermediate_outputs=False,
+            execution_budget=budget
+        )
+        for c in range(4)
+    ]
+    results = await asyncio.gather(*(chain.execute() for chain in chains))
+    assert all(result.success for result in results)
+    assert fake_nodes.peak <= 3
@@ -0,0 +1,64 @@
+import threading
+import pytest
+from datetime import datetime
+from app.models.node_models import NodeExecutionResult, NodeMetadata, UsageMetadata
+from app.utils.execution_history import ExecutionHistory
+
+def make_result(node_id, success=True, usage=None):
+    return NodeExecutionResult(
+        success=success,
+        output={"text": "ok"} if success else None,
+        error=None if success else "failed",
+        metadata=NodeMetadata(node_id=node_id, node_type="ai", start_time=datetime.utcnow()),
+        usage=usage
+    )
+
+def test_avg_duration_uses_successful_runs_only():
+    history = ExecutionHistory()
+    history.record("chain", "a", make_result("a"), 2.0)
+    history.record("chain", "a", make_result("a"), 4.0)
+    history.record("chain", "a", make_result("a", success=False), 0.1)
+    record = history.records[("chain", "a")]
+    assert record.executions == 3
+    assert record.successes == 2
+    assert record.failures == 1
+    assert record.avg_duration == pytest.approx(3.0)
+    assert history.expected_duration("chain", "a") == pytest.approx(3.0)
+    assert history.expected_duration("chain", "unknown") is None
+
+def test_chains_sharing_node_ids_keep_separate_records():
+    history = ExecutionHistory()
+    history.record("transcripts", "summary", make_result("summary"), 8.0)
+    history.record("tickets", "summary", make_result("summary"), 0.5)
+    assert history.expected_duration("transcripts", "summary") == pytest.approx(8.0)
+    assert history.expected_duration("tickets", "summary") == pytest.approx(0.5)
+    assert history.expected_duration("other", "summary") is None
+
+def test_token_usage_is_accumulated():
+    history = ExecutionHistory()
+    usage = UsageMetadata(prompt_tokens=3, completion_tokens=2, total_tokens=5, model="gpt-4", node_id="a", provider="openai")
+    history.record("chain", "a", make_result("a", usage=usage), 1.0)
+    history.record("chain", "a", make_result("a", usage=usage), 1.0)
+    assert history.records[("chain", "a")].token_usage["gpt-4"] == 10
+
+def test_history_round_trips_through_store(tmp_path):
+    path = str(tmp_path / "history.json")
+    history = ExecutionHistory(store_path=path)
+    history.record("chain", "a", make_result("a"), 1.5)
+    history.save()
+    reloaded = ExecutionHistory(store_path=path)
+    assert reloaded.expected_duration("chain", "a") == pytest.approx(1.5)
+
+@pytest.mark.asyncio
+async def test_async_save_writes_off_the_event_loop_and_only_when_changed(tmp_path):
+    writes = []
+    class ThreadRecordingHistory(ExecutionHistory):
+        def _write(self, changes, data):
+            writes.append(threading.get_ident())
+            super()._write(changes, data)
+    history = ThreadRecordingHistory(store_path=str(tmp_path / "history.json"))
+    history.record("chain", "a", make_result("a"), 1.0)
+    await history.save_async()
+    await history.save_async()
+    assert len(writes) == 1 and threading.get_ident() not in writes
+    assert ExecutionHistory(store_path=history.store_path).expected_duration("chain", "a") == pytest.approx(1.0)
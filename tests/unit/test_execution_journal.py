@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import threading
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import routes
+from app.chains.script_chain import ScriptChain
+from app.models.config import LLMConfig
+from app.models.node_models import NodeConfig
+from app.utils.context import GraphContextManager
+from app.utils.execution_journal import ExecutionJournal, JournalNotFoundError
+
+def make_node(node_id, dependencies=None):
+    return NodeConfig(id=node_id, type="ai", model="gpt-4", prompt=node_id, dependencies=dependencies or [])
+
+@pytest.fixture(autouse=True)
+def dependency_outputs(fake_nodes):
+    """Each node outputs its ID and the sorted keys of its context"""
+    fake_nodes.respond = lambda config, context: {"text": f"{config.id}({','.join(sorted(context))})"}
+
+@pytest.fixture
+def journal(tmp_path):
+    return ExecutionJournal(journal_dir=str(tmp_path / "journals"))
+
+async def crash_after(chain, node_id, calls):
+    """Run the chain until `node_id` has started, then kill it like a worker restart."""
+    task = asyncio.create_task(chain.execute())
+    while node_id not in calls:
+        await asyncio.sleep(0.005)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+@pytest.mark.asyncio
+async def test_resume_runs_only_unfinished_nodes(fake_nodes, context_manager, journal):
+    calls, blocked = fake_nodes.calls, fake_nodes.blocked
+    nodes = [make_node("a"), make_node("b", ["a"]), make_node("c", ["b"]), make_node("side")]
+    chain = ScriptChain(nodes=nodes, context_manager=context_manager, persist_intermediate_outputs=False, journal=journal)
+    blocked.add("b")
+    await crash_after(chain, "b", calls)
+
+    calls.clear()
+    blocked.clear()
+    resumed = ScriptChain.resume(chain.chain_id, journal, context_manager=context_manager)
+    assert resumed.chain_id == chain.chain_id
+    result = await resumed.execute()
+
+    assert result.success
+    assert sorted(calls) == ["b", "c"]
+    assert set(result.output) == {"a", "b", "c", "side"}
+    # The resumed node still receives the output of its journaled dependency
+    assert result.output["b"].output["text"] == "b(a)"
+    # Nothing is left to resume once the chain has succeeded
+    assert not journal.exists(chain.chain_id)
+
+@pytest.mark.asyncio
+async def test_resume_restores_the_targets(fake_nodes, context_manager, journal):
+    calls, blocked = fake_nodes.calls, fake_nodes.blocked
+    nodes = [make_node("a"), make_node("b", ["a"]), make_node("c", ["b"]), make_node("side")]
+    chain = ScriptChain(nodes=nodes, context_manager=context_manager, persist_intermediate_outputs=False, journal=journal)
+    blocked.add("a")
+    task = asyncio.create_task(chain.execute(targets=["b"]))
+    while "a" not in calls:
+        await asyncio.sleep(0.005)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    calls.clear()
+    blocked.clear()
+    result = await ScriptChain.resume(chain.chain_id, journal, context_manager=context_manager).execute()
+    assert calls == ["a", "b"]
+    assert set(result.output) == {"a", "b"}
+    assert sorted(result.skipped_nodes) == ["c", "side"]
+
+@pytest.mark.asyncio
+async def test_api_keys_stay_out_of_the_journal(fake_nodes, context_manager, journal):
+    llm_config = LLMConfig(provider="openai", model="gpt-4", api_key="test-journaled-key")
+    nodes = [make_node("a"), make_node("b", ["a"]).model_copy(update={"llm_config": llm_config})]
+    chain = ScriptChain(nodes=nodes, context_manager=context_manager, persist_intermediate_outputs=False, journal=journal)
+    fake_nodes.blocked.add("b")
+    await crash_after(chain, "b", fake_nodes.calls)
+    with open(journal._path(chain.chain_id)) as f:
+        assert "test-journaled-key" not in f.read()
+
+    # Without a key to resume with, the provider's environment variable is used
+    assert ScriptChain.resume(chain.chain_id, journal, context_manager=context_manager).nodes["b"].llm_config.api_key is None
+    fake_nodes.blocked.clear()
+    resumed = ScriptChain.resume(chain.chain_id, journal, api_keys={"openai": "test-resumed-key"}, context_manager=context_manager)
+    assert resumed.nodes["b"].llm_config.api_key == "test-resumed-key"
+    assert (await resumed.execute()).success
+
+@pytest.mark.asyncio
+async def test_journal_ignores_truncated_last_record(fake_nodes, context_manager, tmp_path):
+    journal = ExecutionJournal(journal_dir=str(tmp_path / "journals"), retain_finished=True)
+    chain = ScriptChain(nodes=[make_node("a"), make_node("b", ["a"])], context_manager=context_manager, persist_intermediate_outputs=False, journal=journal)
+    await chain.execute()
+    path = journal._path(chain.chain_id)
+    with open(path) as f:
+        lines = f.readlines()
+    # Drop the chain_end record and cut the last node record in half
+    with open(path, "w") as f:
+        f.writelines(lines[:-2])
+        f.write(lines[-2][: len(lines[-2]) // 2])
+
+    record = journal.load(chain.chain_id)
+    assert not record.finished
+    assert set(record.completed_results) == {"a"}
+    assert [node.id for node in record.nodes] == ["a", "b"]
+    assert json.loads(lines[0])["options"]["persist_intermediate_outputs"] is False
+
+def test_missing_journal(journal):
+    with pytest.raises(JournalNotFoundError):
+        journal.load("does-not-exist")
+    with pytest.raises(ValueError):
+        journal.load("../escape")
+
+@pytest.mark.asyncio
+async def test_journal_writes_run_off_the_event_loop(fake_nodes, context_manager, tmp_path):
+    threads = set()
+    class ThreadRecordingJournal(ExecutionJournal):
+        def _append(self, chain_id, record):
+            threads.add(threading.get_ident())
+            super()._append(chain_id, record)
+    journal = ThreadRecordingJournal(journal_dir=str(tmp_path / "journals"), retain_finished=True)
+    chain = ScriptChain(nodes=[make_node("a"), make_node("b", ["a"])], context_manager=context_manager, persist_intermediate_outputs=False, journal=journal)
+    await chain.execute()
+    assert threads and threading.get_ident() not in threads
+    assert journal.load(chain.chain_id).finished
+
+def test_api_chains_are_journaled_only_on_request(fake_nodes, tmp_path, monkeypatch):
+    journal = ExecutionJournal(journal_dir=str(tmp_path / "journals"), retain_finished=True)
+    monkeypatch.setattr(routes, "context_manager", GraphContextManager(context_store_path=str(tmp_path / "context.json")))
+    monkeypatch.setattr(routes, "execution_journal", journal)
+    app = FastAPI()
+    app.include_router(routes.router)
+    payload = {"nodes": [make_node("a").model_dump(mode="json")], "persist_intermediate_outputs": False}
+    with TestClient(app) as client:
+        assert client.post("/api/v1/chains/execute", json=payload).status_code == 200
+        assert os.listdir(journal.journal_dir) == []
+        assert client.post("/api/v1/chains/execute", json={**payload, "journal": True}).status_code == 200
+    assert len(os.listdir(journal.journal_dir)) == 1
@@ -0,0 +1,103 @@
+import threading
+import pytest
+from app.chains.script_chain import ScriptChain
+from app.models.node_models import NodeConfig
+from app.utils.result_store import ResultStore
+
+def echo(config, context):
+    """Fake node output: its prompt plus its inputs"""
+    return {"text": config.prompt + "|" + ",".join(f"{k}={context[k]}" for k in sorted(context))}
+
+def make_node(node_id, dependencies=None, prompt=None):
+    return NodeConfig(id=node_id, type="ai", model="gpt-4", prompt=prompt or node_id, dependencies=dependencies or [])
+
+def pipeline(**prompts):
+    # a -> b -> d, c -> d
+    return [
+        make_node("a", prompt=prompts.get("a")),
+        make_node("b", ["a"], prompt=prompts.get("b")),
+        make_node("c", prompt=prompts.get("c")),
+        make_node("d", ["b", "c"], prompt=prompts.get("d")),
+    ]
+
+@pytest.fixture
+def calls(fake_nodes):
+    fake_nodes.respond = echo
+    return fake_nodes.calls
+
+async def run(nodes, context_manager, store):
+    chain = ScriptChain(
+        nodes=nodes,
+        context_manager=context_manager,
+        persist_intermediate_outputs=False,
+        incremental=True,
+        result_store=store
+    )
+    result = await chain.execute()
+    assert result.success
+    return chain, result
+
+@pytest.mark.asyncio
+async def test_unchanged_chain_is_fully_reused(calls, context_manager):
+    store = ResultStore()
+    _, first = await run(pipeline(), context_manager, store)
+    assert sorted(calls) == ["a", "b", "c", "d"]
+    calls.clear()
+    chain, second = await run(pipeline(), context_manager, store)
+    assert calls == []
+    assert sorted(chain.get_metrics()["reused_nodes"]) == ["a", "b", "c", "d"]
+    assert second.output["d"].output == first.output["d"].output
+
+@pytest.mark.asyncio
+async def test_only_dirty_subgraph_reruns(calls, context_manager):
+    store = ResultStore()
+    await run(pipeline(), context_manager, store)
+    calls.clear()
+    _, result = await run(pipeline(a="a2"), context_manager, store)
+    # 'c' is unaffected by the edit to 'a'
+    assert sorted(calls) == ["a", "b", "d"]
+    assert "a=a2" in result.output["b"].output["text"]
+
+@pytest.mark.asyncio
+async def test_unchanged_upstream_output_stops_propagation(calls, context_manager, monkeypatch):
+    store = ResultStore()
+    await run(pipeline(), context_manager, store)
+    calls.clear()
+    # Changing a config field the fake ignores re-runs 'a', but its output hash is the
+    # same, so its dependents are still reused
+    nodes = pipeline()
+    nodes[0].temperature = 0.1
+    await run(nodes, context_manager, store)
+    assert calls == ["a"]
+
+@pytest.mark.asyncio
+async def test_store_persists_between_processes(calls, context_manager, tmp_path):
+    path = str(tmp_path / "results.json")
+    await run(pipeline(), context_manager, ResultStore(store_path=path))
+    calls.clear()
+    await run(pipeline(d="d2"), context_manager, ResultStore(store_path=path))
+    assert calls == ["d"]
+
+@pytest.mark.asyncio
+async def test_store_is_written_off_the_event_loop_and_only_when_changed(calls, context_manager, tmp_path):
+    writes = []
+    class ThreadRecordingStore(ResultStore):
+        def _write(self, changes, entries):
+            writes.append(threading.get_ident())
+            super()._write(changes, entries)
+    store = ThreadRecordingStore(store_path=str(tmp_path / "results.json"))
+    await run(pipeline(), context_manager, store)
+    assert len(writes) == 1 and threading.get_ident() not in writes
+    # Every node is reused: nothing new to write
+    await run(pipeline(), context_manager, store)
+    assert len(writes) == 1
+    assert len(ResultStore(store_path=store.store_path).entries) == 4
+
+@pytest.mark.asyncio
+async def test_non_incremental_chain_always_executes(calls, context_manager):
+    store = ResultStore()
+    await run(pipeline(), context_manager, store)
+    calls.clear()
+    chain = ScriptChain(nodes=pipeline(), context_manager=context_manager, persist_intermediate_outputs=False, result_store=store)
+    await chain.execute()
+    assert sorted(calls) == ["a", "b", "c", "d"]
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import routes
+from app.llm_providers import anthropic_handler, openai_handler
+from app.llm_providers.anthropic_handler import AnthropicHandler
+from app.llm_providers.base_handler import BaseLLMHandler
+from app.llm_providers.openai_handler import OpenAIHandler
+from app.models.config import LLMConfig, ModelProvider
+from app.models.node_models import NodeConfig, NodeExecutionResult
+from app.nodes import ai_node as ai_node_module
+from app.nodes.ai_node import AiNode
+from app.services.llm_service import LLMService
+from app.utils.context import GraphContextManager
+
+LLM_CONFIG = LLMConfig(provider="openai", model="gpt-4", api_key="test-key")
+
+class StreamingLLMService:
+    """Fake LLM service streaming fixed deltas with an optional delay between them."""
+    def __init__(self, deltas, usage=None, error=None, delay=0.0):
+        self.deltas = deltas
+        self.usage = usage
+        self.error = error
+        self.delay = delay
+
+    async def generate(self, llm_config, prompt, context=None, tools=None):
+        return "".join(self.deltas), self.usage, self.error
+
+    async def stream(self, llm_config, prompt, context=None, tools=None):
+        for delta in self.deltas:
+            await asyncio.sleep(self.delay)
+            yield delta, None, None
+        if self.error:
+            yield "", None, self.error
+            return
+        yield "", self.usage, None
+
+def make_node(llm_service, **overrides):
+    config = NodeConfig(id="essay", type="ai", model="gpt-4", prompt="Write an essay.", llm_config=LLM_CONFIG, **overrides)
+    return AiNode(config, GraphContextManager(), LLM_CONFIG, llm_service=llm_service)
+
+async def collect(stream):
+    return [item async for item in stream]
+
+@pytest.mark.asyncio
+async def test_base_handler_falls_back_to_a_single_delta():
+    class NonStreamingHandler(BaseLLMHandler):
+        async def generate_text(self, llm_config, prompt, context, tools=None):
+            return "whole text", {"total_tokens": 3}, None
+    chunks = await collect(NonStreamingHandler().stream_text(LLM_CONFIG, "prompt", {}))
+    assert chunks == [("whole text", None, None), ("", {"total_tokens": 3}, None)]
+
+@pytest.mark.asyncio
+async def test_openai_handler_streams_deltas_and_usage(monkeypatch):
+    requests = []
+    def chunk(content=None, usage=None):
+        choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+        return SimpleNamespace(choices=choices, usage=usage)
+    async def create(**kwargs):
+        requests.append(kwargs)
+        async def chunks():
+            yield chunk("Hel")
+            yield chunk("lo")
+            yield chunk(usage=SimpleNamespace(prompt_tokens=4, completion_tokens=2, total_tokens=6))
+        return chunks()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(openai_handler, "get_client_registry", lambda: SimpleNamespace(openai=lambda api_key, base_url=None: client))
+    chunks = await collect(OpenAIHandler().stream_text(LLM_CONFIG, "prompt", {}))
+    assert chunks == [("Hel", None, None), ("lo", None, None), ("", {"prompt_tokens": 4, "completion_tokens": 2, "total_tokens": 6, "cached_prompt_tokens": 0}, None)]
+    assert requests[0]["stream"] is True and requests[0]["stream_options"] == {"include_usage": True}
+
+@pytest.mark.asyncio
+async def test_anthropic_handler_streams_deltas_and_usage(monkeypatch):
+    class FakeStream:
+        async def __aenter__(self):
+            async def text_stream():
+                yield "Bon"
+                yield "jour"
+            self.text_stream = text_stream()
+            return self
+        async def __aexit__(self, *exc_info):
+            return False
+        async def get_final_message(self):
+            return SimpleNamespace(usage=SimpleNamespace(input_tokens=5, output_tokens=2))
+    client = SimpleNamespace(messages=SimpleNamespace(stream=lambda **kwargs: FakeStream()))
+    monkeypatch.setattr(anthropic_handler, "get_client_registry", lambda: SimpleNamespace(anthropic=lambda api_key, base_url=None: client))
+    config = LLMConfig(provider="anthropic", model="claude-3-haiku-20240307", api_key="test-key")
+    chunks = await collect(AnthropicHandler().stream_text(config, "prompt", {}))
+    assert chunks[:2] == [("Bon", None, None), ("jour", None, None)]
+    assert chunks[-1] == ("", {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7, "cached_prompt_tokens": 0}, None)
+
+@pytest.mark.asyncio
+async def test_llm_service_stream_records_usage_and_latency():
+    class FakeHandler(BaseLLMHandler):
+        async def generate_text(self, llm_config, prompt, context, tools=None):
+            return "streamed", {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}, None
+    service = LLMService()
+    service.handlers[ModelProvider.OPENAI] = FakeHandler()
+    samples = service.latency_tracker.count("openai", "gpt-4")
+    chunks = await collect(service.stream(LLM_CONFIG, "prompt"))
+    assert [delta for delta, _, _ in chunks] == ["streamed", ""]
+    assert service.latency_tracker.count("openai", "gpt-4") == samples + 1
+
+@pytest.mark.asyncio
+async def test_ai_node_streams_deltas_then_result():
+    usage = {"prompt_tokens": 3, "completion_tokens": 4, "total_tokens": 7}
+    node = make_node(StreamingLLMService(['{"answer"', ': "forty', ' two"}'], usage=usage))
+    items = await collect(node.execute_stream({}))
+    assert items[:3] == ['{"answer"', ': "forty', ' two"}']
+    result = items[-1]
+    assert isinstance(result, NodeExecutionResult) and result.success
+    assert result.output == {"answer": "forty two"}
+    assert result.usage.total_tokens == 7
+
+@pytest.mark.asyncio
+async def test_ai_node_stream_reports_handler_errors():
+    node = make_node(StreamingLLMService(["partial"], error="OpenAI API Error: boom"))
+    items = await collect(node.execute_stream({}))
+    assert items[0] == "partial"
+    assert not items[-1].success
+    assert items[-1].metadata.error_type == "LLMHandlerError"
+
+@pytest.mark.asyncio
+async def test_ai_node_stream_honours_timeout():
+    node = make_node(StreamingLLMService(["a", "b", "c"], delay=0.2), timeout=0.3)
+    items = await collect(node.execute_stream({}))
+    assert items[0] == "a"
+    assert items[-1].metadata.error_type == "TimeoutError"
+
+@pytest.mark.asyncio
+async def test_agentic_nodes_yield_only_their_result():
+    node = make_node(StreamingLLMService(['{"answer": 1}']), agentic=True)
+    items = await collect(node.execute_stream({}))
+    assert len(items) == 1 and items[0].success
+
+def test_sse_endpoint_streams_node_deltas(tmp_path, monkeypatch):
+    monkeypatch.setattr(routes, "context_manager", GraphContextManager(context_store_path=str(tmp_path / "context.json")))
+    monkeypatch.setattr(ai_node_module, "get_llm_service", lambda: StreamingLLMService(["Once upon", " a time"]))
+    app = FastAPI()
+    app.include_router(routes.router)
+    payload = {"config": make_node(None).config.model_dump(mode="json"), "context": {}}
+    with TestClient(app) as client:
+        response = client.post("/api/v1/nodes/text-generation/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    assert events[:2] == [("delta", {"text": "Once upon"}), ("delta", {"text": " a time"})]
+    assert events[-1][0] == "node_result" and events[-1][1]["success"] is True
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime
+from app.chains.script_chain import ScriptChain
+from app.llm_providers.mock_handler import MockLLMHandler
+from app.models.config import LLMConfig, ModelProvider
+from app.models.node_models import InputMapping, MapConfig, NodeConfig, NodeExecutionResult, NodeMetadata, UsageMetadata
+from app.nodes.ai_node import AiNode
+from app.nodes.map_node import MapNode
+from app.services.execution_budget import ExecutionBudget
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import RateLimiter
+
+def upper_case_items(config, context):
+    """Fake sub-execution: upper-cases its item (joins a chunk), fails on 'bad'"""
+    if config.id == "parse":
+        return {"utterances": ["hi", "there", "you"], "speaker": "a"}
+    item = context["item"]
+    if item == "bad":
+        return NodeExecutionResult(
+            success=False, error="bad item",
+            metadata=NodeMetadata(node_id=config.id, node_type=config.type, start_time=datetime.utcnow())
+        )
+    text = "+".join(item) if isinstance(item, list) else item.upper()
+    usage = UsageMetadata(total_tokens=3, prompt_tokens=2, completion_tokens=1, model="gpt-4", node_id=config.id, provider="openai")
+    return NodeExecutionResult(
+        success=True, output={"text": text}, usage=usage,
+        metadata=NodeMetadata(node_id=config.id, node_type=config.type, start_time=datetime.utcnow())
+    )
+
+@pytest.fixture
+def stats(fake_nodes):
+    fake_nodes.real_types.add("map")
+    fake_nodes.default_latency = 0.01
+    fake_nodes.respond = upper_case_items
+    return fake_nodes
+
+def map_node(**map_options):
+    return NodeConfig(id="m", type="map", model="gpt-4", prompt="analyse", map_config=MapConfig(items_path="items", **map_options))
+
+@pytest.mark.asyncio
+async def test_map_gathers_results_in_input_order(stats, context_manager):
+    node = MapNode(map_node(max_concurrency=2), context_manager)
+    result = await node.execute({"items": ["a", "b", "c", "d", "e"], "topic": "x"})
+    assert result.success
+    assert [o["text"] for o in result.output["results"]] == ["A", "B", "C", "D", "E"]
+    assert result.output["count"] == 5
+    assert stats.peak == 2
+    # Each sub-execution gets the rest of the context plus its own item, not the whole list
+    assert all(set(c) == {"topic", "item"} for c in stats.contexts.values())
+    assert result.usage.total_tokens == 15 and result.usage.api_calls == 5
+    assert result.usage.node_id == "m"
+
+@pytest.mark.asyncio
+async def test_map_chunks_items(stats, context_manager):
+    node = MapNode(map_node(chunk_size=2), context_manager)
+    result = await node.execute({"items": ["a", "b", "c"]})
+    assert [o["text"] for o in result.output["results"]] == ["a+b", "c"]
+
+@pytest.mark.asyncio
+async def test_map_fails_on_item_failure_unless_partial(stats, context_manager):
+    strict = await MapNode(map_node(), context_manager).execute({"items": ["a", "bad"]})
+    assert not strict.success
+    assert strict.metadata.error_type == "MapItemError"
+    assert "[1] bad item" in strict.error
+    partial = await MapNode(map_node(allow_partial=True), context_manager).execute({"items": ["a", "bad"]})
+    assert partial.success
+    assert partial.output["results"] == [{"text": "A"}, None]
+    assert partial.output["errors"] == ["[1] bad item"]
+
+@pytest.mark.asyncio
+async def test_map_rejects_non_list(stats, context_manager):
+    result = await MapNode(map_node(), context_manager).execute({"items": "abc"})
+    assert not result.success
+    assert result.metadata.error_type == "ValidationError"
+    missing = await MapNode(map_node(), context_manager).execute({})
+    assert not missing.success
+
+def test_map_node_requires_map_config():
+    with pytest.raises(ValueError):
+        NodeConfig(id="m", type="map", model="gpt-4", prompt="p")
+
+@pytest.mark.asyncio
+async def test_chain_maps_over_upstream_list_within_max_parallel(stats, context_manager):
+    nodes = [
+        NodeConfig(id="parse", type="ai", model="gpt-4", prompt="parse"),
+        NodeConfig(
+            id="per_utterance",
+            type="map",
+            model="gpt-4",
+            prompt="analyse",
+            dependencies=["parse"],
+            input_mappings={"utterances": InputMapping(source_node_id="parse", source_output_key="utterances")},
+            map_config=MapConfig(items_path="utterances")
+        ),
+    ]
+    chain = ScriptChain(nodes=nodes, context_manager=context_manager, persist_intermediate_outputs=False, max_parallel=2)
+    result = await chain.execute()
+    assert result.success
+    assert [o["text"] for o in result.output["per_utterance"].output["results"]] == ["HI", "THERE", "YOU"]
+    assert stats.peak == 2
+    assert chain.metrics["total_tokens"] == 9
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit", [1, 2])
+async def test_sub_executions_hold_execution_budget_slots(stats, context_manager, limit):
+    budget = ExecutionBudget(limit=limit)
+    chain = ScriptChain(nodes=[map_node(max_concurrency=5)], context_manager=context_manager, persist_intermediate_outputs=False, execution_budget=budget)
+    result = await asyncio.wait_for(chain.execute(inputs={"items": ["a", "b", "c", "d", "e", "f"]}), 5)
+    assert result.success
+    assert len(result.output["m"].output["results"]) == 6
+    # Items are capped by the budget, not just max_concurrency; the map node's own slot is handed back
+    assert stats.peak == limit
+    assert budget.in_use == 0
+
+@pytest.mark.asyncio
+async def test_ai_sub_executions_prompt_with_their_own_item(context_manager):
+    prompts = []
+    def respond(prompt):
+        prompts.append(prompt)
+        return json.dumps({"text": prompt.splitlines()[-1]})
+    # Default service setup: identical deterministic calls in flight are coalesced by prompt
+    service = LLMService(rate_limiter=RateLimiter())
+    service.handlers[ModelProvider.CUSTOM] = MockLLMHandler(default_response=respond)
+    llm_config = LLMConfig(provider="custom", model="mock", temperature=0)
+    config = NodeConfig(
+        id="m", type="map", model="mock", prompt="Classify the utterance.", llm_config=llm_config,
+        input_mappings={"items": InputMapping(source_node_id="parse", source_output_key="utterances")},
+        map_config=MapConfig(items_path="items")
+    )
+    node = MapNode(config, context_manager, llm_config, llm_service=service)
+    result = await node.execute({"items": ["hi", "there", "you"], "speaker": "a"})
+    assert result.success
+    assert [o["text"] for o in result.output["results"]] == ["item: hi", "item: there", "item: you"]
+    assert len(prompts) == len(set(prompts)) == 3
+    assert all(prompt.startswith("Classify the utterance.") and "speaker" not in prompt for prompt in prompts)
+
+@pytest.mark.asyncio
+async def test_ai_nodes_outside_a_map_keep_instructions_only_prompts(context_manager):
+    prompts = []
+    def respond(prompt):
+        prompts.append(prompt)
+        return json.dumps({"text": "ok"})
+    service = LLMService(rate_limiter=RateLimiter())
+    service.handlers[ModelProvider.CUSTOM] = MockLLMHandler(default_response=respond)
+    llm_config = LLMConfig(provider="custom", model="mock", temperature=0)
+    config = NodeConfig(
+        id="a", type="ai", model="mock", prompt="Classify the utterance.", llm_config=llm_config,
+        input_selection=["speaker"]
+    )
+    node = AiNode(config, context_manager, llm_config, llm_service=service)
+    assert (await node.execute({"speaker": "a"})).success
+    assert prompts == ["Classify the utterance."]
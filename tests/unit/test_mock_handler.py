@@ -0,0 +1,125 @@
+import random
+import statistics
+import time
+import pytest
+from app.llm_providers.base_handler import BaseLLMHandler
+from app.llm_providers.errors import RATE_LIMIT, ProviderError
+from app.llm_providers.mock_handler import Cassette, CassetteEntry, LatencyProfile, MockLLMHandler
+from app.models.config import LLMConfig, ModelProvider
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import RateLimiter
+from app.services.response_cache import ResponseCache, ResponseCachePolicy
+from app.services.retry import CircuitBreakers, RetryPolicy
+
+LLM_CONFIG = LLMConfig(provider="custom", model="recorded-gpt-4", temperature=0.7)
+USAGE = {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+
+class LiveHandler(BaseLLMHandler):
+    """Stands in for a real provider handler while recording."""
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_text(self, llm_config, prompt, context, tools=None):
+        self.calls += 1
+        return f"live answer to {prompt}", USAGE, None
+
+def make_service(handler):
+    service = LLMService(
+        rate_limiter=RateLimiter(),
+        response_cache=ResponseCache(ResponseCachePolicy(enabled=False)),
+        retry_policy=RetryPolicy(max_retries=5, base_delay=0.001, max_delay=0.01),
+        circuit_breakers=CircuitBreakers()
+    )
+    service.handlers[ModelProvider.CUSTOM] = handler
+    return service
+
+@pytest.mark.asyncio
+async def test_record_then_replay_from_a_cassette_file(tmp_path):
+    path = str(tmp_path / "cassettes" / "chain.json")
+    live = LiveHandler()
+    recorder = MockLLMHandler(cassette=Cassette(path), record_from=live)
+    assert await recorder.generate_text(LLM_CONFIG, "question", {}) == ("live answer to question", USAGE, None)
+    recorder.cassette.save()
+
+    replayer = MockLLMHandler(cassette=Cassette(path), default_response=None)
+    assert await replayer.generate_text(LLM_CONFIG, "question", {}) == ("live answer to question", USAGE, None)
+    assert live.calls == 1
+    assert replayer.stats()["replayed"] == 1
+    # Strict replay refuses prompts that were never recorded
+    text, usage, error = await replayer.generate_text(LLM_CONFIG, "other question", {})
+    assert text == "" and "no recorded response" in error
+
+@pytest.mark.asyncio
+async def test_unrecorded_prompts_get_the_default_response_with_estimated_usage():
+    handler = MockLLMHandler(default_response=lambda prompt: f'{{"text": "{prompt.upper()}"}}')
+    text, usage, error = await handler.generate_text(LLM_CONFIG, "hello there", {})
+    assert text == '{"text": "HELLO THERE"}' and error is None
+    assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"] > 0
+
+def test_latency_profiles():
+    rng = random.Random(7)
+    assert LatencyProfile(mean=0.3).sample(rng) == 0.3
+    assert LatencyProfile.parse("0.3") == LatencyProfile(mean=0.3)
+    profile = LatencyProfile.parse("lognormal:0.8:0.4")
+    samples = [profile.sample(rng) for _ in range(20000)]
+    assert statistics.mean(samples) == pytest.approx(0.8, rel=0.03)
+    assert statistics.stdev(samples) == pytest.approx(0.4, rel=0.08)
+    # Long right tail: p99 well above mean + 2 stddev of a normal
+    assert sorted(samples)[int(0.99 * len(samples))] > 1.6
+    uniform = [LatencyProfile.parse("uniform:1:0.5").sample(rng) for _ in range(1000)]
+    assert 0.5 <= min(uniform) and max(uniform) <= 1.5
+
+@pytest.mark.asyncio
+async def test_replayed_latency_is_recorded_latency():
+    cassette = Cassette()
+    cassette.put(CassetteEntry(model=LLM_CONFIG.model, prompt="p", text="t", latency=0.05))
+    handler = MockLLMHandler(cassette=cassette)
+    start = time.perf_counter()
+    await handler.generate_text(LLM_CONFIG, "p", {})
+    assert time.perf_counter() - start >= 0.05
+
+@pytest.mark.asyncio
+async def test_simulated_errors_are_seeded_and_retried():
+    failing = MockLLMHandler(error_rate=1.0, error_kind=RATE_LIMIT)
+    with pytest.raises(ProviderError) as excinfo:
+        await failing.generate_text(LLM_CONFIG, "p", {})
+    assert excinfo.value.kind == RATE_LIMIT and excinfo.value.status_code == 429 and excinfo.value.retryable
+
+    outcomes = []
+    for _ in range(2):
+        handler = MockLLMHandler(error_rate=0.5, seed=42)
+        service = make_service(handler)
+        results = [await service.generate(LLM_CONFIG, f"p{i}") for i in range(20)]
+        assert all(error is None for _, _, error in results)
+        outcomes.append(handler.stats())
+    assert outcomes[0] == outcomes[1] and outcomes[0]["failures"] > 0
+
+@pytest.mark.asyncio
+async def test_stream_replays_word_chunks():
+    cassette = Cassette()
+    cassette.put(CassetteEntry(model=LLM_CONFIG.model, prompt="p", text="one two  three", usage=USAGE))
+    handler = MockLLMHandler(cassette=cassette, latency=LatencyProfile(mean=0.01))
+    chunks = [chunk async for chunk in handler.stream_text(LLM_CONFIG, "p", {})]
+    assert [delta for delta, _, _ in chunks[:-1]] == ["one ", "two  ", "three"]
+    assert chunks[-1] == ("", USAGE, None)
+
+@pytest.mark.asyncio
+async def test_llm_service_serves_the_custom_provider_from_the_environment(tmp_path, monkeypatch):
+    path = str(tmp_path / "cassette.json")
+    cassette = Cassette(path)
+    cassette.put(CassetteEntry(model=LLM_CONFIG.model, prompt="p", text="replayed", usage=USAGE))
+    cassette.save()
+    monkeypatch.setenv("LLM_MOCK_CASSETTE", path)
+    service = LLMService(rate_limiter=RateLimiter(), response_cache=ResponseCache(ResponseCachePolicy(enabled=False)))
+    assert await service.generate(LLM_CONFIG, "p") == ("replayed", USAGE, None)
+    assert (await service.generate(LLM_CONFIG, "unknown"))[2] is not None
+
+@pytest.mark.asyncio
+async def test_custom_provider_is_strict_unless_default_responses_are_enabled(monkeypatch):
+    monkeypatch.delenv("LLM_MOCK_CASSETTE", raising=False)
+    monkeypatch.delenv("LLM_MOCK_STRICT", raising=False)
+    text, _, error = await LLMService(rate_limiter=RateLimiter()).generate(LLM_CONFIG, "p")
+    assert text == "" and "no recorded response" in error
+    monkeypatch.setenv("LLM_MOCK_STRICT", "false")
+    text, _, error = await LLMService(rate_limiter=RateLimiter()).generate(LLM_CONFIG, "p")
+    assert error is None and text == '{"text": "mock response"}'
@@ -0,0 +1,85 @@
+import gc
+import weakref
+import pytest
+from app.chains.script_chain import ScriptChain
+from app.models.config import LLMConfig
+from app.models.node_models import NodeConfig
+from app.nodes.ai_node import AiNode
+from app.nodes.pool import NodePool, node_config_hash
+from app.services import hedging
+from app.services.hedging import HedgingPolicy
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.tool_service import get_tool_service
+from app.utils.context import GraphContextManager
+
+def make_node(node_id, dependencies=None, prompt="p"):
+    return NodeConfig(id=node_id, type="ai", model="gpt-4", prompt=prompt, dependencies=dependencies or [])
+
+def test_config_hash_ignores_level_and_timestamps():
+    first, second = make_node("a"), make_node("a")
+    second.level = 3
+    assert node_config_hash(first) == node_config_hash(second)
+    assert node_config_hash(first) != node_config_hash(make_node("a", prompt="other"))
+    assert node_config_hash(first) != node_config_hash(first, LLMConfig(provider="openai", model="gpt-4", temperature=0))
+
+def test_pool_reuses_instances_per_config_and_binds_the_caller(fake_nodes, context_manager, tmp_path):
+    pool = NodePool(maxsize=2)
+    factory = fake_nodes.factory
+    node = pool.acquire(factory, make_node("a"), context_manager)
+    other_manager = GraphContextManager(context_store_path=str(tmp_path / "other.json"))
+    callbacks = [object()]
+    other = pool.acquire(factory, make_node("a"), other_manager, callbacks=callbacks)
+    # One build per configuration, each caller gets its own context manager and callbacks
+    assert fake_nodes.created == ["a"]
+    assert (node.context_manager, other.context_manager) == (context_manager, other_manager)
+    assert other.callbacks == callbacks and node.callbacks == []
+    pool.acquire(factory, make_node("b"), context_manager)
+    pool.acquire(factory, make_node("c"), context_manager)
+    # Least recently used entry ("a") was evicted
+    assert pool.stats() == {"size": 2, "maxsize": 2, "hits": 1, "misses": 3}
+    pool.acquire(factory, make_node("a"), context_manager)
+    assert fake_nodes.created == ["a", "b", "c", "a"]
+
+def test_pool_does_not_keep_chain_context_alive(fake_nodes, tmp_path):
+    pool = NodePool()
+    manager = GraphContextManager(context_store_path=str(tmp_path / "context.json"))
+    pool.acquire(fake_nodes.factory, make_node("a"), manager)
+    pool.acquire(fake_nodes.factory, make_node("a"), manager)
+    released = weakref.ref(manager)
+    del manager
+    gc.collect()
+    assert released() is None
+
+@pytest.mark.asyncio
+async def test_chain_executions_share_pooled_nodes(fake_nodes, context_manager):
+    pool = NodePool()
+    nodes = [make_node("a"), make_node("b", ["a"])]
+    for _ in range(3):
+        chain = ScriptChain(nodes=nodes, context_manager=context_manager, persist_intermediate_outputs=False, node_pool=pool)
+        assert (await chain.execute()).success
+    assert fake_nodes.created == ["a", "b"]
+    assert pool.stats()["hits"] == 4
+
+@pytest.mark.asyncio
+async def test_chains_with_their_own_context_managers_share_pooled_nodes(fake_nodes, tmp_path):
+    pool = NodePool()
+    nodes = [make_node("a"), make_node("b", ["a"])]
+    for i in range(3):
+        manager = GraphContextManager(context_store_path=str(tmp_path / f"context{i}.json"))
+        chain = ScriptChain(nodes=nodes, context_manager=manager, persist_intermediate_outputs=False, node_pool=pool)
+        assert (await chain.execute()).success
+    assert fake_nodes.created == ["a", "b"]
+    assert pool.stats()["hits"] == 4
+
+def test_ai_nodes_share_service_singletons(context_manager):
+    config = make_node("a")
+    first = AiNode(config, context_manager, LLMConfig(provider="openai", model="gpt-4"))
+    second = AiNode(config, context_manager, LLMConfig(provider="openai", model="gpt-4"))
+    assert first.llm_service is second.llm_service is get_llm_service()
+    assert first.tool_service is second.tool_service is get_tool_service()
+
+def test_shared_llm_service_follows_reconfigured_hedging(monkeypatch):
+    service = LLMService()
+    policy = HedgingPolicy(enabled=True, percentile=0.9)
+    monkeypatch.setattr(hedging, "_hedging_policy", policy)
+    assert service.hedging is policy
@@ -0,0 +1,82 @@
+import pytest
+from app.chains.script_chain import ScriptChain
+from app.models.node_models import NodeConfig
+from app.utils.execution_journal import ExecutionJournal
+
+def make_node(node_id, dependencies=None):
+    return NodeConfig(id=node_id, type="ai", model="gpt-4", prompt=node_id, dependencies=dependencies or [])
+
+def diamond():
+    # a -> b -> d, a -> c -> d
+    return [make_node("a"), make_node("b", ["a"]), make_node("c", ["a"]), make_node("d", ["b", "c"])]
+
+@pytest.fixture
+def seen(fake_nodes):
+    """The context each node was given; nodes output their upper-cased ID"""
+    fake_nodes.respond = lambda config, context: {"text": config.id.upper()}
+    return fake_nodes.contexts
+
+@pytest.mark.asyncio
+async def test_outputs_released_after_last_consumer(seen, context_manager):
+    chain = ScriptChain(
+        nodes=diamond(),
+        context_manager=context_manager,
+        persist_intermediate_outputs=False,
+        max_parallel=1,
+        release_intermediate_outputs=True
+    )
+    result = await chain.execute()
+    assert result.success
+    # Every dependent still saw its inputs before they were released
+    assert seen["b"] == {"a": "A"} and seen["c"] == {"a": "A"}
+    assert seen["d"] == {"b": "B", "c": "C"}
+    assert result.output["d"].output == {"text": "D"}
+    for node_id in ("a", "b", "c"):
+        assert result.output[node_id].success
+        assert result.output[node_id].output is None
+    assert sorted(chain.metrics["released_nodes"]) == ["a", "b", "c"]
+
+@pytest.mark.asyncio
+async def test_outputs_kept_by_default(seen, context_manager):
+    chain = ScriptChain(nodes=diamond(), context_manager=context_manager, persist_intermediate_outputs=False)
+    result = await chain.execute()
+    assert all(result.output[node_id].output is not None for node_id in "abcd")
+    assert chain.metrics["released_nodes"] == []
+
+@pytest.mark.asyncio
+async def test_targets_keep_their_outputs(seen, context_manager):
+    chain = ScriptChain(
+        nodes=diamond(),
+        context_manager=context_manager,
+        persist_intermediate_outputs=False,
+        release_intermediate_outputs=True
+    )
+    result = await chain.execute(targets=["a", "b"])
+    assert result.output["a"].output == {"text": "A"}
+    assert result.output["b"].output == {"text": "B"}
+    assert set(result.skipped_nodes) == {"c", "d"}
+
+@pytest.mark.asyncio
+async def test_persisted_outputs_spill_to_context_store(seen, context_manager):
+    chain = ScriptChain(
+        nodes=diamond(),
+        context_manager=context_manager,
+        persist_intermediate_outputs=True,
+        release_intermediate_outputs=True
+    )
+    await chain.execute()
+    assert "a" not in context_manager.context_cache
+    assert "d" in context_manager.context_cache
+    # Evicted outputs are read back from the store on demand
+    assert context_manager.get_node_output("a") == {"text": "A"}
+
+@pytest.mark.asyncio
+async def test_resumed_outputs_released_when_unneeded(seen, context_manager, tmp_path):
+    journal = ExecutionJournal(journal_dir=str(tmp_path / "journals"), retain_finished=True)
+    first = ScriptChain(nodes=diamond(), context_manager=context_manager, persist_intermediate_outputs=False, journal=journal)
+    await first.execute()
+    resumed = ScriptChain.resume(first.chain_id, journal, context_manager=context_manager, release_intermediate_outputs=True)
+    result = await resumed.execute()
+    assert result.success
+    assert result.output["a"].output is None
+    assert result.output["d"].output == {"text": "D"}
@@ -0,0 +1,111 @@
+import asyncio
+import copy
+import pickle
+import pytest
+from types import SimpleNamespace
+from app.llm_providers import anthropic_handler
+from app.llm_providers.anthropic_handler import AnthropicHandler
+from app.llm_providers.openai_handler import openai_usage_stats
+from app.models.config import LLMConfig
+from app.models.node_models import NodeConfig, NodeExecutionResult
+from app.nodes.ai_node import AiNode
+from app.nodes.prompt_builder import prepare_prompt
+from app.utils.context import GraphContextManager
+from app.utils.prompt_segments import SegmentedPrompt, prompt_segments
+
+LLM_CONFIG = LLMConfig(provider="anthropic", model="claude-3-haiku-20240307", api_key="test-key")
+
+TOOL = {
+    "name": "search",
+    "description": "Search the web",
+    "parameters_schema": {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]},
+}
+
+class FakeToolService:
+    def list_tools_with_schemas(self):
+        return [TOOL]
+
+class StreamingLLMService:
+    """Fake LLM service recording the prompt it was given."""
+    def __init__(self, usage):
+        self.usage = usage
+        self.prompts = []
+
+    async def stream(self, llm_config, prompt, context=None, tools=None):
+        self.prompts.append(prompt)
+        yield '{"answer": "ok"}', None, None
+        yield "", self.usage, None
+
+def test_segmented_prompt_is_a_string():
+    prompt = SegmentedPrompt("preamble\n", "question")
+    assert prompt == "preamble\nquestion"
+    assert prompt_segments(prompt) == ("preamble\n", "question")
+    assert prompt_segments(copy.copy(prompt)) == ("preamble\n", "question")
+    assert prompt_segments(pickle.loads(pickle.dumps(prompt))) == ("preamble\n", "question")
+    # String operations drop the split rather than keeping a stale one
+    assert prompt_segments(prompt.strip()) == ("", "preamble\nquestion")
+    assert prompt_segments("plain") == ("", "plain")
+
+def test_node_prompt_puts_tool_preamble_in_the_stable_prefix():
+    config = NodeConfig(id="n", type="ai", model="gpt-4", prompt="  Find the answer.  ", llm_config=LLM_CONFIG)
+    node = AiNode(config, GraphContextManager(), LLM_CONFIG, llm_service=object(), tool_service=FakeToolService())
+    prompt = asyncio.run(node.prepare_prompt({}))
+    prefix, suffix = prompt_segments(prompt)
+    assert prefix.startswith("SYSTEM: You have access to the following tools:") and "- search: Search the web" in prefix
+    assert suffix == "Find the answer."
+    assert prompt == (prefix + suffix)
+
+    class NoTools:
+        def list_tools_with_schemas(self):
+            return []
+    node = AiNode(config, GraphContextManager(), LLM_CONFIG, llm_service=object(), tool_service=NoTools())
+    assert prompt_segments(asyncio.run(node.prepare_prompt({}))) == ("", "Find the answer.")
+
+@pytest.mark.asyncio
+async def test_anthropic_marks_the_prefix_for_caching_and_counts_cached_tokens(monkeypatch):
+    requests = []
+    async def create(**kwargs):
+        requests.append(kwargs)
+        return SimpleNamespace(
+            content=[SimpleNamespace(text="answer", function_call=None)],
+            stop_reason="end_turn",
+            usage=SimpleNamespace(input_tokens=10, output_tokens=5, cache_read_input_tokens=1200, cache_creation_input_tokens=0)
+        )
+    client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    monkeypatch.setattr(anthropic_handler, "get_client_registry", lambda: SimpleNamespace(anthropic=lambda api_key, base_url=None: client))
+
+    text, usage, error = await AnthropicHandler().generate_text(LLM_CONFIG, SegmentedPrompt("tools...\n", "question"), {})
+    assert (text, error) == ("answer", None)
+    assert requests[0]["messages"][0]["content"] == [
+        {"type": "text", "text": "tools...\n", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": "question"},
+    ]
+    assert usage == {"prompt_tokens": 1210, "completion_tokens": 5, "total_tokens": 1215, "cached_prompt_tokens": 1200}
+
+    await AnthropicHandler().generate_text(LLM_CONFIG, "plain prompt", {})
+    assert requests[1]["messages"][0]["content"] == "plain prompt"
+
+def test_truncated_prompts_are_sent_without_cache_marks():
+    config = NodeConfig(id="n", type="ai", model="gpt-4", prompt="Find the answer. " * 50, llm_config=LLM_CONFIG)
+    truncated_config = LLM_CONFIG.model_copy(update={"max_context_tokens": 20})
+    prompt = prepare_prompt(config, GraphContextManager(), truncated_config, FakeToolService(), {})
+    assert type(prompt) is str and len(prompt) == 80
+    assert anthropic_handler._user_content(prompt) == prompt
+
+def test_openai_style_usage_reports_cached_tokens():
+    usage = SimpleNamespace(prompt_tokens=2000, completion_tokens=10, total_tokens=2010, prompt_tokens_details=SimpleNamespace(cached_tokens=1792))
+    assert openai_usage_stats(usage)["cached_prompt_tokens"] == 1792
+    deepseek_usage = SimpleNamespace(prompt_tokens=2000, completion_tokens=10, total_tokens=2010, prompt_cache_hit_tokens=1536)
+    assert openai_usage_stats(deepseek_usage)["cached_prompt_tokens"] == 1536
+    assert openai_usage_stats(SimpleNamespace(prompt_tokens=1, completion_tokens=1, total_tokens=2))["cached_prompt_tokens"] == 0
+
+@pytest.mark.asyncio
+async def test_cached_tokens_reach_node_usage():
+    service = StreamingLLMService({"prompt_tokens": 1210, "completion_tokens": 5, "total_tokens": 1215, "cached_prompt_tokens": 1200})
+    config = NodeConfig(id="n", type="ai", model="gpt-4", prompt="Answer.", llm_config=LLM_CONFIG)
+    node = AiNode(config, GraphContextManager(), LLM_CONFIG, llm_service=service, tool_service=FakeToolService())
+    items = [item async for item in node.execute_stream({})]
+    result = items[-1]
+    assert isinstance(result, NodeExecutionResult) and result.success
+    assert result.usage.cached_prompt_tokens == 1200
+    assert isinstance(service.prompts[0], SegmentedPrompt)
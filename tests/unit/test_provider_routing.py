@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+from pydantic import ValidationError
+from app.llm_providers.base_handler import BaseLLMHandler
+from app.llm_providers.errors import SERVER_ERROR, ProviderError
+from app.models.config import LLMConfig, ModelProvider
+from app.services import provider_routing
+from app.services.llm_service import LLMService
+from app.services.provider_routing import ProviderHealth, ProviderRouter, RoutingGroup, configure_provider_routing
+from app.services.rate_limiter import RateLimiter
+from app.services.response_cache import ResponseCache, ResponseCachePolicy
+from app.services.retry import CircuitBreakerPolicy, CircuitBreakers, RetryPolicy
+
+LLM_CONFIG = LLMConfig(provider="openai", model="gpt-4", temperature=0.7, routing_group="chat")
+
+class FakeHandler(BaseLLMHandler):
+    """Fake handler answering with its name after `delay`, or raising `fail` errors first."""
+    def __init__(self, name, delay=0.0, fail=0):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    async def generate_text(self, llm_config, prompt, context, tools=None):
+        self.calls.append(llm_config)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            self.fail -= 1
+            raise ProviderError(f"{self.name} API Error: overloaded", kind=SERVER_ERROR, status_code=503)
+        return self.name, {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}, None
+
+def make_router(members=("openai/gpt-4", "anthropic/claude-3-opus-20240229"), **health):
+    return ProviderRouter({"chat": RoutingGroup(name="chat", members=list(members))}, ProviderHealth(**health))
+
+def make_service(handlers, router=None, breaker_policy=None):
+    service = LLMService(
+        rate_limiter=RateLimiter(),
+        response_cache=ResponseCache(ResponseCachePolicy(enabled=False)),
+        retry_policy=RetryPolicy(base_delay=0.001, max_delay=0.01),
+        circuit_breakers=CircuitBreakers(breaker_policy),
+        router=router or make_router()
+    )
+    service.handlers.update(handlers)
+    return service
+
+def test_members_accept_provider_model_shorthand():
+    group = RoutingGroup(name="chat", members=["openai/gpt-4", {"provider": "google", "model": "gemini-pro"}])
+    assert [member.key for member in group.members] == ["openai/gpt-4", "google/gemini-pro"]
+    with pytest.raises(ValidationError):
+        RoutingGroup(name="chat", members=["gpt-4"])
+
+def test_members_without_samples_keep_group_order():
+    router = make_router()
+    assert [member.provider for member in router.rank("chat")] == ["openai", "anthropic"]
+    with pytest.raises(KeyError):
+        router.rank("missing")
+
+def test_ranking_prefers_low_latency_and_low_error_rate():
+    router = make_router()
+    router.health.record("openai", "gpt-4", 2.0, success=True)
+    router.health.record("anthropic", "claude-3-opus-20240229", 1.0, success=True)
+    assert router.rank("chat")[0].provider == "anthropic"
+    for _ in range(5):
+        router.health.record("anthropic", "claude-3-opus-20240229", 0.1, success=False)
+    assert router.rank("chat")[0].provider == "openai"
+
+def test_open_circuits_rank_last():
+    router = make_router()
+    assert router.rank("chat", is_open=lambda provider: provider == "openai")[0].provider == "anthropic"
+
+def test_error_rate_decays_without_traffic():
+    health = ProviderHealth(error_half_life=0.05)
+    health.record("openai", "gpt-4", 0.1, success=False)
+    assert health.error_rate("openai", "gpt-4") == pytest.approx(0.2, abs=0.02)
+    health._stats[("openai", "gpt-4")].updated_at -= 0.5
+    assert health.error_rate("openai", "gpt-4") < 0.001
+
+def test_groups_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setattr(provider_routing, "_provider_router", None)
+    monkeypatch.setenv("LLM_ROUTING_GROUPS", '{"chat": ["openai/gpt-4", "deepseek/deepseek-chat"]}')
+    router = configure_provider_routing()
+    assert [member.key for member in router.groups["chat"].members] == ["openai/gpt-4", "deepseek/deepseek-chat"]
+
+@pytest.mark.asyncio
+async def test_failing_member_fails_over_without_retrying():
+    openai_handler = FakeHandler("openai", fail=1)
+    anthropic_handler = FakeHandler("anthropic")
+    service = make_service({ModelProvider.OPENAI: openai_handler, ModelProvider.ANTHROPIC: anthropic_handler})
+    text, usage, error = await service.generate(LLM_CONFIG, "prompt")
+    assert (text, error) == ("anthropic", None)
+    assert len(openai_handler.calls) == 1
+    member_config = anthropic_handler.calls[0]
+    assert (member_config.provider, member_config.model, member_config.routing_group) == ("anthropic", "claude-3-opus-20240229", None)
+    assert service.router.health.error_rate("openai", "gpt-4") > 0
+    # The failure demotes openai for the next call
+    assert service.router.rank("chat")[0].provider == "anthropic"
+
+@pytest.mark.asyncio
+async def test_last_member_retries_and_errors_are_combined():
+    openai_handler = FakeHandler("openai", fail=10)
+    anthropic_handler = FakeHandler("anthropic", fail=10)
+    service = make_service({ModelProvider.OPENAI: openai_handler, ModelProvider.ANTHROPIC: anthropic_handler})
+    text, usage, error = await service.generate(LLM_CONFIG, "prompt")
+    assert text == "" and "All members of routing group 'chat' failed" in error
+    assert "openai/gpt-4" in error and "anthropic/claude-3-opus-20240229" in error
+    assert len(openai_handler.calls) == 1
+    assert len(anthropic_handler.calls) == 1 + service.retry_policy.max_retries
+
+@pytest.mark.asyncio
+async def test_open_circuit_member_is_skipped():
+    openai_handler = FakeHandler("openai", fail=1)
+    anthropic_handler = FakeHandler("anthropic")
+    service = make_service(
+        {ModelProvider.OPENAI: openai_handler, ModelProvider.ANTHROPIC: anthropic_handler},
+        breaker_policy=CircuitBreakerPolicy(failure_threshold=1, reset_timeout=60)
+    )
+    await service.generate(LLM_CONFIG, "prompt")
+    service.router.health = ProviderHealth()  # forget the error rate; only the circuit demotes openai
+    assert (await service.generate(LLM_CONFIG, "prompt"))[0] == "anthropic"
+    assert len(openai_handler.calls) == 1
+
+@pytest.mark.asyncio
+async def test_unknown_group_is_an_error():
+    service = make_service({})
+    config = LLM_CONFIG.model_copy(update={"routing_group": "missing"})
+    assert await service.generate(config, "prompt") == ("", None, "Unknown routing group: missing")
+
+@pytest.mark.asyncio
+async def test_routed_stream_fails_over_before_first_delta():
+    openai_handler = FakeHandler("openai", fail=1)
+    anthropic_handler = FakeHandler("anthropic")
+    service = make_service({ModelProvider.OPENAI: openai_handler, ModelProvider.ANTHROPIC: anthropic_handler})
+    chunks = [chunk async for chunk in service.stream(LLM_CONFIG, "prompt")]
+    assert "".join(delta for delta, _, _ in chunks) == "anthropic"
+    assert all(error is None for _, _, error in chunks)
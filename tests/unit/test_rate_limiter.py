@@ -0,0 +1,70 @@
+import asyncio
+import time
+import pytest
+from app.models.config import LLMConfig, ModelProvider
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import RateLimit, RateLimiter, TokenBucket, configure_rate_limits
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(per_minute=60)  # one token per second
+    assert bucket.wait_time(60) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+    # Requests larger than the bucket only ever need a full bucket
+    assert bucket.wait_time(1000) <= 60.0
+
+@pytest.mark.asyncio
+async def test_requests_per_minute_limit_delays_callers():
+    limiter = RateLimiter({("openai", None): RateLimit(requests_per_minute=600)})  # 10 per second
+    limiter._states[("openai", None)].request_bucket.tokens = 2
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire("openai", "gpt-4", 10) for _ in range(3)))
+    assert time.monotonic() - start >= 0.08
+    metrics = limiter.get_metrics()["openai"]
+    assert metrics["requests"] == 3
+    assert metrics["delayed_requests"] >= 1
+    assert metrics["max_wait_seconds"] > 0
+
+@pytest.mark.asyncio
+async def test_model_limit_applies_alongside_provider_limit():
+    limiter = RateLimiter({
+        ("openai", None): RateLimit(requests_per_minute=1000),
+        ("openai", "gpt-4"): RateLimit(tokens_per_minute=6000),
+    })
+    await limiter.acquire(ModelProvider.OPENAI, "gpt-4", 500)
+    assert limiter.get_metrics()["openai/gpt-4"]["available_tokens"] == pytest.approx(5500, abs=5)
+    # Unrelated models only see the provider-wide limit
+    await limiter.acquire("openai", "gpt-3.5-turbo", 10_000)
+    assert limiter.get_metrics()["openai/gpt-4"]["requests"] == 1
+
+def test_record_usage_reconciles_estimate():
+    limiter = RateLimiter({("anthropic", None): RateLimit(tokens_per_minute=1000)})
+    bucket = limiter._states[("anthropic", None)].token_bucket
+    bucket.consume(100)
+    limiter.record_usage("anthropic", "claude-2", estimated_tokens=100, actual_tokens=300)
+    assert bucket.tokens == pytest.approx(700, abs=1)
+
+def test_configure_rate_limits_parses_provider_and_model_keys():
+    limiter = configure_rate_limits({"openai": {"requests_per_minute": 5}, "openai/gpt-4": {"tokens_per_minute": 100}})
+    assert set(limiter.get_metrics()) == {"openai", "openai/gpt-4"}
+    configure_rate_limits({})
+
+class RecordingHandler:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_text(self, llm_config, prompt, context, tools=None):
+        self.calls += 1
+        return "ok", {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}, None
+
+@pytest.mark.asyncio
+async def test_llm_service_admits_calls_through_limiter():
+    limiter = RateLimiter({("openai", None): RateLimit(requests_per_minute=100)})
+    service = LLMService(rate_limiter=limiter)
+    handler = RecordingHandler()
+    service.handlers[ModelProvider.OPENAI] = handler
+    llm_config = LLMConfig(provider="openai", model="gpt-4", api_key="test-key")
+    text, usage, error = await service.generate(llm_config, "hello world")
+    assert text == "ok" and error is None
+    assert handler.calls == 1
+    assert service.get_rate_limit_metrics()["openai"]["requests"] == 1
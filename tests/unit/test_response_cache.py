@@ -0,0 +1,124 @@
+import pytest
+from app.llm_providers.base_handler import BaseLLMHandler
+from app.models.config import LLMConfig, ModelProvider
+from app.services.rate_limiter import RateLimiter
+from app.services.llm_service import LLMService
+from app.services.response_cache import ResponseCache, ResponseCachePolicy, response_cache_key
+
+class CountingHandler(BaseLLMHandler):
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+
+    async def generate_text(self, llm_config, prompt, context, tools=None):
+        self.calls += 1
+        if self.error:
+            return "", None, self.error
+        return f"answer {self.calls}", {"prompt_tokens": 2, "completion_tokens": 3, "total_tokens": 5}, None
+
+def make_service(cache, handler):
+    service = LLMService(rate_limiter=RateLimiter(), response_cache=cache)
+    service.handlers[ModelProvider.OPENAI] = handler
+    return service
+
+def config(**overrides):
+    return LLMConfig(**{"provider": "openai", "model": "gpt-4", "api_key": "test-key", "temperature": 0, **overrides})
+
+def test_key_ignores_api_key_and_cache_settings_but_not_sampling():
+    base = response_cache_key(config(), "prompt")
+    assert response_cache_key(config(api_key="test-other", cache=True, cache_ttl=5), "prompt") == base
+    assert response_cache_key(config(temperature=0.5), "prompt") != base
+    assert response_cache_key(config(), "prompt", tools=[{"name": "calc"}]) != base
+    assert response_cache_key(config(), "prompt", context={"system_prompt": "x"}) != base
+    assert response_cache_key(config(), "other prompt") != base
+
+@pytest.mark.asyncio
+async def test_deterministic_calls_are_served_from_cache():
+    cache, handler = ResponseCache(ResponseCachePolicy(enabled=True)), CountingHandler()
+    service = make_service(cache, handler)
+    first = await service.generate(config(), "prompt")
+    second = await service.generate(config(), "prompt")
+    assert first == ("answer 1", {"prompt_tokens": 2, "completion_tokens": 3, "total_tokens": 5}, None)
+    assert second == ("answer 1", None, None)
+    assert handler.calls == 1
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_sampled_calls_bypass_cache_unless_opted_in():
+    handler = CountingHandler()
+    service = make_service(ResponseCache(), handler)
+    await service.generate(config(temperature=0.7), "prompt")
+    await service.generate(config(temperature=0.7), "prompt")
+    assert handler.calls == 2
+    await service.generate(config(temperature=0.7, cache=True), "prompt")
+    await service.generate(config(temperature=0.7, cache=True), "prompt")
+    assert handler.calls == 3
+    await service.generate(config(cache=False), "prompt")
+    await service.generate(config(cache=False), "prompt")
+    assert handler.calls == 5
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached():
+    handler = CountingHandler(error="OpenAI API Error: boom")
+    service = make_service(ResponseCache(), handler)
+    await service.generate(config(), "prompt")
+    await service.generate(config(), "prompt")
+    assert handler.calls == 2
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.response_cache.time.time", lambda: now[0])
+    cache = ResponseCache(ResponseCachePolicy(ttl=10))
+    cache.put("k", "text")
+    cache.put("short", "text", ttl=1)
+    now[0] += 5
+    assert cache.get("k") == ("text", None)
+    assert cache.get("short") is None
+    now[0] += 10
+    assert cache.get("k") is None
+    assert cache.stats()["expired"] == 2
+
+def test_memory_tier_is_bounded_lru():
+    cache = ResponseCache(ResponseCachePolicy(max_entries=2))
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == ("1", None)
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    policy = ResponseCachePolicy(directory=str(tmp_path / "cache"))
+    ResponseCache(policy).put("k" * 64, "persisted", {"total_tokens": 4})
+    cache = ResponseCache(policy)
+    assert cache.get("k" * 64) == ("persisted", {"total_tokens": 4})
+    assert cache.get("k" * 64) == ("persisted", {"total_tokens": 4})
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["memory_hits"] == 1
+
+def test_unreadable_disk_entries_are_misses(tmp_path):
+    policy = ResponseCachePolicy(directory=str(tmp_path / "cache"))
+    cache = ResponseCache(policy)
+    cache.put("ab" * 32, "text")
+    path = cache._path("ab" * 32)
+    with open(path, "w") as f:
+        f.write("{not json")
+    assert ResponseCache(policy).get("ab" * 32) is None
+
+def test_caching_is_opt_in():
+    cache = ResponseCache()
+    assert not cache.should_cache(config())
+    assert cache.should_cache(config(cache=True))
+    enabled = ResponseCache(ResponseCachePolicy(enabled=True))
+    assert enabled.should_cache(config())
+    assert not enabled.should_cache(config(temperature=0.7))
+    assert not enabled.should_cache(config(cache=False))
+
+@pytest.mark.asyncio
+async def test_streamed_responses_are_cached():
+    handler = CountingHandler()
+    service = make_service(ResponseCache(ResponseCachePolicy(enabled=True)), handler)
+    first = [chunk async for chunk in service.stream(config(), "prompt")]
+    second = [chunk async for chunk in service.stream(config(), "prompt")]
+    assert first[0] == ("answer 1", None, None)
+    assert second == [("answer 1", None, None), ("", None, None)]
+    assert handler.calls == 1
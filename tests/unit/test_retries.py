@@ -0,0 +1,173 @@
+import asyncio
+import httpx
+import openai
+import pytest
+from app.llm_providers.base_handler import BaseLLMHandler
+from app.llm_providers.errors import (
+    AUTHENTICATION, CONNECTION, INVALID_REQUEST, RATE_LIMIT, SERVER_ERROR, TIMEOUT,
+    ProviderError, classify_provider_error, parse_retry_after
+)
+from app.models.config import LLMConfig, ModelProvider
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import RateLimiter
+from app.services.response_cache import ResponseCache, ResponseCachePolicy
+from app.services.retry import CircuitBreaker, CircuitBreakerPolicy, CircuitBreakers, RetryPolicy
+from app.utils.deadline import deadline_scope
+
+LLM_CONFIG = LLMConfig(provider="openai", model="gpt-4", api_key="test-key", temperature=0.7)
+
+def status_error(status_code, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    return openai.APIStatusError(f"status {status_code}", response=response, body=None)
+
+class ScriptedHandler(BaseLLMHandler):
+    """Fake handler that raises the scripted errors in turn, then succeeds."""
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def generate_text(self, llm_config, prompt, context, tools=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok", {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}, None
+
+def make_service(handler, retry_policy=None, breaker_policy=None):
+    service = LLMService(
+        rate_limiter=RateLimiter(),
+        response_cache=ResponseCache(ResponseCachePolicy(enabled=False)),
+        retry_policy=retry_policy or RetryPolicy(base_delay=0.001, max_delay=0.01),
+        circuit_breakers=CircuitBreakers(breaker_policy)
+    )
+    service.handlers[ModelProvider.OPENAI] = handler
+    return service
+
+@pytest.mark.parametrize("error,kind", [
+    (status_error(429), RATE_LIMIT),
+    (status_error(503), SERVER_ERROR),
+    (status_error(529), SERVER_ERROR),
+    (status_error(401), AUTHENTICATION),
+    (status_error(400), INVALID_REQUEST),
+    (openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com")), TIMEOUT),
+    (httpx.ConnectError("refused"), CONNECTION),
+])
+def test_errors_are_classified_across_providers(error, kind):
+    assert classify_provider_error(error).kind == kind
+
+def test_retry_after_headers_are_parsed():
+    assert parse_retry_after({"retry-after": "7"}) == 7.0
+    assert parse_retry_after({"retry-after-ms": "1500", "retry-after": "7"}) == 1.5
+    assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+    assert parse_retry_after({"retry-after": "soon"}) is None
+    assert classify_provider_error(status_error(429, {"retry-after": "2"})).retry_after == 2.0
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    delays = [policy.backoff(5) for _ in range(200)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert len(set(delays)) > 1
+    assert policy.backoff(0, retry_after=3.0) == 3.0
+    # A longer Retry-After than the policy allows is not waited out
+    assert policy.backoff(0, retry_after=3600.0) is None
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    handler = ScriptedHandler([
+        ProviderError("OpenAI API Error: overloaded", kind=SERVER_ERROR, status_code=503),
+        ProviderError("OpenAI API Error: slow down", kind=RATE_LIMIT, status_code=429),
+    ])
+    result = await make_service(handler).generate(LLM_CONFIG, "prompt")
+    assert result[0] == "ok" and result[2] is None
+    assert handler.calls == 3
+
+@pytest.mark.asyncio
+async def test_permanent_errors_are_not_retried():
+    handler = ScriptedHandler([ProviderError("OpenAI API Error: bad key", kind=AUTHENTICATION, status_code=401)])
+    assert await make_service(handler).generate(LLM_CONFIG, "prompt") == ("", None, "OpenAI API Error: bad key")
+    assert handler.calls == 1
+
+@pytest.mark.asyncio
+async def test_retries_stop_after_max_retries():
+    handler = ScriptedHandler([ProviderError("OpenAI API Error: down", kind=SERVER_ERROR)] * 10)
+    text, _, error = await make_service(handler, RetryPolicy(max_retries=2, base_delay=0.001)).generate(LLM_CONFIG, "prompt")
+    assert error == "OpenAI API Error: down"
+    assert handler.calls == 3
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured(monkeypatch):
+    sleeps = []
+    real_sleep = asyncio.sleep
+    async def recording_sleep(delay):
+        sleeps.append(delay)
+        await real_sleep(0)
+    monkeypatch.setattr("app.services.llm_service.asyncio.sleep", recording_sleep)
+    handler = ScriptedHandler([ProviderError("slow down", kind=RATE_LIMIT, retry_after=1.25)])
+    await make_service(handler, RetryPolicy(max_delay=2.0)).generate(LLM_CONFIG, "prompt")
+    assert sleeps == [1.25]
+
+@pytest.mark.asyncio
+async def test_retry_after_beyond_max_delay_fails_fast(monkeypatch):
+    sleeps = []
+    async def recording_sleep(delay):
+        sleeps.append(delay)
+    monkeypatch.setattr("app.services.llm_service.asyncio.sleep", recording_sleep)
+    handler = ScriptedHandler([ProviderError("slow down", kind=RATE_LIMIT, retry_after=3600.0)])
+    # No deadline: without the cap the call would sleep for an hour
+    result = await make_service(handler, RetryPolicy(max_delay=30.0)).generate(LLM_CONFIG, "prompt")
+    assert result == ("", None, "slow down")
+    assert handler.calls == 1 and sleeps == []
+
+@pytest.mark.asyncio
+async def test_retries_never_outlast_the_deadline():
+    handler = ScriptedHandler([ProviderError("slow down", kind=RATE_LIMIT, retry_after=5.0)])
+    with deadline_scope(0.5):
+        result = await make_service(handler, RetryPolicy(max_delay=10.0)).generate(LLM_CONFIG, "prompt")
+    assert result == ("", None, "slow down")
+    assert handler.calls == 1
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_repeated_failures_and_fails_fast():
+    handler = ScriptedHandler([ProviderError("down", kind=SERVER_ERROR)] * 10)
+    service = make_service(handler, RetryPolicy(max_retries=0), CircuitBreakerPolicy(failure_threshold=3, reset_timeout=60))
+    for _ in range(3):
+        await service.generate(LLM_CONFIG, "prompt")
+    text, _, error = await service.generate(LLM_CONFIG, "prompt")
+    assert "circuit breaker is open" in error
+    assert handler.calls == 3
+    assert service.get_circuit_breaker_metrics()["openai"]["state"] == "open"
+
+def test_half_open_circuit_lets_one_probe_through(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.services.retry.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(CircuitBreakerPolicy(failure_threshold=1, reset_timeout=10))
+    assert breaker.allow()
+    breaker.record(success=False)
+    assert not breaker.allow()
+    now[0] += 10
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record(success=False)
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 2
+    now[0] += 10
+    assert breaker.allow()
+    breaker.record(success=True)
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+@pytest.mark.asyncio
+async def test_streams_retry_only_before_the_first_delta():
+    class FlakyStreamHandler(BaseLLMHandler):
+        def __init__(self):
+            self.calls = 0
+        async def generate_text(self, llm_config, prompt, context, tools=None):
+            raise NotImplementedError
+        async def stream_text(self, llm_config, prompt, context, tools=None):
+            self.calls += 1
+            if self.calls == 1:
+                raise ProviderError("overloaded", kind=SERVER_ERROR)
+            yield "partial", None, None
+            raise ProviderError("connection reset", kind=CONNECTION)
+    handler = FlakyStreamHandler()
+    chunks = [chunk async for chunk in make_service(handler).stream(LLM_CONFIG, "prompt")]
+    assert chunks == [("partial", None, None), ("", None, "connection reset")]
+    assert handler.calls == 2
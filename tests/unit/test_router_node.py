@@ -0,0 +1,123 @@
+import pytest
+from app.chains.script_chain import ScriptChain
+from app.models.node_models import InputMapping, NodeConfig, RouterConfig
+from app.nodes.router_node import RouterNode
+from app.utils.execution_journal import ExecutionJournal
+from app.utils.expressions import ExpressionError, safe_eval
+
+class FakeLLMService:
+    def __init__(self, answer):
+        self.answer = answer
+        self.prompts = []
+
+    async def generate(self, llm_config, prompt, context=None, tools=None):
+        self.prompts.append(prompt)
+        return self.answer, {"prompt_tokens": 30, "completion_tokens": 1, "total_tokens": 31}, None
+
+@pytest.fixture
+def log(fake_nodes):
+    """Routers are real; other nodes output their prompt as text"""
+    fake_nodes.real_types.add("router")
+    fake_nodes.respond = lambda config, context: {"text": config.prompt}
+    return fake_nodes
+
+def node(node_id, dependencies=None, prompt=None, **kwargs):
+    return NodeConfig(id=node_id, type="ai", model="gpt-4", prompt=prompt or node_id, dependencies=dependencies or [], **kwargs)
+
+def router(expression=None, **routes):
+    return NodeConfig(
+        id="route",
+        type="router",
+        model="gpt-4",
+        prompt="Is this a billing or a support request?",
+        dependencies=["classify"],
+        input_mappings={"label": InputMapping(source_node_id="classify", source_output_key="text")},
+        router_config=RouterConfig(routes=routes or {"billing": ["b1"], "support": ["s1"]}, expression=expression)
+    )
+
+def branching_chain(label):
+    # classify -> route -> billing: b1 -> b2, support: s1 -> s2; final joins b2 and s2
+    return [
+        node("classify", prompt=label),
+        router("'billing' if 'invoice' in label.lower() else 'support'"),
+        node("b1", ["route"]), node("b2", ["b1"]),
+        node("s1", ["route"]), node("s2", ["s1"]),
+        node("final", ["b2", "s2"]),
+    ]
+
+def test_safe_eval_supports_routing_expressions():
+    assert safe_eval("'billing' if 'invoice' in text.lower() else 'support'", {"text": "Invoice #3"}) == "billing"
+    assert safe_eval("len(items) > 2 and items[0]['score'] >= 0.5", {"items": [{"score": 0.7}, 1, 2]}) is True
+    assert safe_eval("label.strip() == 'yes'", {"label": " yes "}) is True
+    assert safe_eval("len('ab' * 10000)", {}) == 20000
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os').system('true')",
+    "text.__class__",
+    "(lambda: 1)()",
+    "open('/etc/passwd')",
+    "'a' * 100000000",
+    "('a' * 10000) * 10000",
+    "text * 50000",
+    "[x for x in text]",
+])
+def test_safe_eval_rejects_unsafe_expressions(expression):
+    with pytest.raises(ExpressionError):
+        safe_eval(expression, {"text": "abc"})
+
+@pytest.mark.asyncio
+async def test_router_expression_and_default_route(context_manager):
+    config = router("score > 0.5", **{"true": ["b1"], "false": ["s1"]})
+    result = await RouterNode(config, context_manager).execute({"score": 0.9})
+    assert result.output == {"route": "true"}
+    unmatched = router("label", billing=["b1"], support=["s1"])
+    failed = await RouterNode(unmatched, context_manager).execute({"label": "other"})
+    assert not failed.success and failed.metadata.error_type == "RoutingError"
+    unmatched.router_config.default_route = "support"
+    assert (await RouterNode(unmatched, context_manager).execute({"label": "other"})).output == {"route": "support"}
+
+@pytest.mark.asyncio
+async def test_router_asks_model_when_no_expression(context_manager):
+    service = FakeLLMService("Billing.")
+    result = await RouterNode(router(), context_manager, llm_service=service).execute({"label": "invoice overdue"})
+    assert result.output == {"route": "billing"}
+    assert result.usage.total_tokens == 31
+    assert "Answer with exactly one of: billing, support." in service.prompts[0]
+    assert "label: invoice overdue" in service.prompts[0]
+
+@pytest.mark.asyncio
+async def test_chain_skips_untaken_branch_without_instantiating_it(log, context_manager):
+    chain = ScriptChain(nodes=branching_chain("Invoice overdue"), context_manager=context_manager, persist_intermediate_outputs=False)
+    result = await chain.execute()
+    assert result.success
+    assert "s1" not in log.created and "s2" not in log.created
+    assert result.skipped_nodes == ["s1", "s2"]
+    assert chain.metrics["routes"] == {"route": "billing"}
+    # The join runs with the taken branch only
+    assert log.contexts["final"] == {"b2": "b2"}
+
+@pytest.mark.asyncio
+async def test_chain_takes_other_branch(log, context_manager):
+    chain = ScriptChain(nodes=branching_chain("password reset"), context_manager=context_manager, persist_intermediate_outputs=False)
+    result = await chain.execute()
+    assert result.skipped_nodes == ["b1", "b2"]
+    assert set(result.output) == {"classify", "route", "s1", "s2", "final"}
+
+@pytest.mark.asyncio
+async def test_resumed_chain_keeps_router_decision(log, context_manager, tmp_path):
+    journal = ExecutionJournal(journal_dir=str(tmp_path / "journals"), retain_finished=True)
+    first = ScriptChain(nodes=branching_chain("Invoice"), context_manager=context_manager, persist_intermediate_outputs=False, journal=journal)
+    await first.execute(targets=["route"])
+    log.created.clear()
+    resumed = ScriptChain.resume(first.chain_id, journal, context_manager=context_manager)
+    result = await resumed.execute(targets=["final"])
+    assert log.created == ["b1", "b2", "final"]
+    assert result.skipped_nodes == ["s1", "s2"]
+
+def test_routes_must_start_at_router_dependents(context_manager):
+    nodes = [node("classify"), router(billing=["b1"], support=["s1"]), node("b1", ["route"]), node("s1", ["classify"])]
+    with pytest.raises(ValueError, match="must depend on router"):
+        ScriptChain(nodes=nodes, context_manager=context_manager)
+    nodes = [node("classify"), router("__import__('os')"), node("b1", ["route"]), node("s1", ["route"])]
+    with pytest.raises(ValueError, match="unknown function"):
+        ScriptChain(nodes=nodes, context_manager=context_manager)
@@ -0,0 +1,75 @@
+import pytest
+from app.chains.script_chain import ScriptChain
+from app.models.node_models import NodeConfig
+
+def make_node(node_id, dependencies=None):
+    return NodeConfig(id=node_id, type="ai", model="gpt-4", prompt=node_id, dependencies=dependencies or [])
+
+@pytest.fixture
+def timeline(fake_nodes):
+    fake_nodes.default_latency = 0.01
+    return fake_nodes
+
+@pytest.mark.asyncio
+async def test_node_starts_when_its_own_dependencies_finish(context_manager, timeline):
+    timeline.latencies.update({"slow": 0.3, "fast": 0.02, "after_fast": 0.02})
+    chain = ScriptChain(
+        nodes=[make_node("slow"), make_node("fast"), make_node("after_fast", ["fast"])],
+        context_manager=context_manager,
+        persist_intermediate_outputs=False
+    )
+    result = await chain.execute()
+    assert result.success
+    # 'after_fast' is on level 1 but must not wait for the slow level-0 node
+    assert timeline.times[("end", "after_fast")] < timeline.times[("end", "slow")]
+
+@pytest.mark.asyncio
+async def test_max_parallel_is_respected(context_manager, timeline):
+    chain = ScriptChain(
+        nodes=[make_node(f"n{i}") for i in range(6)],
+        context_manager=context_manager,
+        max_parallel=2,
+        persist_intermediate_outputs=False
+    )
+    await chain.execute()
+    assert timeline.peak <= 2
+
+@pytest.mark.asyncio
+async def test_dependents_of_failed_node_are_reported(context_manager, timeline):
+    timeline.respond = lambda config, context: (
+        timeline.result(config, success=False, error="boom") if config.id == "root" else {"text": config.id}
+    )
+    chain = ScriptChain(
+        nodes=[make_node("root"), make_node("child", ["root"]), make_node("independent")],
+        context_manager=context_manager,
+        persist_intermediate_outputs=False
+    )
+    result = await chain.execute()
+    assert not result.success
+    assert "independent" in result.output
+    assert "Node child failed" in result.error
+
+@pytest.mark.asyncio
+async def test_targets_run_only_their_ancestors(context_manager, timeline):
+    nodes = [
+        make_node("load"),
+        make_node("clean", ["load"]),
+        make_node("summary", ["clean"]),
+        make_node("stats", ["clean"]),
+        make_node("chart", ["stats"]),
+        make_node("unrelated"),
+    ]
+    chain = ScriptChain(nodes=nodes, context_manager=context_manager, persist_intermediate_outputs=False)
+    result = await chain.execute(targets=["summary"])
+    assert result.success
+    assert set(timeline.calls) == {"load", "clean", "summary"}
+    assert set(result.output) == {"load", "clean", "summary"}
+    assert result.skipped_nodes == ["stats", "chart", "unrelated"]
+
+@pytest.mark.asyncio
+async def test_unknown_target_is_rejected(context_manager, timeline):
+    chain = ScriptChain(nodes=[make_node("a")], context_manager=context_manager, persist_intermediate_outputs=False)
+    with pytest.raises(ValueError, match="missing"):
+        await chain.execute(targets=["missing"])
+    result = await chain.execute()
+    assert result.skipped_nodes is None
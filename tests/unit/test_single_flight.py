@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from app.llm_providers.base_handler import BaseLLMHandler
+from app.models.config import LLMConfig, ModelProvider
+from app.services.llm_service import LLMService
+from app.services.rate_limiter import RateLimiter
+from app.services.response_cache import ResponseCache, ResponseCachePolicy
+from app.services.single_flight import SingleFlight
+
+class GatedHandler(BaseLLMHandler):
+    """Fake handler that blocks until released and counts provider calls."""
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.cancelled = 0
+
+    async def generate_text(self, llm_config, prompt, context, tools=None):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"answer to {prompt}", {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}, None
+
+def make_service(handler):
+    # Caching off, so every saved call is due to coalescing
+    service = LLMService(rate_limiter=RateLimiter(), response_cache=ResponseCache(ResponseCachePolicy(enabled=False)))
+    service.handlers[ModelProvider.OPENAI] = handler
+    return service
+
+def config(temperature=0, **overrides):
+    return LLMConfig(provider="openai", model="gpt-4", api_key="test-key", temperature=temperature, **overrides)
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_provider_call():
+    handler = GatedHandler()
+    service = make_service(handler)
+    tasks = [asyncio.create_task(service.generate(config(), "same prompt")) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    handler.release.set()
+    results = await asyncio.gather(*tasks)
+    assert handler.calls == 1
+    assert all(text == "answer to same prompt" and error is None for text, _, error in results)
+    # Token usage is reported once, by the caller that made the call
+    assert sum(1 for _, usage, _ in results if usage) == 1
+    assert service.single_flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 4}
+
+@pytest.mark.asyncio
+async def test_different_or_sampled_calls_are_not_coalesced():
+    handler = GatedHandler()
+    service = make_service(handler)
+    tasks = [
+        asyncio.create_task(service.generate(config(), "prompt a")),
+        asyncio.create_task(service.generate(config(), "prompt b")),
+        asyncio.create_task(service.generate(config(temperature=0.8), "prompt a")),
+        asyncio.create_task(service.generate(config(temperature=0.8), "prompt a")),
+        asyncio.create_task(service.generate(config(cache=False), "prompt a")),
+    ]
+    await asyncio.sleep(0.01)
+    handler.release.set()
+    await asyncio.gather(*tasks)
+    assert handler.calls == 5
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_fail_other_waiters():
+    handler = GatedHandler()
+    service = make_service(handler)
+    leader = asyncio.create_task(service.generate(config(), "prompt"))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(service.generate(config(), "prompt"))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    await asyncio.sleep(0.01)
+    handler.release.set()
+    assert (await follower)[0] == "answer to prompt"
+    assert leader.cancelled()
+    assert handler.calls == 1 and handler.cancelled == 0
+
+@pytest.mark.asyncio
+async def test_call_is_cancelled_once_every_waiter_has_gone():
+    handler = GatedHandler()
+    service = make_service(handler)
+    waiters = [asyncio.create_task(service.generate(config(), "prompt")) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert handler.cancelled == 1
+    assert service.single_flight.stats()["in_flight"] == 0
+    # The key is free again for new callers
+    handler.release.set()
+    assert (await service.generate(config(), "prompt"))[0] == "answer to prompt"
+    assert handler.calls == 2
+
+@pytest.mark.asyncio
+async def test_exceptions_reach_every_waiter():
+    flight = SingleFlight()
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+    results = await asyncio.gather(*(flight.do("k", boom) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 2}
@@ -0,0 +1,30 @@
+import pytest
+import tiktoken
+from app.utils.token_counter import TokenCounter
+
+@pytest.fixture
+def offline(monkeypatch):
+    """tiktoken without a cached encoding and no network to download one"""
+    attempts = []
+    def get_encoding(name):
+        attempts.append(name)
+        raise ConnectionError("no network")
+    monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+    monkeypatch.setattr(TokenCounter, "_encodings", {})
+    return attempts
+
+def test_unloadable_encoding_falls_back_to_estimate(offline):
+    text = "x" * 400
+    assert TokenCounter.count_tokens(text, "gpt-4", "openai") == 100
+    assert TokenCounter.count_tokens(text, "claude-3-opus", "anthropic") == 100
+    assert TokenCounter.count_message_tokens([{"role": "user", "content": text}], "gpt-4", "openai") == 104
+    # The failed load is not retried on every call
+    assert offline == ["cl100k_base"]
+
+def test_custom_models_are_estimated(offline):
+    assert TokenCounter.count_tokens("x" * 40, "recorded-gpt-4", "custom") == 10
+    assert offline == []
+
+def test_unknown_openai_model_is_an_error(offline):
+    with pytest.raises(ValueError):
+        TokenCounter.count_tokens("hi", "gpt-unknown", "openai")